@@ -218,6 +218,27 @@ def translateall():
     return result
 
 
+@export
+def api():
+    """Compile the API definitions used by autocomplete for each mode
+    """
+    print("\nCompiling API definitions")
+    return subprocess.run(["python", "utils/mkapi.py", "--compile"]).returncode
+
+
+@export
+def benchmark(runs="5"):
+    """Measure Mu's cold and warm start times (headless)
+
+    Results are added to .benchmarks/startup.jsonl and a failure value is
+    returned if startup is much slower than the best recorded so far.
+    """
+    print("\nbenchmark")
+    return subprocess.run([
+        "python", "utils/startup_benchmark.py", str(runs)
+    ]).returncode
+
+
 @export
 def run():
     """Run Mu from within a virtual environment
@@ -234,6 +255,7 @@ def dist():
     """Generate a source distribution and a binary wheel
     """
     check()
+    api()
     print("Checks pass; good to package")
     subprocess.run(["python", "setup.py", "sdist", "bdist_wheel"]).returncode
 
@@ -264,6 +286,7 @@ def win32():
     """Build 32-bit Windows installer
     """
     check()
+    api()
     print("Building 32-bit Windows installer")
     return subprocess.run(["python", "win_installer.py", "32"]).returncode
 
@@ -273,6 +296,7 @@ def win64():
     """Build 64-bit Windows installer
     """
     check()
+    api()
     print("Building 64-bit Windows installer")
     return subprocess.run(["python", "win_installer.py", "64"]).returncode
 
@@ -19,12 +19,19 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
+import importlib.util
+import json
 import logging
 from logging.handlers import TimedRotatingFileHandler
 import os
 import platform
-import pkgutil
 import sys
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+
+# When Mu started importing its dependencies, so the import time is profiled.
+IMPORTS_STARTED = time.perf_counter()
 
 from PyQt5.QtCore import QTimer, Qt
 from PyQt5.QtWidgets import QApplication, QSplashScreen
@@ -33,11 +40,90 @@ from mu import __version__
 from mu.logic import Editor, LOG_FILE, LOG_DIR, DEBUGGER_PORT, ENCODING
 from mu.interface import Window
 from mu.resources import load_pixmap, load_icon
-from mu.modes import (PythonMode, AdafruitMode, MicrobitMode, DebugMode,
-                      PyGameZeroMode)
+from mu.modes import MODES, load_mode
 from mu.debugger.runner import run as run_debugger
 
 
+#: Command line flag to record how long each phase of Mu's startup takes.
+PROFILE_STARTUP = '--profile-startup'
+#: The default file to which startup timings are written as JSON.
+STARTUP_PROFILE_FILE = os.path.join(LOG_DIR, 'startup_profile.json')
+
+
+class StartupProfiler:
+    """
+    Records how long each phase of Mu's startup takes, from importing Mu's
+    dependencies until the event loop starts (at which point the window is
+    interactive).
+
+    If disabled, marking phases and finishing does nothing.
+    """
+
+    def __init__(self, enabled=False, filename=STARTUP_PROFILE_FILE,
+                 started=IMPORTS_STARTED):
+        self.enabled = enabled
+        self.filename = filename
+        self.started = started
+        self.last = started
+        self.phases = []
+
+    def mark(self, phase):
+        """
+        Record the time taken since the last phase as that of the referenced
+        phase.
+        """
+        if self.enabled:
+            now = time.perf_counter()
+            self.phases.append((phase, now - self.last))
+            self.last = now
+
+    def finish(self):
+        """
+        Log the timings and write them, with the total, to the JSON file.
+        """
+        if not self.enabled:
+            return
+        total = self.last - self.started
+        for phase, duration in self.phases:
+            logging.info('Startup phase {}: {:.3f}s'.format(phase, duration))
+        logging.info('Startup took {:.3f}s'.format(total))
+        profile = {
+            'version': __version__,
+            'time': time.time(),
+            'phases': [{'name': phase, 'duration': duration}
+                       for phase, duration in self.phases],
+            'total': total,
+        }
+        try:
+            with open(self.filename, 'w') as profile_file:
+                json.dump(profile, profile_file, indent=2)
+        except OSError:
+            logging.exception('Unable to write startup profile to '
+                              '{}'.format(self.filename))
+        else:
+            logging.info('Startup profile written to {}'.format(
+                self.filename))
+
+
+def get_profiler(args):
+    """
+    Return a StartupProfiler enabled if the referenced command line arguments
+    include --profile-startup (or --profile-startup=FILENAME to choose where
+    the timings are written), along with the remaining arguments.
+    """
+    remaining = []
+    profiler = StartupProfiler()
+    for arg in args:
+        if arg == PROFILE_STARTUP:
+            profiler.enabled = True
+        elif arg.startswith(PROFILE_STARTUP + '='):
+            profiler.enabled = True
+            profiler.filename = arg[len(PROFILE_STARTUP) + 1:]
+        else:
+            remaining.append(arg)
+    return profiler, remaining
+
+
 def setup_logging():
     """
     Configure logging.
@@ -65,26 +151,81 @@ def setup_logging():
     print(_('Logging to {}').format(LOG_FILE))
 
 
-def setup_modes(editor, view):
+class ModeRegistry(Mapping):
     """
-    Create a simple dictionary to hold instances of the available modes.
+    A dictionary like object holding the available modes, keyed by their
+    short names.
+
+    A mode is instantiated only when it's first looked up (e.g. when it's
+    selected or a device for it is attached), so Mu doesn't pay for modes
+    that are never used. Checking for attached devices (see boards) imports
+    the modes' modules, but doesn't instantiate them.
 
-    *PREMATURE OPTIMIZATION ALERT* This may become more complex in future so
-    splitting things out here to contain the mess. ;-)
+    Some of what the modes use is still imported when Mu starts, whichever
+    modes are used: QtChart (for the plotter) through mu.interface.panes and
+    QtSerialPort through mu.logic.
     """
-    modes = {
-        'python': PythonMode(editor, view),
-        'adafruit': AdafruitMode(editor, view),
-        'microbit': MicrobitMode(editor, view),
-        'debugger': DebugMode(editor, view),
-    }
 
-    # Check if pgzero is available (without importing it)
-    if any([m for m in pkgutil.iter_modules() if 'pgzero' in m]):
-        modes['pygamezero'] = PyGameZeroMode(editor, view)
+    def __init__(self, editor, view, names):
+        self.editor = editor
+        self.view = view
+        self.names = list(names)
+        self.classes = {}
+        self.instances = {}
+
+    def __getitem__(self, name):
+        if name not in self.names:
+            raise KeyError(name)
+        if name not in self.instances:
+            logging.info('Loading {} mode.'.format(name))
+            mode_class = self.mode_class(name)
+            self.instances[name] = mode_class(self.editor, self.view)
+        return self.instances[name]
+
+    def mode_class(self, name):
+        """
+        Return the class of the referenced mode, importing its module the
+        first time it's asked for.
+        """
+        if name not in self.classes:
+            self.classes[name] = load_mode(name)
+        return self.classes[name]
+
+    def boards(self):
+        """
+        Return the boards (USB VID, PID pairs) looked for by each mode which
+        can find an attached device, keyed by the mode's short name.
+
+        Modes which haven't been loaded are asked through their class, so
+        they aren't instantiated just to check for devices.
+        """
+        boards = OrderedDict()
+        for name in self.names:
+            mode = self.instances.get(name) or self.mode_class(name)
+            if hasattr(mode, 'find_device'):
+                boards[name] = mode.valid_boards
+        return boards
+
+    def __contains__(self, name):
+        return name in self.names
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
 
-    # return available modes
-    return modes
+
+def setup_modes(editor, view):
+    """
+    Create a registry of the available modes, each of which is only loaded
+    when first used.
+    """
+    names = list(MODES)
+    # Check if pgzero is available (without importing it)
+    if importlib.util.find_spec('pgzero') is None:
+        names.remove('pygamezero')
+    return ModeRegistry(editor, view, names)
 
 
 def excepthook(*exc_args):
@@ -106,11 +247,17 @@ def run():
     - create an editor window and status bar
     - display a splash screen while starting
     - close the splash screen after startup timer ends
+
+    If started with --profile-startup, the time taken by each of these steps
+    is logged and written to a JSON file (see StartupProfiler).
     """
+    profiler, args = get_profiler(sys.argv[1:])
+    profiler.mark('imports')
     setup_logging()
     logging.info('\n\n-----------------\n\nStarting Mu {}'.format(__version__))
     logging.info(platform.uname())
     logging.info('Python path: {}'.format(sys.path))
+    profiler.mark('logging')
 
     # The app object is the application running on your computer.
     app = QApplication(sys.argv)
@@ -123,19 +270,24 @@ def run():
     # Images (such as toolbar icons) aren't scaled nicely on retina/4k displays
     # unless this flag is set
     app.setAttribute(Qt.AA_UseHighDpiPixmaps)
+    profiler.mark('application')
 
     # Create the "window" we'll be looking at.
     editor_window = Window()
     # Make sure all windows have the Mu icon as a fallback
     app.setWindowIcon(load_icon(editor_window.icon))
+    profiler.mark('window')
     # Create the "editor" that'll control the "window".
     editor = Editor(view=editor_window)
     editor.setup(setup_modes(editor, editor_window))
+    profiler.mark('editor setup')
     # Setup the window.
     editor_window.closeEvent = editor.quit
     editor_window.setup(editor.debug_toggle_breakpoint, editor.theme)
+    profiler.mark('window setup')
     # Restore the previous session along with files passed by the os
-    editor.restore_session(sys.argv[1:])
+    editor.restore_session(args)
+    profiler.mark('restore session')
     # Connect the various UI elements in the window to the editor.
     editor_window.connect_tab_rename(editor.rename_tab, 'Ctrl+Shift+S')
     status_bar = editor_window.status_bar
@@ -150,6 +302,15 @@ def run():
     splash_be_gone.timeout.connect(lambda: splash.finish(editor_window))
     splash_be_gone.setSingleShot(True)
     splash_be_gone.start(2000)
+    profiler.mark('splash screen')
+
+    if profiler.enabled:
+        # Mu is interactive once the event loop handles its first events.
+        def interactive():
+            profiler.mark('event loop')
+            profiler.finish()
+
+        QTimer.singleShot(0, interactive)
 
     # Stop the program after the application finishes executing.
     sys.exit(app.exec_())
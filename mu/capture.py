@@ -0,0 +1,273 @@
+"""
+Writes the data captured by the plotter to files as it arrives, rather than
+holding it all in memory until the plotter is closed, and loads captures
+written in Mu's binary format.
+
+It doesn't depend on Qt (or, until a binary capture is loaded, NumPy) so
+captures can be loaded from a script run in Python 3 mode.
+
+Copyright (c) 2015-2017 Nicholas H.Tollervey and others (see the AUTHORS file).
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import os
+import sys
+import csv
+import time
+import queue
+import array
+import struct
+import logging
+import threading
+
+
+#: A new capture file is started once the current one is this many bytes.
+CAPTURE_FILE_SIZE = 10 * 1024 * 1024
+#: A new capture file is started once the current one is this many seconds
+#: old.
+CAPTURE_FILE_AGE = 60 * 60
+#: Captured data is flushed to the file at least this often (in seconds), so
+#: little is lost if Mu crashes.
+CAPTURE_FLUSH_INTERVAL = 1
+#: Identifies a binary capture file.
+CAPTURE_MAGIC = b'MUCAP'
+#: The version of the binary capture format.
+CAPTURE_VERSION = 1
+#: The header of a binary capture file: the magic bytes, the format version
+#: and the number of values in each row (after its timestamp). Padded to 16
+#: bytes so the rows which follow are aligned.
+CAPTURE_HEADER = struct.Struct('<5sB2xI4x')
+
+
+logger = logging.getLogger(__name__)
+
+
+class CaptureWriter(threading.Thread):
+    """
+    Writes rows of captured data as CSV to files in the referenced directory,
+    in its own thread so the plotter is never held up by the disk.
+
+    Rows passed to write are queued and written through a buffered file,
+    which is flushed every flush_interval seconds. A new file, named with the
+    time it's started, is begun once the current one reaches max_size bytes
+    or is max_age seconds old. The file is only created once there's data to
+    write to it.
+
+    If writing fails (e.g. the disk is full) the error is logged and further
+    rows are discarded.
+    """
+
+    extension = '.csv'
+
+    def __init__(self, directory, max_size=CAPTURE_FILE_SIZE,
+                 max_age=CAPTURE_FILE_AGE,
+                 flush_interval=CAPTURE_FLUSH_INTERVAL):
+        # A daemon thread so it never stops Mu exiting.
+        super().__init__(daemon=True)
+        self.directory = directory
+        self.max_size = max_size
+        self.max_age = max_age
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue()
+        self.file = None
+        self.opened = None  # When the current file was started.
+        self.filenames = []  # The files written to, oldest first.
+        self.rows = 0
+
+    def write(self, rows):
+        """
+        Queue the referenced list of rows (each a tuple of values) to be
+        written, stamped with the time they arrived.
+        """
+        if self.is_alive():
+            self.queue.put((time.time(), rows))
+
+    def close(self):
+        """
+        Write everything queued, close the file and wait for the thread to
+        finish.
+        """
+        self.queue.put(None)
+        if self.is_alive():
+            self.join()
+
+    def run(self):
+        """
+        Write queued rows until closed, flushing the file every
+        flush_interval seconds.
+        """
+        flushed = time.monotonic()
+        try:
+            while True:
+                try:
+                    item = self.queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    item = (None, [])
+                if item is None:
+                    break
+                timestamp, rows = item
+                if rows:
+                    if self.file is None or self.full(rows):
+                        self.roll(rows)
+                    self.write_rows(timestamp, rows)
+                    self.rows += len(rows)
+                now = time.monotonic()
+                if self.file and now - flushed >= self.flush_interval:
+                    self.file.flush()
+                    flushed = now
+        except OSError as ex:
+            logger.error('Unable to write captured data: {}'.format(ex))
+        finally:
+            self.close_file()
+        logger.info('Captured {} rows to {}.'.format(self.rows,
+                                                     self.filenames))
+
+    def full(self, rows):
+        """
+        Return True if it's time to start a new file for the referenced rows.
+        """
+        return (self.file.tell() >= self.max_size or
+                time.monotonic() - self.opened >= self.max_age)
+
+    def roll(self, rows):
+        """
+        Close the current file (if any) and start a new one for the referenced
+        rows, named with the current time.
+        """
+        self.close_file()
+        if not os.path.exists(self.directory):
+            logger.debug('Creating directory: {}'.format(self.directory))
+            os.makedirs(self.directory)
+        name = time.strftime('%Y%m%d-%H%M%S')
+        filename = os.path.join(self.directory, name + self.extension)
+        count = 1
+        while os.path.exists(filename):
+            # Files started within a second of each other.
+            filename = os.path.join(self.directory, '{}-{}{}'.format(
+                name, count, self.extension))
+            count += 1
+        self.open_file(filename, rows)
+        self.opened = time.monotonic()
+        self.filenames.append(filename)
+        logger.info('Capturing data to {}.'.format(filename))
+
+    def open_file(self, filename, rows):
+        """
+        Open the referenced file for writing the referenced rows (and those
+        which follow).
+        """
+        self.file = open(filename, 'w', newline='')
+        self.csv_writer = csv.writer(self.file)
+
+    def write_rows(self, timestamp, rows):
+        """
+        Write the referenced rows, which arrived at the referenced time, to
+        the current file. The CSV only holds the values.
+        """
+        self.csv_writer.writerows(rows)
+
+    def close_file(self):
+        """
+        Close the current file, if there is one.
+        """
+        if self.file:
+            self.file.close()
+            self.file = None
+
+
+class BinaryCaptureWriter(CaptureWriter):
+    """
+    Writes rows of captured data to files in Mu's binary capture format,
+    which is much quicker to write and to load (see load_capture) than CSV.
+
+    A file starts with a header (see CAPTURE_HEADER) followed by the rows,
+    each a timestamp (seconds since the epoch) and the values as
+    little-endian 64-bit floats. Rows are only ever appended, so if Mu
+    crashes everything but (at worst) a partly written last row can be
+    loaded. Since all the rows in a file have the same number of values, a
+    new file is started if the number changes.
+
+    The rows added to the plotter together share the time they arrived.
+    """
+
+    extension = '.mucap'
+
+    def full(self, rows):
+        """
+        Return True if it's time to start a new file for the referenced rows.
+        """
+        return len(rows[0]) != self.columns or super().full(rows)
+
+    def open_file(self, filename, rows):
+        """
+        Open the referenced file and write the header for rows with as many
+        values as the referenced rows.
+        """
+        self.columns = len(rows[0])
+        self.file = open(filename, 'wb')
+        self.file.write(CAPTURE_HEADER.pack(CAPTURE_MAGIC, CAPTURE_VERSION,
+                                            self.columns))
+
+    def write_rows(self, timestamp, rows):
+        """
+        Append the referenced rows, stamped with the referenced time, to the
+        current file.
+        """
+        values = array.array('d')
+        for row in rows:
+            values.append(timestamp)
+            values.extend(row)
+        if sys.byteorder == 'big':
+            values.byteswap()
+        self.file.write(values.tobytes())
+
+
+#: The writer for each format the plotter's data can be captured in.
+CAPTURE_WRITERS = {
+    'csv': CaptureWriter,
+    'binary': BinaryCaptureWriter,
+}
+
+
+def load_capture(filename):
+    """
+    Return the timestamps and values of the referenced binary capture file
+    as NumPy arrays: a column of timestamps and a row of values for each
+    timestamp. The arrays are memory-mapped from the file so even long
+    captures load instantly.
+
+    Raises a ValueError if the file isn't a binary capture.
+    """
+    import numpy
+    with open(filename, 'rb') as capture_file:
+        header = capture_file.read(CAPTURE_HEADER.size)
+    if len(header) < CAPTURE_HEADER.size:
+        raise ValueError('Not a Mu capture file: {}'.format(filename))
+    magic, version, columns = CAPTURE_HEADER.unpack(header)
+    if magic != CAPTURE_MAGIC:
+        raise ValueError('Not a Mu capture file: {}'.format(filename))
+    if version != CAPTURE_VERSION:
+        raise ValueError('Unsupported capture format version {}: '
+                         '{}'.format(version, filename))
+    row_size = (columns + 1) * 8
+    # Ignore a partly written last row.
+    count = (os.path.getsize(filename) - CAPTURE_HEADER.size) // row_size
+    if count:
+        data = numpy.memmap(filename, dtype='<f8', mode='r',
+                            offset=CAPTURE_HEADER.size,
+                            shape=(count, columns + 1))
+    else:
+        # An empty file can't be memory-mapped.
+        data = numpy.zeros((0, columns + 1), dtype='<f8')
+    return data[:, 0], data[:, 1:]
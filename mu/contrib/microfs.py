@@ -9,6 +9,13 @@ You may:
 * rm - remove a named file on the device. Based on the Unix command.
 * put - copy a named local file onto the device a la equivalent FTP command.
 * get - copy a named file from the device to the local file system a la FTP.
+* sync - copy the files in a local directory which are new or have changed
+  onto the device (and optionally remove those which aren't in the directory).
+
+Each of these connects to the device, enters the raw REPL and disconnects
+again. To run several commands over the same connection (so the device is
+only reset into the raw REPL once), pass a MicrobitSession as the serial
+argument.
 """
 from __future__ import print_function
 import ast
@@ -16,15 +23,18 @@ import argparse
 import sys
 import os
 import time
+import struct
+import binascii
 import os.path
 from serial.tools.list_ports import comports as list_serial_ports
-from serial import Serial
+from serial import Serial, SerialException
 
 
 PY2 = sys.version_info < (3,)
 
 
-__all__ = ['ls', 'rm', 'put', 'get', 'get_serial']
+__all__ = ['ls', 'rm', 'put', 'get', 'sync', 'get_serial',
+           'MicrobitSession', 'ConnectionFailed']
 
 
 #: The help text to be shown when requested.
@@ -34,13 +44,166 @@ You may use the following commands:
 
 'ls' - list files on the device (based on the equivalent Unix command);
 'rm' - remove a named file on the device (based on the Unix command);
-'put' - copy a named local file onto the device just like the FTP command; and,
-'get' - copy a named file from the device to the local file system a la FTP.
+'put' - copy a named local file onto the device just like the FTP command;
+'get' - copy a named file from the device to the local file system a la FTP;
+'sync' - copy the new and changed files in a directory (by default the current
+one) onto the device, removing other files on the device if --delete is given.
 
 For example, 'ufs ls' will list the files on a connected BBC micro:bit.
 """
 
 
+#: The number of bytes the micro:bit buffers from its serial connection, so
+#: the most put sends at once before the device asks for more.
+UART_BUFFER_SIZE = 64
+
+
+#: Sent by the micro:bit when it's ready for the next chunk of a file.
+ACK = b'\x06'
+
+
+#: Starts an escaped byte in a file sent by put. CTRL-C would interrupt the
+#: device, so it (and the escape byte itself) is sent as the escape byte
+#: followed by the byte plus 64.
+ESCAPE = b'\x10'
+
+
+#: Defines a function on the device which receives a file sent by put. For
+#: each chunk it acknowledges the last, then reads a byte with the length of
+#: the chunk (plus 32, so it's never a control character) and the chunk. A
+#: chunk of length 0 ends the file. If receiving fails (including being
+#: interrupted when the session is re-synced) the partly written file is
+#: removed. The micro:bit's os module has no rename, so the file can't be
+#: received under another name and swapped in.
+RECEIVER = """
+def _mufs_recv(name):
+ from microbit import uart
+ import os
+ r = uart.read
+ fd = open(name, 'wb')
+ try:
+  while True:
+   uart.write(b'\\x06')
+   n = None
+   while not n:
+    n = r(1)
+   n = n[0] - 32
+   if not n:
+    break
+   c = b''
+   while len(c) < n:
+    d = r(n - len(c))
+    if d:
+     c += d
+   i = c.find(b'\\x10')
+   while i >= 0:
+    c = c[:i] + bytes([c[i + 1] - 64]) + c[i + 2:]
+    i = c.find(b'\\x10', i + 1)
+   fd.write(c)
+ except:
+  fd.close()
+  os.remove(name)
+  raise
+ fd.close()
+"""
+
+
+#: The number of bytes of a file get asks the device for at a time.
+GET_CHUNK_SIZE = 512
+
+
+#: How many times get asks for a chunk which arrives damaged before giving up
+#: on the connection.
+GET_RETRIES = 3
+
+
+#: Works out the table used by the device to calculate CRCs (see crc), once,
+#: when the helpers which use it are defined.
+CRC_TABLE = """
+_mufs_t = []
+for i in range(256):
+ c = i << 8
+ for j in range(8):
+  c = ((c << 1) ^ 0x1021 if c & 0x8000 else c << 1) & 0xffff
+ _mufs_t.append(c)
+"""
+
+
+#: Defines a function on the device which sends a file to get. It sends the
+#: size of the file (as a line of text) then, for each offset it's sent (as a
+#: line of text, -1 to finish), a frame of the offset (4 bytes), the length
+#: (2 bytes) and a CRC (2 bytes, see crc) of up to size bytes of the file from
+#: that offset, followed by those bytes.
+SENDER = CRC_TABLE + """
+def _mufs_send(name, size):
+ from microbit import uart
+ import os
+ r = uart.read
+ t = _mufs_t
+ try:
+  n = os.size(name)
+ except AttributeError:
+  n = os.stat(name)[6]
+ fd = open(name, 'rb')
+ p = 0
+ uart.write(str(n) + '\\n')
+ while True:
+  q = b''
+  while not q.endswith(b'\\n'):
+   d = r(1)
+   if d:
+    q += d
+  o = int(q)
+  if o < 0:
+   break
+  if o < p:
+   fd.close()
+   fd = open(name, 'rb')
+   p = 0
+  while p < o:
+   p += len(fd.read(min(size, o - p)))
+  d = fd.read(size)
+  p += len(d)
+  c = 0
+  for b in d:
+   c = ((c << 8) & 0xffff) ^ t[(c >> 8) ^ b]
+  uart.write(bytes([o >> 24, (o >> 16) & 255, (o >> 8) & 255, o & 255,
+                    len(d) >> 8, len(d) & 255, c >> 8, c & 255]) + d)
+ fd.close()
+"""
+
+
+#: Defines a function on the device which prints a dict of the size and CRC
+#: (see crc) of each file on the device, for sync to compare with the local
+#: files.
+HASHER = CRC_TABLE + """
+def _mufs_hash():
+ import os
+ t = _mufs_t
+ r = {}
+ for name in os.listdir():
+  fd = open(name, 'rb')
+  n = 0
+  c = 0
+  d = fd.read(256)
+  while d:
+   n += len(d)
+   for b in d:
+    c = ((c << 8) & 0xffff) ^ t[(c >> 8) ^ b]
+   d = fd.read(256)
+  fd.close()
+  r[name] = (n, c)
+ print(repr(r))
+"""
+
+
+class ConnectionFailed(IOError):
+    """
+    Raised when the micro:bit doesn't respond as expected, as opposed to it
+    reporting an error (e.g. there's no such file).
+    """
+
+
 def find_microbit():
     """
     Finds the port to which the device is connected.
@@ -73,17 +236,17 @@ def raw_on(serial):
     data = serial.read_until(b'raw REPL; CTRL-B to exit\r\n>')
     if not data.endswith(b'raw REPL; CTRL-B to exit\r\n>'):
         print(data)
-        raise IOError('Could not enter raw REPL.')
+        raise ConnectionFailed('Could not enter raw REPL.')
     # Soft Reset with CTRL-D
     serial.write(b'\x04')
     data = serial.read_until(b'soft reboot\r\n')
     if not data.endswith(b'soft reboot\r\n'):
         print(data)
-        raise IOError('Could not enter raw REPL.')
+        raise ConnectionFailed('Could not enter raw REPL.')
     data = serial.read_until(b'raw REPL; CTRL-B to exit\r\n>')
     if not data.endswith(b'raw REPL; CTRL-B to exit\r\n>'):
         print(data)
-        raise IOError('Could not enter raw REPL.')
+        raise ConnectionFailed('Could not enter raw REPL.')
 
 
 def raw_off(serial):
@@ -104,45 +267,181 @@ def get_serial():
     return Serial(port, 115200, timeout=1, parity='N')
 
 
+def send_commands(commands, serial):
+    """
+    Sends the commands to a micro:bit which is in raw mode and returns the
+    result.
+
+    Returns the stdout and stderr output from the micro:bit. Raises
+    ConnectionFailed if the device doesn't respond as expected (e.g. it isn't
+    in raw mode).
+    """
+    result = b''
+    err = b''
+    # Write the actual command and send CTRL-D to evaluate.
+    for command in commands:
+        command_bytes = command.encode('utf-8')
+        for i in range(0, len(command_bytes), 32):
+            serial.write(command_bytes[i:min(i + 32, len(command_bytes))])
+            time.sleep(0.01)
+        serial.write(b'\x04')
+        response = serial.read_until(b'\x04>')       # Read until prompt.
+        if not response.startswith(b'OK'):
+            raise ConnectionFailed('Unexpected response from the micro:bit.')
+        out, err = split_response(response[2:])
+        result += out
+        if err:
+            return b'', err
+    return result, err
+
+
+def split_response(response):
+    """
+    Split the rest of the raw REPL's response to a command, after the "OK",
+    into its stdout and stderr.
+
+    Raises ConnectionFailed if the response isn't complete.
+    """
+    if not (response.endswith(b'\x04>') and response.count(b'\x04') >= 2):
+        raise ConnectionFailed('Unexpected response from the micro:bit.')
+    out, err = response[:-2].split(b'\x04', 1)
+    return out, err
+
+
 def execute(commands, serial=None):
     """
     Sends the command to the connected micro:bit via serial and returns the
     result. If no serial connection is provided, attempts to autodetect the
-    device.
+    device. If the serial connection is a MicrobitSession, the commands are
+    run in that session.
 
     For this to work correctly, a particular sequence of commands needs to be
     sent to put the device into a good state to process the incoming command.
 
     Returns the stdout and stderr output from the micro:bit.
     """
+    if isinstance(serial, MicrobitSession):
+        return serial.execute(commands)
     close_serial = False
     if serial is None:
         serial = get_serial()
         close_serial = True
         time.sleep(0.1)
-    result = b''
     raw_on(serial)
     time.sleep(0.1)
-    # Write the actual command and send CTRL-D to evaluate.
-    for command in commands:
-        command_bytes = command.encode('utf-8')
-        for i in range(0, len(command_bytes), 32):
-            serial.write(command_bytes[i:min(i + 32, len(command_bytes))])
-            time.sleep(0.01)
-        serial.write(b'\x04')
-        response = serial.read_until(b'\x04>')       # Read until prompt.
-        out, err = response[2:-2].split(b'\x04', 1)  # Split stdout, stderr
-        result += out
-        if err:
-            return b'', err
-    time.sleep(0.1)
-    raw_off(serial)
-    if close_serial:
-        serial.close()
+    try:
+        result, err = send_commands(commands, serial)
+    finally:
         time.sleep(0.1)
+        raw_off(serial)
+        if close_serial:
+            serial.close()
+            time.sleep(0.1)
     return result, err
 
 
+class MicrobitSession(object):
+    """
+    A long-lived connection to a micro:bit, which is left in raw mode between
+    commands so only the first command pays for the device to be reset into
+    the raw REPL.
+
+    The connection is opened (with get_serial, unless a serial object is
+    supplied) when the first command is run. If something goes wrong with the
+    connection (ConnectionFailed or a SerialException, rather than the device
+    reporting an error) the session is re-synced: reconnected and put back
+    into raw mode, and the commands run once more.
+    """
+
+    def __init__(self, serial=None):
+        self.serial = serial
+        self.own_serial = serial is None  # Whether to close the connection.
+        self.raw = False  # Whether the device is known to be in raw mode.
+        # The names of the helper functions defined on the device (they're
+        # forgotten when it's reset into raw mode).
+        self.defined = set()
+
+    def sync(self):
+        """
+        Ensure there's a connection and the device is in raw mode.
+        """
+        if self.serial is None:
+            self.serial = get_serial()
+            time.sleep(0.1)
+        if not self.raw:
+            raw_on(self.serial)
+            time.sleep(0.1)
+            self.raw = True
+            self.defined.clear()
+
+    def run(self, operation):
+        """
+        Call the operation (without arguments) once the device is in raw mode
+        and return its result, re-syncing the session and calling it once
+        more if the connection fails.
+        """
+        try:
+            self.sync()
+            return operation()
+        except (ConnectionFailed, SerialException):
+            # Start from scratch, and if that fails give up.
+            self.reset()
+            self.sync()
+            return operation()
+
+    def execute(self, commands):
+        """
+        Sends the commands to the micro:bit and returns the result (as with
+        execute), re-syncing the session if the connection fails.
+        """
+        return self.run(lambda: send_commands(commands, self.serial))
+
+    def define(self, name, definition):
+        """
+        Define the referenced helper function on the device, unless it's
+        already been defined in this session. Returns the stderr output if
+        the definition fails.
+        """
+        if name in self.defined:
+            return b''
+        out, err = send_commands([definition], self.serial)
+        if not err:
+            self.defined.add(name)
+        return err
+
+    def reset(self):
+        """
+        Forget the state of the connection, closing it if it was opened by
+        the session.
+        """
+        self.raw = False
+        self.defined.clear()
+        if self.own_serial and self.serial is not None:
+            try:
+                self.serial.close()
+            except Exception:
+                pass
+            self.serial = None
+
+    def close(self):
+        """
+        Take the device out of raw mode and close the connection (if it was
+        opened by the session).
+        """
+        if self.raw:
+            try:
+                raw_off(self.serial)
+            except Exception:
+                pass
+        self.reset()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
 def clean_error(err):
     """
     Take stderr bytes returned from MicroPython and attempt to create a
@@ -195,6 +494,55 @@ def rm(filename, serial=None):
     return True
 
 
+def encode_file(content):
+    """
+    Escape the referenced bytes for sending to the device by put (see
+    ESCAPE).
+    """
+    return content.replace(ESCAPE, ESCAPE + b'P').replace(b'\x03',
+                                                          ESCAPE + b'C')
+
+
+def send_file(session, content, target):
+    """
+    Send the referenced bytes to the device in the referenced session, to be
+    saved as the target file. The receiver is defined on the device (if it
+    isn't already) and each chunk is only sent once the device has asked for
+    it, so its buffer never overflows.
+
+    Returns the stdout and stderr output from the micro:bit. If the transfer
+    fails, the device removes the partly written file.
+    """
+    err = session.define('_mufs_recv', RECEIVER)
+    if err:
+        return b'', err
+    serial = session.serial
+    serial.write("_mufs_recv('{}')\x04".format(target).encode('utf-8'))
+    if serial.read(2) != b'OK':
+        raise ConnectionFailed('Unexpected response from the micro:bit.')
+    data = encode_file(content)
+    position = 0
+    while True:
+        ack = serial.read(1)
+        if ack != ACK:
+            # The device has failed, in which case its error follows (and is
+            # returned), or stopped responding, in which case split_response
+            # raises ConnectionFailed.
+            break
+        chunk = data[position:position + UART_BUFFER_SIZE - 1]
+        if chunk.endswith(ESCAPE):
+            # Don't split an escaped byte between chunks. Since the byte
+            # after an escape byte is never the escape byte, it must start an
+            # escaped byte.
+            chunk = chunk[:-1]
+        serial.write(bytearray([len(chunk) + 32]) + chunk)
+        position += len(chunk)
+        if not chunk:
+            ack = b''
+            break
+    return split_response(ack + serial.read_until(b'\x04>'))
+
+
 def put(filename, target=None, serial=None):
     """
     Puts a referenced file on the LOCAL file system onto the
@@ -203,6 +551,13 @@ def put(filename, target=None, serial=None):
     If no serial object is supplied, microfs will attempt to detect the
     connection itself.
 
+    The file is streamed to the device in chunks the size of its serial
+    buffer, with the device acknowledging each chunk, rather than being sent
+    as Python literals. If the put fails the device removes what it's
+    received, rather than leaving a truncated file. Since the file is written
+    in place, an existing file of the same name is lost (the micro:bit can't
+    rename files, so it can't be replaced once the new one has arrived).
+
     Returns True for success or raises an IOError if there's a problem.
     """
     if not os.path.isfile(filename):
@@ -212,25 +567,137 @@ def put(filename, target=None, serial=None):
     filename = os.path.basename(filename)
     if target is None:
         target = filename
-    commands = [
-        "fd = open('{}', 'wb')".format(target),
-        "f = fd.write",
-    ]
-    while content:
-        line = content[:64]
-        if PY2:
-            commands.append('f(b' + repr(line) + ')')
-        else:
-            commands.append('f(' + repr(line) + ')')
-        content = content[64:]
-    commands.append('fd.close()')
-    out, err = execute(commands, serial)
+    if isinstance(serial, MicrobitSession):
+        session = serial
+    else:
+        session = MicrobitSession(serial)
+    try:
+        out, err = session.run(lambda: send_file(session, content, target))
+    finally:
+        if session is not serial:
+            session.close()
     if err:
         raise IOError(clean_error(err))
     return True
 
 
-def get(filename, target=None, serial=None):
+def crc(data):
+    """
+    Return the CRC (CRC-16/XMODEM, as worked out on the device) of the
+    referenced bytes.
+    """
+    return binascii.crc_hqx(data, 0)
+
+
+def read_bytes(serial, count):
+    """
+    Read the referenced number of bytes from the serial connection, or fewer
+    if the device stops sending them.
+    """
+    data = b''
+    while len(data) < count:
+        chunk = serial.read(count - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+def receive_chunk(serial, offset, length):
+    """
+    Ask the device (running the sender, see SENDER) for the referenced
+    length of bytes from the referenced offset of the file being got, and
+    return them once their frame is verified. A chunk which arrives damaged
+    (or not at all) is asked for again, up to GET_RETRIES times.
+
+    Raises ConnectionFailed if the chunk can't be received.
+    """
+    header = struct.pack('>IH', offset, length)
+    for attempt in range(GET_RETRIES):
+        serial.write('{}\n'.format(offset).encode('utf-8'))
+        frame = read_bytes(serial, length + 8)
+        data = frame[8:]
+        if (frame[:6] == header and len(data) == length and
+                frame[6:8] == struct.pack('>H', crc(data))):
+            return data
+        # Throw away whatever is left of the damaged frame.
+        time.sleep(0.1)
+        n = serial.inWaiting()
+        while n > 0:
+            serial.read(n)
+            n = serial.inWaiting()
+    raise ConnectionFailed('Could not get bytes {} to {} from the '
+                           'micro:bit.'.format(offset, offset + length))
+
+
+def receive_file(session, filename, chunks, progress=None):
+    """
+    Receive the referenced file from the device in the referenced session, a
+    chunk at a time, into the chunks dict (of the verified bytes from each
+    offset). Chunks already in the dict aren't asked for again, so a get
+    which is retried after the connection fails carries on where it left
+    off.
+
+    If given, progress is called with the number of bytes received so far and
+    the size of the file once the size is known and as each chunk arrives.
+
+    Returns the size of the file and the stderr output from the micro:bit.
+    """
+    err = session.define('_mufs_send', SENDER)
+    if err:
+        return 0, err
+    serial = session.serial
+    serial.write("_mufs_send('{}', {})\x04".format(
+        filename, GET_CHUNK_SIZE).encode('utf-8'))
+    if serial.read(2) != b'OK':
+        raise ConnectionFailed('Unexpected response from the micro:bit.')
+    line = serial.read_until(b'\n')
+    try:
+        size = int(line)
+    except ValueError:
+        # The device failed (e.g. there's no such file).
+        out, err = split_response(line + serial.read_until(b'\x04>'))
+        if not err:
+            raise ConnectionFailed('Unexpected response from the micro:bit.')
+        return 0, err
+    received = 0
+    if progress:
+        progress(received, size)
+    for offset in range(0, size, GET_CHUNK_SIZE):
+        length = min(GET_CHUNK_SIZE, size - offset)
+        if len(chunks.get(offset, b'')) != length:
+            chunks[offset] = receive_chunk(serial, offset, length)
+        received += length
+        if progress:
+            progress(received, size)
+    serial.write(b'-1\n')
+    out, err = split_response(serial.read_until(b'\x04>'))
+    return size, err
+
+
+def write_file(filename, content):
+    """
+    Write the referenced bytes to the referenced local file, via a temporary
+    file which replaces it once written so the file is never left half
+    written.
+    """
+    partial = filename + '.part'
+    try:
+        with open(partial, 'wb') as f:
+            f.write(content)
+        if PY2:
+            if os.path.exists(filename):
+                os.remove(filename)
+            os.rename(partial, filename)
+        else:
+            os.replace(partial, filename)
+    except Exception:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+
+
+def get(filename, target=None, serial=None, progress=None):
     """
     Gets a referenced file on the device's file system and copies it to the
     target (or current working directory if unspecified).
@@ -238,27 +705,99 @@ def get(filename, target=None, serial=None):
     If no serial object is supplied, microfs will attempt to detect the
     connection itself.
 
+    The file is sent by the device in chunks, each framed with its offset,
+    length and CRC, and any chunk which arrives damaged is asked for again.
+    The target is only written once the whole file has been received. If
+    given, progress is called with the number of bytes received so far and
+    the size of the file as each chunk arrives.
+
     Returns True for success or raises an IOError if there's a problem.
     """
     if target is None:
         target = filename
-    commands = [
-        "from microbit import uart",
-        "f = open('{}', 'rb')".format(filename),
-        "r = f.read",
-        "result = True",
-        "while result:\n result = r(32)\n if result:\n  uart.write(result)\n",
-        "f.close()",
-    ]
-    out, err = execute(commands, serial)
+    if isinstance(serial, MicrobitSession):
+        session = serial
+    else:
+        session = MicrobitSession(serial)
+    chunks = {}
+    try:
+        size, err = session.run(lambda: receive_file(session, filename,
+                                                     chunks, progress))
+    finally:
+        if session is not serial:
+            session.close()
     if err:
         raise IOError(clean_error(err))
-    # Recombine the bytes while removing "b'" from start and "'" from end.
-    with open(target, 'wb') as f:
-        f.write(out)
+    write_file(target, b''.join(chunks[offset]
+                                for offset in range(0, size, GET_CHUNK_SIZE)))
     return True
 
 
+def file_hashes(session):
+    """
+    Return a dict of the size and CRC (see crc) of each file on the device
+    in the referenced session, worked out on the device so the files aren't
+    copied to compare them.
+    """
+    def operation():
+        err = session.define('_mufs_hash', HASHER)
+        if not err:
+            out, err = send_commands(['_mufs_hash()'], session.serial)
+        if err:
+            raise IOError(clean_error(err))
+        return ast.literal_eval(out.decode('utf-8'))
+    return session.run(operation)
+
+
+def sync(directory=None, serial=None, delete=False):
+    """
+    Copy the files in the referenced LOCAL directory (or current working
+    directory if unspecified) which aren't on the micro:bit, or differ from
+    those which are, onto the micro:bit. If delete is True, files on the
+    micro:bit which aren't in the directory are removed, so it mirrors the
+    directory.
+
+    Files are compared by their size and CRC, worked out on the device, so
+    only new and changed files are copied. Hidden files and subdirectories
+    are ignored.
+
+    If no serial object is supplied, microfs will attempt to detect the
+    connection itself.
+
+    Returns a tuple of a list of the names of the files copied and a list of
+    the names of the files removed, or raises an IOError if there's a
+    problem.
+    """
+    if directory is None:
+        directory = os.getcwd()
+    local = sorted(name for name in os.listdir(directory)
+                   if not name.startswith('.') and
+                   os.path.isfile(os.path.join(directory, name)))
+    if isinstance(serial, MicrobitSession):
+        session = serial
+    else:
+        session = MicrobitSession(serial)
+    copied = []
+    removed = []
+    try:
+        remote = file_hashes(session)
+        for name in local:
+            path = os.path.join(directory, name)
+            with open(path, 'rb') as local_file:
+                content = local_file.read()
+            if tuple(remote.get(name, ())) != (len(content), crc(content)):
+                put(path, serial=session)
+                copied.append(name)
+        if delete:
+            for name in sorted(set(remote) - set(local)):
+                rm(name, session)
+                removed.append(name)
+    finally:
+        if session is not serial:
+            session.close()
+    return copied, removed
+
+
 def main(argv=None):
     """
     Entry point for the command line tool 'ufs'.
@@ -272,11 +811,15 @@ def main(argv=None):
     try:
         parser = argparse.ArgumentParser(description=_HELP_TEXT)
         parser.add_argument('command', nargs='?', default=None,
-                            help="One of 'ls', 'rm', 'put' or 'get'.")
+                            help="One of 'ls', 'rm', 'put', 'get' or "
+                            "'sync'.")
         parser.add_argument('path', nargs='?', default=None,
                             help="Use when a file needs referencing.")
         parser.add_argument('target', nargs='?', default=None,
                             help="Use to specify a target filename.")
+        parser.add_argument('--delete', action='store_true',
+                            help="With 'sync', remove files on the device "
+                            "which aren't in the directory.")
         args = parser.parse_args(argv)
         if args.command == 'ls':
             list_of_files = ls()
@@ -297,6 +840,12 @@ def main(argv=None):
                 get(args.path, args.target)
             else:
                 print('get: missing filename. (e.g. "ufs get foo.txt")')
+        elif args.command == 'sync':
+            copied, removed = sync(args.path, delete=args.delete)
+            for name in copied:
+                print('put: {}'.format(name))
+            for name in removed:
+                print('rm: {}'.format(name))
         else:
             # Display some help.
             parser.print_help()
@@ -23,13 +23,17 @@ import logging
 import os.path
 from collections import defaultdict
 from PyQt5.Qsci import QsciScintilla, QsciLexerPython, QsciAPIs
-from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtCore import Qt, pyqtSignal, QTimer
 from mu.interface.themes import Font, DayTheme
 from mu.logic import NEWLINE
 
 
 # Regular Expression for valid individual code 'words'
 RE_VALID_WORD = re.compile('^[A-Za-z0-9_-]*$')
+# Milliseconds to wait after the last edit before code_changed is emitted.
+CHECK_DELAY = 500
+# Prepared APIs (and the lexers that own them) keyed by their definitions.
+API_CACHE = {}
 
 
 logger = logging.getLogger(__name__)
@@ -58,6 +62,35 @@ class PythonLexer(QsciLexerPython):
         return ' '.join(kws)
 
 
+def prepared_api(api):
+    """
+    Return a QsciAPIs instance for the referenced API: either a list of API
+    definitions or the path to a file of definitions already compiled
+    (prepared) by utils/mkapi.py.
+
+    An instance is created the first time an API is used, by loading the
+    compiled file or by adding the definitions and preparing them (in the
+    background, by QScintilla). It's then shared by every editor pane using
+    the same API (i.e. the same mode). Each instance belongs to its own lexer
+    so it outlives the panes using it.
+    """
+    compiled = isinstance(api, str)
+    key = api if compiled else tuple(api)
+    if key not in API_CACHE:
+        lexer = PythonLexer()
+        qsci_api = QsciAPIs(lexer)
+        if compiled:
+            logger.info('Loading compiled API: {}'.format(api))
+            if not qsci_api.loadPrepared(api):
+                logger.error('Could not load compiled API: {}'.format(api))
+        else:
+            for entry in api:
+                qsci_api.add(entry)
+            qsci_api.prepare()
+        API_CACHE[key] = (lexer, qsci_api)
+    return API_CACHE[key][1]
+
+
 class EditorPane(QsciScintilla):
     """
     Represents the text editor.
@@ -65,6 +98,8 @@ class EditorPane(QsciScintilla):
 
     # Signal fired when a script or hex is droped on this editor
     open_file = pyqtSignal(str)
+    # Signal fired when the text has stopped changing for CHECK_DELAY ms.
+    code_changed = pyqtSignal()
 
     def __init__(self, path, text, newline=NEWLINE):
         super().__init__()
@@ -88,6 +123,12 @@ class EditorPane(QsciScintilla):
         self.has_annotations = False
         self.setModified(False)
         self.breakpoint_lines = set()
+        # Debounce edits so code_changed is only emitted when typing pauses.
+        self.check_timer = QTimer(self)
+        self.check_timer.setSingleShot(True)
+        self.check_timer.setInterval(CHECK_DELAY)
+        self.check_timer.timeout.connect(self.code_changed)
+        self.textChanged.connect(self.check_timer.start)
         self.configure()
 
     def dropEvent(self, event):
@@ -194,14 +235,13 @@ class EditorPane(QsciScintilla):
         self.setUnmatchedBraceBackgroundColor(theme.UnmatchedBraceBackground)
         self.setUnmatchedBraceForegroundColor(theme.UnmatchedBraceForeground)
 
-    def set_api(self, api_definitions):
+    def set_api(self, api):
         """
-        Sets the API entries for tooltips, calltips and the like.
+        Sets the API entries for tooltips, calltips and the like, given a list
+        of API definitions or the path to a file of compiled definitions.
         """
-        self.api = QsciAPIs(self.lexer)
-        for entry in api_definitions:
-            self.api.add(entry)
-        self.api.prepare()
+        self.api = prepared_api(api)
+        self.lexer.setAPIs(self.api)
 
     @property
     def label(self):
@@ -235,14 +275,94 @@ class EditorPane(QsciScintilla):
         """
         Clears all the text indicators related to the check code functionality.
         """
-        for indicator in self.check_indicators:
-            for _, markers in \
-                    self.check_indicators[indicator]['markers'].items():
-                line_no = markers[0]['line_no']  # All markers on same line.
-                self.clearIndicatorRange(
-                    line_no, 0, line_no, 999999,
-                    self.check_indicators[indicator]['id'])
-            self.check_indicators[indicator]['markers'] = {}
+        for indicator in self.check_indicators.values():
+            self.SendScintilla(self.SCI_SETINDICATORCURRENT, indicator['id'])
+            self.SendScintilla(self.SCI_INDICATORCLEARRANGE, 0, self.length())
+            indicator['markers'] = {}
+
+    def indicator_lines(self, indicator_id):
+        """
+        Return the set of lines on which the referenced indicator is shown.
+        """
+        lines = set()
+        length = self.length()
+        position = 0
+        while position < length:
+            end = self.SendScintilla(self.SCI_INDICATOREND, indicator_id,
+                                     position)
+            if end <= position:
+                break
+            if self.SendScintilla(self.SCI_INDICATORVALUEAT, indicator_id,
+                                  position):
+                first = self.SendScintilla(self.SCI_LINEFROMPOSITION,
+                                           position)
+                last = self.SendScintilla(self.SCI_LINEFROMPOSITION, end - 1)
+                lines.update(range(first, last + 1))
+            position = end
+        return lines
+
+    def clear_indicator_line(self, line, indicator_id):
+        """
+        Clears the referenced indicator from the whole of the line (using
+        positions since clearIndicatorRange counts indexes a character at a
+        time).
+        """
+        start = self.SendScintilla(self.SCI_POSITIONFROMLINE, line)
+        end = self.SendScintilla(self.SCI_POSITIONFROMLINE, line + 1)
+        if end < start:
+            end = self.length()  # The last line.
+        self.SendScintilla(self.SCI_SETINDICATORCURRENT, indicator_id)
+        self.SendScintilla(self.SCI_INDICATORCLEARRANGE, start, end - start)
+
+    def update_check_annotations(self, feedback):
+        """
+        Given a dict of feedback for each type of check indicator (e.g.
+        'error' and 'style'), update the indicators and annotations in place.
+
+        Only the lines that are, or should be, marked are touched and
+        annotations are only changed if their text differs, so re-checking a
+        large script doesn't redraw everything.
+        """
+        lines = defaultdict(list)
+        for annotation_type, indicator in self.check_indicators.items():
+            markers = feedback.get(annotation_type) or {}
+            indicator['markers'] = dict(markers)
+            ranges = defaultdict(list)
+            for line_no, messages in markers.items():
+                for message in messages:
+                    lines[message['line_no']].append('\u2191 ' +
+                                                     message['message'])
+                    col = message.get('column', 0)
+                    if col:
+                        ranges[line_no].append((col - 1, col + 1))
+            for line_no in self.indicator_lines(indicator['id']):
+                self.clear_indicator_line(line_no, indicator['id'])
+            for line_no, columns in ranges.items():
+                for col_start, col_end in columns:
+                    self.fillIndicatorRange(line_no, col_start, line_no,
+                                            col_end, indicator['id'])
+        texts = {line: '\n'.join(messages).strip()
+                 for line, messages in lines.items()}
+        for line in range(self.lines()):
+            text = texts.get(line)
+            if text:
+                if self.annotation_text(line) != text:
+                    self.annotate(line, text, self.annotationDisplay())
+            elif self.SendScintilla(self.SCI_ANNOTATIONGETLINES, line):
+                self.clearAnnotations(line)
+
+    def annotation_text(self, line):
+        """
+        Return the text of the annotation on the referenced line. It's read
+        directly since some versions of QsciScintilla.annotation don't return
+        the annotation's text.
+        """
+        size = self.SendScintilla(self.SCI_ANNOTATIONGETTEXT, line, None)
+        if not size:
+            return ''
+        buffer = bytearray(size + 1)
+        self.SendScintilla(self.SCI_ANNOTATIONGETTEXT, line, buffer)
+        return buffer[:size].decode('utf-8')
 
     def reset_search_indicators(self):
         """
@@ -0,0 +1,91 @@
+"""
+Contains the Jupyter based REPL pane used by Python 3 mode.
+
+It's in its own module since qtconsole (and so Jupyter and IPython) take a
+long time to import, so they're only imported once the REPL is needed.
+
+Copyright (c) 2015-2017 Nicholas H.Tollervey and others (see the AUTHORS file).
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+from PyQt5.QtCore import pyqtSignal
+from qtconsole.rich_jupyter_widget import RichJupyterWidget
+from mu.interface.themes import (DEFAULT_FONT_SIZE, NIGHT_STYLE, DAY_STYLE,
+                                 CONTRAST_STYLE)
+
+
+class JupyterREPLPane(RichJupyterWidget):
+    """
+    REPL = Read, Evaluate, Print, Loop.
+
+    Displays a Jupyter iPython session.
+    """
+
+    on_append_text = pyqtSignal(bytes)
+
+    def __init__(self, theme='day', parent=None):
+        super().__init__(parent)
+        self.set_theme(theme)
+        self.console_height = 10
+
+    def _append_plain_text(self, text, *args, **kwargs):
+        super()._append_plain_text(text, *args, **kwargs)
+        self.on_append_text.emit(text.encode('utf-8'))
+
+    def set_font_size(self, new_size=DEFAULT_FONT_SIZE):
+        """
+        Sets the font size for all the textual elements in this pane.
+        """
+        stylesheet = ("QWidget{font-size: " + str(new_size) +
+                      "pt; font-family: Monospace;}")
+        self.setStyleSheet(stylesheet)
+
+    def zoomIn(self, delta=2):
+        """
+        Zoom in (increase) the size of the font by delta amount difference in
+        point size upto 34 points.
+        """
+        old_size = self.font.pointSize()
+        new_size = min(old_size + delta, 34)
+        self.set_font_size(new_size)
+
+    def zoomOut(self, delta=2):
+        """
+        Zoom out (decrease) the size of the font by delta amount difference in
+        point size down to 4 points.
+        """
+        old_size = self.font.pointSize()
+        new_size = max(old_size - delta, 4)
+        self.set_font_size(new_size)
+
+    def set_theme(self, theme):
+        """
+        Sets the theme / look for the REPL pane.
+        """
+        if theme == 'contrast':
+            self.set_default_style(colors='nocolor')
+            self.setStyleSheet(CONTRAST_STYLE)
+        elif theme == 'night':
+            self.set_default_style(colors='nocolor')
+            self.setStyleSheet(NIGHT_STYLE)
+        else:
+            self.set_default_style()
+            self.setStyleSheet(DAY_STYLE)
+
+    def setFocus(self):
+        """
+        Override base setFocus so the focus happens to the embedded _control
+        within this widget.
+        """
+        self._control.setFocus()
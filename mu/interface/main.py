@@ -18,24 +18,24 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 import sys
 import logging
-import serial
 import os.path
-from PyQt5.QtCore import QSize, Qt, pyqtSignal, QTimer, QIODevice
+from PyQt5.QtCore import QSize, Qt, pyqtSignal, QTimer, QThread
 from PyQt5.QtWidgets import (QToolBar, QAction, QDesktopWidget, QWidget,
                              QVBoxLayout, QTabWidget, QFileDialog, QMessageBox,
                              QLabel, QMainWindow, QStatusBar, QDockWidget,
                              QShortcut)
 from PyQt5.QtGui import QKeySequence, QStandardItemModel, QStandardItem
-from PyQt5.QtSerialPort import QSerialPort
 from mu import __version__
 from mu.interface.dialogs import ModeSelector, AdminDialog
 from mu.interface.themes import (DayTheme, NightTheme, ContrastTheme,
                                  DEFAULT_FONT_SIZE, DAY_STYLE, NIGHT_STYLE,
                                  CONTRAST_STYLE)
 from mu.interface.panes import (DebugInspector, PythonProcessPane,
-                                JupyterREPLPane, MicroPythonREPLPane,
-                                FileSystemPane, PlotterPane)
+                                MicroPythonREPLPane, FileSystemPane,
+                                PlotterPane, ScrollbackPane,
+                                get_scrollback_log)
 from mu.interface.editor import EditorPane
+from mu.logic import DeviceWatcher, SerialLink, SCROLLBACK_LINES
 from mu.resources import load_icon, load_pixmap
 
 
@@ -138,6 +138,9 @@ class FileTabs(QTabWidget):
     Extend the base class so we can override the removeTab behaviour.
     """
 
+    # Emitted with the tab (the editor widget) once it's been closed.
+    tab_closed = pyqtSignal(object)
+
     def __init__(self):
         super(FileTabs, self).__init__()
         self.setTabsClosable(True)
@@ -149,13 +152,15 @@ class FileTabs(QTabWidget):
         Ask the user before closing the file.
         """
         window = self.nativeParentWidget()
-        modified = self.widget(tab_id).isModified()
+        tab = self.widget(tab_id)
+        modified = tab.isModified()
         if modified:
             msg = ('There is un-saved work, closing the tab will cause you '
                    'to lose it.')
             if window.show_confirmation(msg) == QMessageBox.Cancel:
                 return
         super(FileTabs, self).removeTab(tab_id)
+        self.tab_closed.emit(tab)
 
     def change_tab(self, tab_id):
         """
@@ -179,9 +184,12 @@ class Window(QMainWindow):
     icon = "icon"
     timer = None
     usb_checker = None
+    checker_thread = None
     serial = None
     repl = None
     plotter = None
+    scrollback = SCROLLBACK_LINES
+    scrollback_log = None
 
     _zoom_in = pyqtSignal(int)
     _zoom_out = pyqtSignal(int)
@@ -189,6 +197,8 @@ class Window(QMainWindow):
     write_to_serial = pyqtSignal(bytes)
     data_received = pyqtSignal(bytes)
     open_file = pyqtSignal(str)
+    code_changed = pyqtSignal(object)
+    tab_closed = pyqtSignal(object)
 
     def zoom_in(self):
         """
@@ -275,6 +285,11 @@ class Window(QMainWindow):
             # Bubble the signal up
             self.open_file.emit(file)
 
+        @new_tab.code_changed.connect
+        def on_code_changed():
+            # Bubble the signal up with a reference to the changed tab.
+            self.code_changed.emit(new_tab)
+
         self.tabs.setCurrentIndex(new_tab_index)
         self.connect_zoom(new_tab)
         self.set_theme(self.theme)
@@ -313,14 +328,12 @@ class Window(QMainWindow):
                 return True
         return False
 
-    def on_serial_read(self):
+    def on_serial_read(self, data):
         """
-        Called when the connected device is ready to send data via the serial
-        connection. It reads all the available data, emits the data_received
-        signal with the received bytes and, if appropriate, emits the
-        tuple_received signal with the tuple created from the bytes received.
+        Called with the data read from the connected device via the serial
+        connection (see SerialLink). It emits the data_received signal with
+        the received bytes.
         """
-        data = bytes(self.serial.readAll())  # get all the available bytes.
         self.data_received.emit(data)
 
     def on_stdout_write(self, data):
@@ -331,26 +344,12 @@ class Window(QMainWindow):
 
     def open_serial_link(self, port):
         """
-        Creates a new serial link instance.
-        """
-        self.input_buffer = []
-        self.serial = QSerialPort()
-        self.serial.setPortName(port)
-        if self.serial.open(QIODevice.ReadWrite):
-            self.serial.dataTerminalReady = True
-            if not self.serial.isDataTerminalReady():
-                # Using pyserial as a 'hack' to open the port and set DTR
-                # as QtSerial does not seem to work on some Windows :(
-                # See issues #281 and #302 for details.
-                self.serial.close()
-                pyser = serial.Serial(port)  # open serial port w/pyserial
-                pyser.dtr = True
-                pyser.close()
-                self.serial.open(QIODevice.ReadWrite)
-            self.serial.setBaudRate(115200)
-            self.serial.readyRead.connect(self.on_serial_read)
-        else:
-            raise IOError("Cannot connect to device on port {}".format(port))
+        Creates a new serial link instance, which reads from the device in the
+        background. Raises an IOError if the port can't be opened.
+        """
+        self.serial = SerialLink(port)
+        self.serial.data_received.connect(self.on_serial_read)
+        self.serial.start()
 
     def close_serial_link(self):
         """
@@ -373,18 +372,23 @@ class Window(QMainWindow):
         self.fs_pane.setFocus()
         file_manager.on_list_files.connect(self.fs_pane.on_ls)
         self.fs_pane.list_files.connect(file_manager.ls)
-        self.fs_pane.microbit_fs.put.connect(file_manager.put)
-        self.fs_pane.microbit_fs.delete.connect(file_manager.delete)
+        self.fs_pane.microbit_fs.put.connect(file_manager.put_files)
+        self.fs_pane.microbit_fs.delete.connect(file_manager.delete_files)
         self.fs_pane.microbit_fs.list_files.connect(file_manager.ls)
-        self.fs_pane.local_fs.get.connect(file_manager.get)
+        self.fs_pane.local_fs.get.connect(file_manager.get_files)
         self.fs_pane.local_fs.list_files.connect(file_manager.ls)
+        self.fs_pane.sync.connect(file_manager.sync)
         file_manager.on_put_file.connect(self.fs_pane.microbit_fs.on_put)
         file_manager.on_delete_file.connect(self.fs_pane.microbit_fs.on_delete)
         file_manager.on_get_file.connect(self.fs_pane.local_fs.on_get)
+        file_manager.on_get_progress.connect(
+            self.fs_pane.local_fs.on_get_progress)
         file_manager.on_list_fail.connect(self.fs_pane.on_ls_fail)
         file_manager.on_put_fail.connect(self.fs_pane.on_put_fail)
         file_manager.on_delete_fail.connect(self.fs_pane.on_delete_fail)
         file_manager.on_get_fail.connect(self.fs_pane.on_get_fail)
+        file_manager.on_sync.connect(self.fs_pane.on_sync)
+        file_manager.on_sync_fail.connect(self.fs_pane.on_sync_fail)
         self.connect_zoom(self.fs_pane)
         return self.fs_pane
 
@@ -400,10 +404,11 @@ class Window(QMainWindow):
                 # Send a Control-C / keyboard interrupt.
                 self.serial.write(b'\x03')
         repl_pane = MicroPythonREPLPane(serial=self.serial, theme=self.theme)
+        repl_pane.set_scrollback(self.scrollback, self.scrollback_log)
         self.data_received.connect(repl_pane.process_bytes)
         self.add_repl(repl_pane, name)
 
-    def add_micropython_plotter(self, port, name, mode):
+    def add_micropython_plotter(self, port, name):
         """
         Adds a plotter that reads data from a serial connection.
         """
@@ -411,10 +416,9 @@ class Window(QMainWindow):
             self.open_serial_link(port)
         plotter_pane = PlotterPane(theme=self.theme)
         self.data_received.connect(plotter_pane.process_bytes)
-        plotter_pane.data_flood.connect(mode.on_data_flood)
         self.add_plotter(plotter_pane, name)
 
-    def add_python3_plotter(self, mode):
+    def add_python3_plotter(self):
         """
         Add a plotter that reads from either the REPL or a running script.
         Since this function will only be called when either the REPL or a
@@ -423,13 +427,13 @@ class Window(QMainWindow):
         """
         plotter_pane = PlotterPane(theme=self.theme)
         self.data_received.connect(plotter_pane.process_bytes)
-        plotter_pane.data_flood.connect(mode.on_data_flood)
         self.add_plotter(plotter_pane, _('Python3 data tuple'))
 
     def add_jupyter_repl(self, kernel_manager, kernel_client):
         """
         Adds a Jupyter based REPL pane to the application.
         """
+        from mu.interface.jupyter import JupyterREPLPane
         kernel_manager.kernel.gui = 'qt4'
         kernel_client.start_channels()
         ipython_widget = JupyterREPLPane(theme=self.theme)
@@ -500,6 +504,8 @@ class Window(QMainWindow):
         Python runtime used to launch the child process.
         """
         self.process_runner = PythonProcessPane(self)
+        self.process_runner.set_scrollback(self.scrollback,
+                                           self.scrollback_log)
         self.runner = QDockWidget(_("Running: {}").format(
                                   os.path.basename(script_name)))
         self.runner.setWidget(self.process_runner)
@@ -659,6 +665,24 @@ class Window(QMainWindow):
         if hasattr(self, 'plotter') and self.plotter:
             self.plotter_pane.set_theme(theme)
 
+    def set_scrollback(self, lines, log_file=None):
+        """
+        Sets how many lines of output the REPL and runner panes keep. If
+        there's a log_file, the lines trimmed from the panes are written to
+        it.
+        """
+        self.scrollback = lines
+        self.scrollback_log = None
+        if log_file:
+            self.scrollback_log = get_scrollback_log(log_file)
+        panes = []
+        if self.repl and isinstance(self.repl_pane, ScrollbackPane):
+            panes.append(self.repl_pane)
+        if hasattr(self, 'runner') and self.runner:
+            panes.append(self.process_runner)
+        for pane in panes:
+            pane.set_scrollback(self.scrollback, self.scrollback_log)
+
     def show_admin(self, log, settings, theme):
         """
         Display the administrative dialog with referenced content of the log
@@ -743,8 +767,8 @@ class Window(QMainWindow):
         h = int(screen.height() * 0.8)
         self.resize(w, h)
         size = self.geometry()
-        self.move((screen.width() - size.width()) / 2,
-                  (screen.height() - size.height()) / 2)
+        self.move((screen.width() - size.width()) // 2,
+                  (screen.height() - size.height()) // 2)
 
     def reset_annotations(self):
         """
@@ -788,6 +812,7 @@ class Window(QMainWindow):
         self.button_bar = ButtonBar(self.widget)
         self.tabs = FileTabs()
         self.tabs.setMovable(True)
+        self.tabs.tab_closed.connect(self.tab_closed)
         self.setCentralWidget(self.tabs)
         self.status_bar = StatusBar(parent=self)
         self.setStatusBar(self.status_bar)
@@ -821,18 +846,47 @@ class Window(QMainWindow):
         """
         self.button_bar.change_mode(mode)
         # Update the autocomplete / tooltip APIs for each tab to the new mode.
-        api = mode.api()
+        api = mode.api_source()
         for widget in self.widgets:
             widget.set_api(api)
 
     def set_usb_checker(self, duration, callback):
         """
-        Sets up a timer that polls for USB changes via the "callback" every
-        "duration" seconds.
+        Starts watching (in the background) for USB devices being attached or
+        removed, calling "callback" when the available ports change. Where
+        there are no hotplug events the ports are polled every "duration"
+        seconds.
+        """
+        self.usb_checker = DeviceWatcher(duration)
+        self.usb_checker.on_changed.connect(callback)
+        self.usb_checker.start()
+
+    def stop_usb_checker(self):
+        """
+        Stop watching for USB devices.
+        """
+        if self.usb_checker:
+            self.usb_checker.stop()
+            self.usb_checker = None
+
+    def set_code_checker(self, checker):
+        """
+        Moves the referenced code checker into its own thread so checking code
+        doesn't block the UI.
+        """
+        self.checker_thread = QThread(self)
+        checker.moveToThread(self.checker_thread)
+        self.checker_thread.start()
+
+    def stop_code_checker(self):
+        """
+        Stop the code checker's thread (waiting for any check in progress to
+        finish).
         """
-        self.usb_checker = QTimer()
-        self.usb_checker.timeout.connect(callback)
-        self.usb_checker.start(duration * 1000)
+        if self.checker_thread:
+            self.checker_thread.quit()
+            self.checker_thread.wait()
+            self.checker_thread = None
 
     def set_timer(self, duration, callback):
         """
@@ -18,21 +18,23 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 import sys
 import os
-import re
 import platform
 import logging
+import math
+import time
+from logging.handlers import RotatingFileHandler
 import signal
 import string
 import bisect
+import itertools
 import os.path
 import mu
 from PyQt5.QtCore import Qt, QProcess, QProcessEnvironment, pyqtSignal, QTimer
-from collections import deque
 from PyQt5.QtWidgets import (QMessageBox, QTextEdit, QFrame, QListWidget,
                              QGridLayout, QLabel, QMenu, QApplication,
-                             QTreeView)
+                             QTreeView, QPushButton, QCheckBox)
 from PyQt5.QtGui import QKeySequence, QTextCursor, QCursor, QPainter
-from qtconsole.rich_jupyter_widget import RichJupyterWidget
+from mu.interface.terminal import TerminalDecoder
 from mu.interface.themes import Font
 from mu.interface.themes import (DEFAULT_FONT_SIZE, NIGHT_STYLE, DAY_STYLE,
                                  CONTRAST_STYLE)
@@ -50,73 +52,84 @@ except ImportError:  # pragma: no cover
     CHARTS = False
 
 
-class JupyterREPLPane(RichJupyterWidget):
-    """
-    REPL = Read, Evaluate, Print, Loop.
+#: The minimum time (in milliseconds) between updates of the REPL pane, so
+#: output from a chatty device is displayed at most once per frame.
+REPL_FRAME_INTERVAL = 16
 
-    Displays a Jupyter iPython session.
-    """
 
-    on_append_text = pyqtSignal(bytes)
-
-    def __init__(self, theme='day', parent=None):
-        super().__init__(parent)
-        self.set_theme(theme)
-        self.console_height = 10
+#: The size (in bytes) at which the log of trimmed output is rotated, and how
+#: many old logs are kept.
+SCROLLBACK_LOG_SIZE = 1024 * 1024
+SCROLLBACK_LOG_COUNT = 5
 
-    def _append_plain_text(self, text, *args, **kwargs):
-        super()._append_plain_text(text, *args, **kwargs)
-        self.on_append_text.emit(text.encode('utf-8'))
 
-    def set_font_size(self, new_size=DEFAULT_FONT_SIZE):
-        """
-        Sets the font size for all the textual elements in this pane.
-        """
-        stylesheet = ("QWidget{font-size: " + str(new_size) +
-                      "pt; font-family: Monospace;}")
-        self.setStyleSheet(stylesheet)
+def get_scrollback_log(filename):
+    """
+    Return a logger which writes the output trimmed from the REPL and runner
+    panes to the referenced file, rotating it as it grows.
+    """
+    log_dir = os.path.dirname(filename)
+    if not os.path.exists(log_dir):
+        os.makedirs(log_dir)
+    handler = RotatingFileHandler(filename, maxBytes=SCROLLBACK_LOG_SIZE,
+                                  backupCount=SCROLLBACK_LOG_COUNT,
+                                  encoding='utf-8', delay=True)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    log = logging.getLogger('mu.scrollback')
+    log.setLevel(logging.INFO)
+    log.propagate = False  # Keep the output out of Mu's own log.
+    for old_handler in log.handlers[:]:
+        log.removeHandler(old_handler)
+        old_handler.close()
+    log.addHandler(handler)
+    return log
+
+
+class ScrollbackPane(QTextEdit):
+    """
+    A text pane displaying output, which can be set to only keep the last
+    scrollback lines so its memory use (and the cost of adding to it) doesn't
+    keep growing however long it runs.
 
-    def zoomIn(self, delta=2):
-        """
-        Zoom in (increase) the size of the font by delta amount difference in
-        point size upto 34 points.
-        """
-        old_size = self.font.pointSize()
-        new_size = min(old_size + delta, 34)
-        self.set_font_size(new_size)
+    If there's a scrollback_log (see get_scrollback_log) the lines trimmed
+    from the start are written to it.
+    """
 
-    def zoomOut(self, delta=2):
-        """
-        Zoom out (decrease) the size of the font by delta amount difference in
-        point size down to 4 points.
-        """
-        old_size = self.font.pointSize()
-        new_size = max(old_size - delta, 4)
-        self.set_font_size(new_size)
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.scrollback = None  # Keep everything until set_scrollback.
+        self.scrollback_log = None
 
-    def set_theme(self, theme):
+    def set_scrollback(self, lines, log=None):
         """
-        Sets the theme / look for the REPL pane.
+        Set how many lines to keep and where to log those which are trimmed.
         """
-        if theme == 'contrast':
-            self.set_default_style(colors='nocolor')
-            self.setStyleSheet(CONTRAST_STYLE)
-        elif theme == 'night':
-            self.set_default_style(colors='nocolor')
-            self.setStyleSheet(NIGHT_STYLE)
-        else:
-            self.set_default_style()
-            self.setStyleSheet(DAY_STYLE)
+        self.scrollback = lines
+        self.scrollback_log = log
+        self.trim_scrollback()
 
-    def setFocus(self):
+    def trim_scrollback(self):
         """
-        Override base setFocus so the focus happens to the embedded _control
-        within this widget.
+        Remove the oldest lines beyond the scrollback limit (if the limit is
+        0 or None, all the lines are kept).
         """
-        self._control.setFocus()
+        if not self.scrollback:
+            return
+        document = self.document()
+        excess = document.blockCount() - self.scrollback
+        if excess <= 0:
+            return
+        cursor = QTextCursor(document)
+        cursor.movePosition(QTextCursor.NextBlock, QTextCursor.KeepAnchor,
+                            excess)
+        if self.scrollback_log:
+            # Lines are separated by the unicode paragraph separator.
+            text = cursor.selectedText().replace('\u2029', '\n')
+            self.scrollback_log.info(text[:-1])
+        cursor.removeSelectedText()
 
 
-class MicroPythonREPLPane(QTextEdit):
+class MicroPythonREPLPane(ScrollbackPane):
     """
     REPL = Read, Evaluate, Print, Loop.
 
@@ -137,6 +150,13 @@ class MicroPythonREPLPane(QTextEdit):
         self.customContextMenuRequested.connect(self.context_menu)
         self.setObjectName('replpane')
         self.set_theme(theme)
+        # Bytes received from the device but not yet displayed.
+        self.pending = bytearray()
+        self.decoder = TerminalDecoder()
+        self.render_timer = QTimer(self)
+        self.render_timer.setSingleShot(True)
+        self.render_timer.setInterval(REPL_FRAME_INTERVAL)
+        self.render_timer.timeout.connect(self.render)
 
     def paste(self):
         """
@@ -222,61 +242,58 @@ class MicroPythonREPLPane(QTextEdit):
 
     def process_bytes(self, data):
         """
-        Given some incoming bytes of data, work out how to handle / display
-        them in the REPL widget.
+        Given some incoming bytes of data, queue them to be displayed in the
+        REPL widget.
+
+        Rather than updating the widget for every chunk of bytes received, the
+        data is collected and rendered at most once per REPL_FRAME_INTERVAL
+        milliseconds.
+        """
+        self.pending.extend(data)
+        if not self.render_timer.isActive():
+            self.render_timer.start()
+
+    def render(self):
+        """
+        Work out how to handle / display the data received since the last
+        render in the REPL widget, applying it as a single edit.
         """
+        if not self.pending:
+            return
+        data = bytes(self.pending)
+        self.pending.clear()
         tc = self.textCursor()
+        tc.beginEditBlock()
         # The text cursor must be on the last line of the document. If it isn't
         # then move it there.
         while tc.movePosition(QTextCursor.Down):
             pass
-        i = 0
-        while i < len(data):
-            if data[i] == 8:  # \b
-                tc.movePosition(QTextCursor.Left)
-                self.setTextCursor(tc)
-            elif data[i] == 13:  # \r
-                pass
-            elif data[i] == 27 and data[i + 1] == 91:  # VT100 cursor: <Esc>[
-                i += 2  # move index to after the [
-                m = re.search(r'(?P<count>[\d]*)(?P<action>[ABCDK])',
-                              data[i:].decode('utf-8'))
-
-                # move to (almost) after control seq (will ++ at end of loop)
-                i += m.end() - 1
-
-                if m.group("count") == '':
-                    count = 1
-                else:
-                    count = int(m.group("count"))
-
-                if m.group("action") == "A":  # up
-                    tc.movePosition(QTextCursor.Up, n=count)
-                    self.setTextCursor(tc)
-                elif m.group("action") == "B":  # down
-                    tc.movePosition(QTextCursor.Down, n=count)
-                    self.setTextCursor(tc)
-                elif m.group("action") == "C":  # right
-                    tc.movePosition(QTextCursor.Right, n=count)
-                    self.setTextCursor(tc)
-                elif m.group("action") == "D":  # left
-                    tc.movePosition(QTextCursor.Left, n=count)
-                    self.setTextCursor(tc)
-                elif m.group("action") == "K":  # delete things
-                    if m.group("count") == "":  # delete to end of line
-                        tc.movePosition(QTextCursor.EndOfLine,
-                                        mode=QTextCursor.KeepAnchor)
-                        tc.removeSelectedText()
-                        self.setTextCursor(tc)
-            elif data[i] == 10:  # \n
+        for action, arg in self.decoder.decode(data):
+            if action == 'text':
+                # Overwrite whatever follows the cursor with the text.
+                tc.movePosition(QTextCursor.NextCharacter,
+                                QTextCursor.KeepAnchor, len(arg))
+                tc.insertText(arg)
+            elif action == 'newline':
                 tc.movePosition(QTextCursor.End)
-                self.setTextCursor(tc)
-                self.insertPlainText(chr(data[i]))
-            else:
-                tc.deleteChar()
-                self.setTextCursor(tc)
-                self.insertPlainText(chr(data[i]))
-            i += 1
+                tc.insertText('\n')
+            elif action == 'backspace':
+                tc.movePosition(QTextCursor.Left)
+            elif action == 'up':
+                tc.movePosition(QTextCursor.Up, n=arg)
+            elif action == 'down':
+                tc.movePosition(QTextCursor.Down, n=arg)
+            elif action == 'right':
+                tc.movePosition(QTextCursor.Right, n=arg)
+            elif action == 'left':
+                tc.movePosition(QTextCursor.Left, n=arg)
+            elif action == 'erase':  # delete to end of line
+                tc.movePosition(QTextCursor.EndOfLine,
+                                mode=QTextCursor.KeepAnchor)
+                tc.removeSelectedText()
+        tc.endEditBlock()
+        self.setTextCursor(tc)
+        self.trim_scrollback()
         self.ensureCursorVisible()
 
     def clear(self):
@@ -307,34 +324,58 @@ class MuFileList(QListWidget):
         msg.setStandardButtons(QMessageBox.Ok | QMessageBox.Cancel)
         return msg.exec_() == QMessageBox.Ok
 
+    def selected_files(self):
+        """
+        Return the names of the selected files, in the order they're listed.
+        """
+        return [self.item(i).text() for i in range(self.count())
+                if self.item(i).isSelected()]
+
+    def files_to_copy(self, source):
+        """
+        Return the names of the files selected in the referenced list, which
+        are being dropped onto this one. If any of them already exist here
+        and the user doesn't want to overwrite them, return an empty list.
+        """
+        filenames = source.selected_files()
+        file_exists = any(self.findItems(filename, Qt.MatchExactly)
+                          for filename in filenames)
+        if file_exists and not self.show_confirm_overwrite_dialog():
+            return []
+        return filenames
+
 
 class MicrobitFileList(MuFileList):
     """
     Represents a list of files on the micro:bit.
     """
 
-    put = pyqtSignal(str)
-    delete = pyqtSignal(str)
+    put = pyqtSignal(list)
+    delete = pyqtSignal(list)
 
     def __init__(self, home):
         super().__init__()
         self.home = home
         self.setDragDropMode(QListWidget.DragDrop)
+        self.setSelectionMode(QListWidget.ExtendedSelection)
 
     def dropEvent(self, event):
         source = event.source()
         if isinstance(source, LocalFileList):
-            file_exists = self.findItems(source.currentItem().text(),
-                                         Qt.MatchExactly)
-            if not file_exists or \
-                    file_exists and self.show_confirm_overwrite_dialog():
+            filenames = self.files_to_copy(source)
+            if filenames:
                 self.disable.emit()
-                local_filename = os.path.join(self.home,
-                                              source.currentItem().text())
-                msg = _("Copying '{}' to micro:bit.").format(local_filename)
+                local_filenames = [os.path.join(self.home, filename)
+                                   for filename in filenames]
+                if len(local_filenames) == 1:
+                    msg = _("Copying '{}' to micro:bit.").format(
+                        local_filenames[0])
+                else:
+                    msg = _("Copying {} files to micro:bit.").format(
+                        len(local_filenames))
                 logger.info(msg)
                 self.set_message.emit(msg)
-                self.put.emit(local_filename)
+                self.put.emit(local_filenames)
 
     def on_put(self, microbit_file):
         """
@@ -342,20 +383,26 @@ class MicrobitFileList(MuFileList):
         """
         msg = _("'{}' successfully copied to micro:bit.").format(microbit_file)
         self.set_message.emit(msg)
-        self.list_files.emit()
 
     def contextMenuEvent(self, event):
         menu = QMenu(self)
         delete_action = menu.addAction(_("Delete (cannot be undone)"))
         action = menu.exec_(self.mapToGlobal(event.pos()))
         if action == delete_action:
+            microbit_filenames = self.selected_files()
+            if not microbit_filenames:
+                return
             self.disable.emit()
-            microbit_filename = self.currentItem().text()
-            logger.info("Deleting {}".format(microbit_filename))
-            msg = _("Deleting '{}' from micro:bit.").format(microbit_filename)
+            logger.info("Deleting {}".format(microbit_filenames))
+            if len(microbit_filenames) == 1:
+                msg = _("Deleting '{}' from micro:bit.").format(
+                    microbit_filenames[0])
+            else:
+                msg = _("Deleting {} files from micro:bit.").format(
+                    len(microbit_filenames))
             logger.info(msg)
             self.set_message.emit(msg)
-            self.delete.emit(microbit_filename)
+            self.delete.emit(microbit_filenames)
 
     def on_delete(self, microbit_file):
         """
@@ -364,7 +411,6 @@ class MicrobitFileList(MuFileList):
         msg = _("'{}' successfully deleted from micro:bit.").\
             format(microbit_file)
         self.set_message.emit(msg)
-        self.list_files.emit()
 
 
 class LocalFileList(MuFileList):
@@ -372,30 +418,42 @@ class LocalFileList(MuFileList):
     Represents a list of files in the Mu directory on the local machine.
     """
 
-    get = pyqtSignal(str, str)
+    get = pyqtSignal(list)
 
     def __init__(self, home):
         super().__init__()
         self.home = home
         self.setDragDropMode(QListWidget.DragDrop)
+        self.setSelectionMode(QListWidget.ExtendedSelection)
 
     def dropEvent(self, event):
         source = event.source()
         if isinstance(source, MicrobitFileList):
-            file_exists = self.findItems(source.currentItem().text(),
-                                         Qt.MatchExactly)
-            if not file_exists or \
-                    file_exists and self.show_confirm_overwrite_dialog():
+            microbit_filenames = self.files_to_copy(source)
+            if microbit_filenames:
                 self.disable.emit()
-                microbit_filename = source.currentItem().text()
-                local_filename = os.path.join(self.home,
-                                              microbit_filename)
-                msg = _("Getting '{}' from micro:bit. "
-                        "Copying to '{}'.").format(microbit_filename,
-                                                   local_filename)
+                files = [(microbit_filename,
+                          os.path.join(self.home, microbit_filename))
+                         for microbit_filename in microbit_filenames]
+                if len(files) == 1:
+                    msg = _("Getting '{}' from micro:bit. "
+                            "Copying to '{}'.").format(*files[0])
+                else:
+                    msg = _("Getting {} files from micro:bit. "
+                            "Copying to '{}'.").format(len(files), self.home)
                 logger.info(msg)
                 self.set_message.emit(msg)
-                self.get.emit(microbit_filename, local_filename)
+                self.get.emit(files)
+
+    def on_get_progress(self, microbit_file, received, size):
+        """
+        Fired as the referenced file is got, with the number of bytes received
+        so far and the size of the file.
+        """
+        percent = received * 100 // size if size else 100
+        msg = _("Getting '{}' from micro:bit: {}%.").format(microbit_file,
+                                                            percent)
+        self.set_message.emit(msg)
 
     def on_get(self, microbit_file):
         """
@@ -404,19 +462,20 @@ class LocalFileList(MuFileList):
         msg = _("Successfully copied '{}' "
                 "from the micro:bit to your computer.").format(microbit_file)
         self.set_message.emit(msg)
-        self.list_files.emit()
 
 
 class FileSystemPane(QFrame):
     """
     Contains two QListWidgets representing the micro:bit and the user's code
     directory. Users transfer files by dragging and dropping. Highlighted files
-    can be selected for deletion.
+    can be selected for deletion. The sync button copies the new and changed
+    files in the user's code directory onto the micro:bit in one go.
     """
 
     set_message = pyqtSignal(str)
     set_warning = pyqtSignal(str)
     list_files = pyqtSignal()
+    sync = pyqtSignal(str, bool)
 
     def __init__(self, home):
         super().__init__()
@@ -430,15 +489,25 @@ class FileSystemPane(QFrame):
         microbit_label.setText(_('Files on your micro:bit:'))
         local_label = QLabel()
         local_label.setText(_('Files on your computer:'))
+        sync_button = QPushButton(_('Sync to micro:bit'))
+        sync_button.setToolTip(_('Copy the new and changed files on your '
+                                 'computer onto the micro:bit.'))
+        delete_checkbox = QCheckBox(_('Remove other files from the '
+                                      'micro:bit'))
         self.microbit_label = microbit_label
         self.local_label = local_label
         self.microbit_fs = microbit_fs
         self.local_fs = local_fs
+        self.sync_button = sync_button
+        self.delete_checkbox = delete_checkbox
         self.set_font_size()
         layout.addWidget(microbit_label, 0, 0)
         layout.addWidget(local_label, 0, 1)
         layout.addWidget(microbit_fs, 1, 0)
         layout.addWidget(local_fs, 1, 1)
+        layout.addWidget(delete_checkbox, 2, 0)
+        layout.addWidget(sync_button, 2, 1)
+        self.sync_button.clicked.connect(self.start_sync)
         self.microbit_fs.disable.connect(self.disable)
         self.microbit_fs.set_message.connect(self.show_message)
         self.local_fs.disable.connect(self.disable)
@@ -450,6 +519,7 @@ class FileSystemPane(QFrame):
         """
         self.microbit_fs.setDisabled(True)
         self.local_fs.setDisabled(True)
+        self.sync_button.setDisabled(True)
         self.microbit_fs.setAcceptDrops(False)
         self.local_fs.setAcceptDrops(False)
 
@@ -459,6 +529,7 @@ class FileSystemPane(QFrame):
         """
         self.microbit_fs.setDisabled(False)
         self.local_fs.setDisabled(False)
+        self.sync_button.setDisabled(False)
         self.microbit_fs.setAcceptDrops(True)
         self.local_fs.setAcceptDrops(True)
 
@@ -474,6 +545,56 @@ class FileSystemPane(QFrame):
         """
         self.set_warning.emit(message)
 
+    def start_sync(self):
+        """
+        Sync the micro:bit with the user's code directory, removing other
+        files from the micro:bit if the user has asked (and confirmed) that.
+        """
+        delete = self.delete_checkbox.isChecked()
+        if delete and not self.show_confirm_delete_dialog():
+            return
+        self.disable()
+        msg = _("Syncing '{}' with micro:bit.").format(self.home)
+        logger.info(msg)
+        self.show_message(msg)
+        self.sync.emit(self.home, delete)
+
+    def show_confirm_delete_dialog(self):
+        """
+        Display a dialog to check the files on the micro:bit which aren't in
+        the user's code directory should be removed by syncing.
+
+        Returns a boolean indication of the user's decision.
+        """
+        msg = QMessageBox(self)
+        msg.setIcon(QMessageBox.Warning)
+        msg.setText(_("Files on the micro:bit which aren't in '{}' will be "
+                      "removed. This cannot be undone. Continue?").format(
+                          self.home))
+        msg.setWindowTitle(_("Remove other files from the micro:bit"))
+        msg.setStandardButtons(QMessageBox.Ok | QMessageBox.Cancel)
+        return msg.exec_() == QMessageBox.Ok
+
+    def on_sync(self, copied, removed):
+        """
+        Fired when the micro:bit has been synced, with the lists of files
+        copied onto and removed from the micro:bit.
+        """
+        if copied or removed:
+            msg = _("Synced micro:bit: {} file(s) copied, "
+                    "{} file(s) removed.").format(len(copied), len(removed))
+        else:
+            msg = _("The micro:bit is already up to date.")
+        self.show_message(msg)
+
+    def on_sync_fail(self, directory):
+        """
+        Fired when syncing the micro:bit with the referenced directory failed.
+        """
+        self.show_warning(_("There was a problem syncing '{}' with the "
+                            "micro:bit. Please check Mu's logs for "
+                            "more information.").format(directory))
+
     def on_ls(self, microbit_files):
         """
         Displays a list of the files on the micro:bit.
@@ -548,6 +669,8 @@ class FileSystemPane(QFrame):
         self.local_label.setFont(self.font)
         self.microbit_fs.setFont(self.font)
         self.local_fs.setFont(self.font)
+        self.sync_button.setFont(self.font)
+        self.delete_checkbox.setFont(self.font)
 
     def zoomIn(self, delta=2):
         """
@@ -568,7 +691,7 @@ class FileSystemPane(QFrame):
         self.set_font_size(new_size)
 
 
-class PythonProcessPane(QTextEdit):
+class PythonProcessPane(ScrollbackPane):
     """
     Handles / displays a Python process's stdin/out with working command
     history and simple buffer editing.
@@ -863,6 +986,7 @@ class PythonProcessPane(QTextEdit):
         if data:
             self.append(data)
             self.on_append_text.emit(data)
+            self.trim_scrollback()
             cursor = self.textCursor()
             self.start_of_current_line = cursor.position()
 
@@ -1006,6 +1130,19 @@ class DebugInspector(QTreeView):
             self.setStyleSheet(CONTRAST_STYLE)
 
 
+#: The minimum time (in milliseconds) between updates of the plotter's chart.
+PLOTTER_FRAME_INTERVAL = 50
+
+
+#: How many points per second the plotter shows. Samples arriving faster than
+#: this are combined, with each point showing the range of several samples.
+PLOTTER_DISPLAY_RATE = 20
+
+
+#: How often (in seconds) the plotter measures the rate samples arrive.
+PLOTTER_RATE_INTERVAL = 1
+
+
 class PlotterPane(QChartView):
     """
     This plotter widget makes viewing sensor data easy!
@@ -1013,23 +1150,33 @@ class PlotterPane(QChartView):
     This widget represents a chart that will look for tuple data from
     the MicroPython REPL, Python 3 REPL or Python 3 code runner and will
     auto-generate a graph.
+
+    The tuples added are emitted by data_added (for capture to a file).
     """
 
-    data_flood = pyqtSignal()
+    data_added = pyqtSignal(list)
 
     def __init__(self, theme='day', parent=None):
         super().__init__(parent)
         # Holds the raw input to be checked for actionable data to display.
         self.input_buffer = []
-        # Holds the raw actionable data detected while plotting.
-        self.raw_data = []
         self.setObjectName('plotterpane')
         self.max_x = 100  # Maximum value along x axis
         self.max_y = 1000  # Maximum value +/- along y axis
-        self.flooded = False  # Flag to indicate if data flooding is happening.
-
-        # Holds deques for each slot of incoming data (assumes 1 to start with)
-        self.data = [deque([0] * self.max_x), ]
+        # Used to measure the rate samples arrive (see update_rate).
+        self.sample_rate = 0
+        self.sample_count = 0
+        self.rate_started = time.monotonic()
+
+        # Holds the latest max_x values of each slot of incoming data (assumes
+        # 1 to start with). NumPy is slow to import, so only load it now.
+        from mu.interface.plotter import PlotData
+        self.data = PlotData(self.max_x)
+        # The chart is updated with new data at most once per interval.
+        self.plot_timer = QTimer(self)
+        self.plot_timer.setSingleShot(True)
+        self.plot_timer.setInterval(PLOTTER_FRAME_INTERVAL)
+        self.plot_timer.timeout.connect(self.plot)
         # Holds line series for each slot of incoming data (assumes 1 to start
         # with).
         self.series = [QLineSeries(), ]
@@ -1055,65 +1202,47 @@ class PlotterPane(QChartView):
 
     def process_bytes(self, data):
         """
-        Takes raw bytes and, if a valid tuple is detected, adds the data to
+        Takes raw bytes and, if valid tuples are detected, adds the data to
         the plotter.
-
-        The the length of the bytes data > 1024 then a data_flood signal is
-        emitted to ensure Mu can take action to remain responsive.
         """
-        # Data flooding guards.
-        if self.flooded:
-            return
-        if len(data) > 1024:
-            self.flooded = True
-            self.data_flood.emit()
-            return
-        data = data.replace(b'\r\n', b'\n')
+        from mu.interface.plotter import parse_tuples
         self.input_buffer.append(data)
-        # Check if the data contains a Python tuple, containing numbers, on a
-        # single line (i.e. ends with \n).
         input_bytes = b''.join(self.input_buffer)
-        lines = input_bytes.split(b'\n')
-        for line in lines:
-            if line.startswith(b'(') and line.endswith(b')'):
-                # Candidate tuple. Extract the raw bytes into a numeric tuple.
-                raw_values = [val.strip() for val in line[1:-1].split(b',')]
-                numeric_values = []
-                for raw in raw_values:
-                    try:
-                        numeric_values.append(int(raw))
-                        # It worked, so move onto the next value.
-                        continue
-                    except ValueError:
-                        # Try again as a float.
-                        pass
-                    try:
-                        numeric_values.append(float(raw))
-                    except ValueError:
-                        # Not an int or float, so ignore this value.
-                        continue
-                if numeric_values:
-                    # There were numeric values in the tuple, so use them!
-                    self.add_data(tuple(numeric_values))
-        # Reset the input buffer.
-        self.input_buffer = []
-        if lines[-1]:
-            # Append any bytes that are not yet at the end of a line, for
-            # processing next time we read data from self.serial.
-            self.input_buffer.append(lines[-1])
+        # Check if the data contains Python tuples, containing numbers, each
+        # on a single line (i.e. ends with \n). All the complete lines are
+        # parsed in one go.
+        end = input_bytes.rfind(b'\n') + 1
+        lines = input_bytes[:end].replace(b'\r\n', b'\n')
+        # Reset the input buffer, keeping any bytes that are not yet at the
+        # end of a line, for processing next time data is read.
+        self.input_buffer = [input_bytes[end:]] if input_bytes[end:] else []
+        # Consecutive tuples with the same number of values are added to the
+        # plotter together.
+        for size, rows in itertools.groupby(parse_tuples(lines), len):
+            self.add_rows(list(rows))
 
     def add_data(self, values):
         """
         Given a tuple of values, ensures there are the required number of line
-        series, add the data to the line series, update the range of the chart
-        so the chart displays nicely.
+        series and adds the data to be plotted (see add_rows).
+        """
+        self.add_rows([values])
+
+    def add_rows(self, rows):
+        """
+        Given a list of tuples of values, all with the same number of values,
+        ensures there are the required number of line series and adds the
+        data to be plotted. The chart is updated (see plot) once
+        PLOTTER_FRAME_INTERVAL has passed, with all the data added in the
+        meantime.
         """
-        # Store incoming data to dump as CSV at the end of the session.
-        self.raw_data.append(values)
+        # Pass on incoming data to be captured.
+        self.data_added.emit(rows)
+        self.sample_count += len(rows)
         # Check the number of incoming values.
-        if len(values) != len(self.series):
+        value_len = len(rows[0])
+        if value_len != len(self.series):
             # Adjust the number of line series.
-            value_len = len(values)
             series_len = len(self.series)
             if value_len > series_len:
                 # Add new line series.
@@ -1123,25 +1252,25 @@ class PlotterPane(QChartView):
                     self.chart.setAxisX(self.axis_x, new_series)
                     self.chart.setAxisY(self.axis_y, new_series)
                     self.series.append(new_series)
-                    self.data.append(deque([0] * self.max_x))
             else:
                 # Remove old line series.
                 for old_series in self.series[value_len:]:
                     self.chart.removeSeries(old_series)
                 self.series = self.series[:value_len]
-                self.data = self.data[:value_len]
-
-        # Add the incoming values to the data to be displayed, and compute
-        # max range.
-        max_ranges = []
-        for i, value in enumerate(values):
-            self.data[i].appendleft(value)
-            max_ranges.append(max([max(self.data[i]), abs(min(self.data[i]))]))
-            if len(self.data[i]) > self.max_x:
-                self.data[i].pop()
+            self.data.resize(value_len)
+        # Add the incoming values to the data to be displayed.
+        self.data.extend(rows)
+        if not self.plot_timer.isActive():
+            self.plot_timer.start()
 
+    def plot(self):
+        """
+        Update the range of the chart so the chart displays nicely, and
+        replace the points of each line series with the latest data.
+        """
+        self.update_rate()
         # Re-scale y-axis.
-        max_y_range = max(max_ranges)
+        max_y_range = self.data.max_abs
         y_range = bisect.bisect_left(self.y_ranges, max_y_range)
         if y_range < len(self.y_ranges):
             self.max_y = self.y_ranges[y_range]
@@ -1159,13 +1288,30 @@ class PlotterPane(QChartView):
 
         # Update the line series with the data.
         for i, line_series in enumerate(self.series):
-            line_series.clear()
-            xy_vals = []
-            for j in range(self.max_x):
-                val = self.data[i][self.max_x - 1 - j]
-                xy_vals.append((j, val))
-            for point in xy_vals:
-                line_series.append(*point)
+            line_series.replace(self.data.polygon(i))
+
+    def update_rate(self):
+        """
+        Once every PLOTTER_RATE_INTERVAL, work out the rate samples are
+        arriving, show it in the chart's title and set how many samples
+        each point combines so the chart moves at about PLOTTER_DISPLAY_RATE
+        points per second.
+        """
+        now = time.monotonic()
+        elapsed = now - self.rate_started
+        if elapsed < PLOTTER_RATE_INTERVAL:
+            return
+        self.sample_rate = self.sample_count / elapsed
+        self.sample_count = 0
+        self.rate_started = now
+        decimation = max(1, math.ceil(self.sample_rate /
+                                      PLOTTER_DISPLAY_RATE))
+        self.data.decimation = decimation
+        title = _('{:.0f} samples per second').format(self.sample_rate)
+        if decimation > 1:
+            title += _(' (each point shows the range of {} '
+                       'samples)').format(decimation)
+        self.chart.setTitle(title)
 
     def set_theme(self, theme):
         """
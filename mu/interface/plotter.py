@@ -0,0 +1,204 @@
+"""
+Parses the tuples sent to the plotter and holds the data it displays in NumPy
+arrays, so incoming values are stored and handed to the chart without looping
+over every point in Python.
+
+It's in its own module since NumPy takes a while to import, so it's only
+imported once the plotter is used.
+
+Copyright (c) 2015-2017 Nicholas H.Tollervey and others (see the AUTHORS file).
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import re
+import numpy
+from PyQt5.QtCore import QPointF
+from PyQt5.QtGui import QPolygonF
+
+
+#: Matches a line holding a Python tuple, capturing what's between the
+#: brackets (the values are checked by parse_tuple).
+TUPLE_LINE = re.compile(rb'^\((.*)\)$', re.MULTILINE)
+
+
+def parse_value(raw):
+    """
+    Return the referenced bytes as an int or, failing that, a float. If it's
+    not a number, return None.
+    """
+    try:
+        # Bytes with a decimal point can't be an int, so don't try.
+        return float(raw) if b'.' in raw else int(raw)
+    except ValueError:
+        pass
+    try:
+        return float(raw)  # E.g. 1e5.
+    except ValueError:
+        return None
+
+
+def parse_tuple(raw):
+    """
+    Return a tuple of the numbers in the referenced bytes (what's between the
+    brackets of a tuple), ignoring values which aren't numbers.
+    """
+    values = raw.split(b',')
+    if b'.' not in raw:
+        try:
+            # The usual case of a tuple of ints, converted in one go.
+            return tuple(map(int, values))
+        except ValueError:
+            pass
+    numbers = tuple(map(parse_value, values))
+    if None in numbers:
+        return tuple(n for n in numbers if n is not None)
+    return numbers
+
+
+def parse_tuples(data):
+    """
+    Return a list of the tuples of numbers in the referenced lines of bytes,
+    one for each line which holds a tuple with numbers in it.
+
+    The tuples are found in a single pass of a regular expression over all
+    the lines, so lines of other output cost next to nothing.
+    """
+    return [numbers for numbers in map(parse_tuple, TUPLE_LINE.findall(data))
+            if numbers]
+
+
+class PlotData:
+    """
+    The last size columns of each of a number of series (lines on the chart),
+    held in a ring buffer: a NumPy array with a row for each series, in which
+    the column being filled goes round and round.
+
+    Each column holds the lowest and highest of decimation samples, so when
+    samples arrive faster than they can sensibly be displayed the chart still
+    shows their full range (including any spikes). With a decimation of 1,
+    each column is a single sample.
+
+    The largest absolute value (which sets the range of the chart's y axis)
+    is found again each time values are added, which (since values are added
+    a batch at a time) is cheap compared to the adding.
+    """
+
+    def __init__(self, size, count=1):
+        self.size = size
+        self.decimation = 1  # How many samples are combined in a column.
+        # The lowest and highest value in each column of each series.
+        self.values = numpy.zeros((count, size, 2))
+        self.column = 0  # The column being filled.
+        self.samples = 0  # How many samples are in the column being filled.
+        self.max_abs = 0
+        # The points of a series (the lowest and highest value of each
+        # column), with the x coordinates filled in.
+        self.template = QPolygonF([QPointF(x, 0) for x in range(size)
+                                   for i in range(2)])
+
+    def __len__(self):
+        return len(self.values)
+
+    def resize(self, count):
+        """
+        Change the number of series. New series are filled with zeros, the
+        values of removed series are forgotten.
+        """
+        if count > len(self):
+            extra = numpy.zeros((count - len(self), self.size, 2))
+            self.values = numpy.vstack((self.values, extra))
+        else:
+            self.values = self.values[:count]
+        self.max_abs = numpy.abs(self.values).max() if count else 0
+
+    def append(self, values):
+        """
+        Add the referenced values (one for each series) to the column being
+        filled. A new column replaces the oldest.
+        """
+        self.extend([values])
+
+    def extend(self, rows):
+        """
+        Add the referenced rows of values (each with one value for each
+        series), filling columns in turn. New columns replace the oldest.
+
+        The rows are combined into columns with NumPy in one go, rather than
+        one row at a time.
+        """
+        rows = numpy.asarray(rows, dtype=float)
+        if not len(rows):
+            return
+        if self.samples >= self.decimation:
+            # The decimation has been lowered, so the column is already full.
+            self.column = (self.column + 1) % self.size
+            self.samples = 0
+        if self.samples:
+            # Finish filling the current column first.
+            first = rows[:self.decimation - self.samples]
+            rows = rows[len(first):]
+            column = self.values[:, self.column]
+            numpy.minimum(column[:, 0], first.min(axis=0), out=column[:, 0])
+            numpy.maximum(column[:, 1], first.max(axis=0), out=column[:, 1])
+            self.samples += len(first)
+            if self.samples == self.decimation:
+                self.column = (self.column + 1) % self.size
+                self.samples = 0
+        if len(rows):
+            full, self.samples = divmod(len(rows), self.decimation)
+            blocks = rows[:full * self.decimation].reshape(
+                full, self.decimation, rows.shape[1])
+            lows = [blocks.min(axis=1)]
+            highs = [blocks.max(axis=1)]
+            if self.samples:
+                # The rest start a column which is still being filled.
+                rest = rows[full * self.decimation:]
+                lows.append(rest.min(axis=0, keepdims=True))
+                highs.append(rest.max(axis=0, keepdims=True))
+            columns = numpy.stack((numpy.concatenate(lows),
+                                   numpy.concatenate(highs)), axis=-1)
+            # Only the newest columns fit in the buffer.
+            positions = self.column + numpy.arange(len(columns))
+            positions = positions[-self.size:] % self.size
+            self.values[:, positions] = columns[-self.size:].swapaxes(0, 1)
+            self.column = (self.column + full) % self.size
+        self.max_abs = numpy.abs(self.values).max() if len(self) else 0
+
+    def series(self, index):
+        """
+        Return the (lowest, highest) values of each column of the referenced
+        series, oldest first.
+        """
+        start = self.column
+        if self.samples:
+            # The column being filled is the newest.
+            start = (start + 1) % self.size
+        row = self.values[index]
+        return numpy.concatenate((row[start:], row[:start]))
+
+    def polygon(self, index):
+        """
+        Return a QPolygonF of the points (x the column from 0, y the lowest
+        then highest value, oldest first) of the referenced series, for use
+        with QLineSeries.replace.
+
+        The y coordinates are written straight into the memory of a copy of
+        the template, so no QPointF is created for each value.
+        """
+        polygon = QPolygonF(self.template)
+        memory = polygon.data()  # Gives the copy its own memory.
+        memory.setsize(self.size * 4 * numpy.dtype(float).itemsize)
+        points = numpy.frombuffer(memory, dtype=float)
+        points.reshape(self.size * 2, 2)[:, 1] = self.series(index).ravel()
+        return polygon
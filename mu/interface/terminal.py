@@ -0,0 +1,163 @@
+"""
+Decodes the output of a MicroPython REPL into the edit operations needed to
+display it.
+
+It doesn't depend on Qt, so can be tested (and benchmarked) on its own.
+
+Copyright (c) 2015-2017 Nicholas H.Tollervey and others (see the AUTHORS file).
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import codecs
+import re
+
+
+#: Matches a run of text (anything but control characters, except tab).
+TEXT = re.compile(r'[^\x00-\x08\x0a-\x1f\x7f]+')
+
+
+#: The states of the decoder: plain text, after an <Esc> and within a control
+#: sequence (<Esc>[...).
+GROUND, ESCAPE, CSI = range(3)
+
+
+#: The edit operation for control characters which aren't ignored.
+CONTROLS = {
+    '\x08': ('backspace', None),
+    '\n': ('newline', None),
+}
+
+
+#: The edit operation for each supported final character of a control
+#: sequence. Other control sequences (e.g. colours) are ignored.
+CSI_ACTIONS = {
+    'A': 'up',
+    'B': 'down',
+    'C': 'right',
+    'D': 'left',
+    'K': 'erase',
+}
+
+
+#: Control sequences with longer parameters than this are garbage, so are
+#: abandoned.
+MAX_CSI_LENGTH = 32
+
+
+class TerminalDecoder:
+    """
+    Turns the bytes output by a MicroPython REPL into a list of (action,
+    argument) edit operations:
+
+    * ('text', text) - overwrite what follows the cursor with the text.
+    * ('newline', None) - move to the end of the document and start a line.
+    * ('backspace', None) - move the cursor left.
+    * ('up', count), ('down', count), ('right', count), ('left', count) -
+      move the cursor (from VT100 <Esc>[{count}A etc...).
+    * ('erase', None) - delete to the end of the line (<Esc>[K).
+
+    Bytes may be passed in arbitrary chunks (as read from the serial port):
+    multi-byte UTF-8 characters and control sequences split between chunks
+    are carried over to the next call of decode. Each chunk is decoded in a
+    single pass over its characters.
+    """
+
+    def __init__(self):
+        self.handlers = {
+            GROUND: self.ground,
+            ESCAPE: self.escape,
+            CSI: self.csi,
+        }
+        self.reset()
+
+    def reset(self):
+        """
+        Forget any partially decoded character or control sequence.
+        """
+        self.utf8 = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.state = GROUND
+        self.params = ''
+
+    def decode(self, data):
+        """
+        Return the edit operations for the referenced bytes.
+        """
+        text = self.utf8.decode(data)
+        result = []
+        i = 0
+        while i < len(text):
+            i = self.handlers[self.state](text, i, result)
+        return result
+
+    def ground(self, text, i, result):
+        """
+        Handle plain text and control characters, returning the index of the
+        next character to decode.
+        """
+        match = TEXT.match(text, i)
+        if match:
+            if result and result[-1][0] == 'text':
+                # Carriage-returns and such are ignored, so join up the text.
+                result[-1] = ('text', result[-1][1] + match.group())
+            else:
+                result.append(('text', match.group()))
+            return match.end()
+        char = text[i]
+        if char == '\x1b':
+            self.state = ESCAPE
+        elif char in CONTROLS:
+            result.append(CONTROLS[char])
+        return i + 1
+
+    def escape(self, text, i, result):
+        """
+        Handle the character after an <Esc>, returning the index of the next
+        character to decode.
+        """
+        char = text[i]
+        if char == '[':
+            self.state = CSI
+            self.params = ''
+            return i + 1
+        self.state = GROUND
+        if '\x30' <= char <= '\x7e':
+            # The end of a two character escape sequence, which is ignored.
+            return i + 1
+        return i
+
+    def csi(self, text, i, result):
+        """
+        Handle a character within a control sequence, returning the index of
+        the next character to decode.
+        """
+        char = text[i]
+        if '\x20' <= char <= '\x3f':
+            # Parameters (and intermediate characters).
+            self.params += char
+            if len(self.params) > MAX_CSI_LENGTH:
+                self.state = GROUND
+            return i + 1
+        self.state = GROUND
+        if not '\x40' <= char <= '\x7e':
+            # Not a valid control sequence, so decode the character as text.
+            return i
+        action = CSI_ACTIONS.get(char)
+        count = self.params.split(';')[0]
+        if action and (count == '' or count.isdigit()):
+            count = int(count or 0)
+            if action != 'erase':
+                result.append((action, max(count, 1)))
+            elif count == 0:
+                result.append((action, None))
+        return i + 1
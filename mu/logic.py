@@ -19,23 +19,33 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 import os
 import sys
+import ast
 import codecs
 import io
 import re
 import json
 import logging
-import tempfile
 import platform
 import webbrowser
 import random
 import locale
 import shutil
+import hashlib
+import threading
+import select
+import socket
+from subprocess import check_output
 import appdirs
+import serial
+from collections import OrderedDict, namedtuple
 from PyQt5.QtWidgets import QMessageBox
+from PyQt5.QtCore import QObject, QThread, QTimer, pyqtSignal, pyqtSlot
+from PyQt5.QtSerialPort import QSerialPortInfo
 from pyflakes.api import check
-from pycodestyle import StyleGuide, Checker
+from pycodestyle import StyleGuide, Checker, BaseReport
+from mu.capture import CAPTURE_WRITERS
 from mu.resources import path
-from mu import __version__
+from mu import __version__, language_code
 
 
 # The user's home directory.
@@ -48,12 +58,21 @@ DATA_DIR = appdirs.user_data_dir(appname='mu', appauthor='python')
 LOG_DIR = appdirs.user_log_dir(appname='mu', appauthor='python')
 # The path to the log file for the application.
 LOG_FILE = os.path.join(LOG_DIR, 'mu.log')
-# Regex to match pycodestyle (PEP8) output.
-STYLE_REGEX = re.compile(r'.*:(\d+):(\d+):\s+(.*)')
+# The path to the file used to remember the results of checking code.
+CHECK_CACHE_FILE = os.path.join(DATA_DIR, 'check_cache.json')
+# The maximum number of results of checking code to remember.
+CHECK_CACHE_SIZE = 64
+# PEP8 rules to ignore when checking the style of code.
+STYLE_IGNORE = ('E121', 'E123', 'E126', 'E226', 'E302', 'E305', 'E24',
+                'E704', 'W291', 'W292', 'W293', 'W391', 'W503', )
 # Regex to match flake8 output.
 FLAKE_REGEX = re.compile(r'.*:(\d+):\s+(.*)')
 # Regex to match false positive flake errors if microbit.* is expanded.
 EXPAND_FALSE_POSITIVE = re.compile(r"^'microbit\.(\w+)' imported but unused$")
+# Regex to match line numbers mentioned in flake messages.
+LINE_REFERENCE = re.compile(r'\bline (\d+)\b')
+# Top-level statements that can be checked on their own when they change.
+DEFINITIONS = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
 # The text to which "from microbit import \*" should be expanded.
 EXPANDED_IMPORT = ("from microbit import pin15, pin2, pin0, pin1, "
                    " pin3, pin6, pin4, i2c, pin5, pin7, pin8, Image, "
@@ -63,6 +82,34 @@ EXPANDED_IMPORT = ("from microbit import pin15, pin2, pin0, pin1, "
                    "pin12, pin11, pin10, compass")
 # Port number for debugger.
 DEBUGGER_PORT = 31415
+#: Seconds between checks of the serial ports when they must be polled.
+USB_POLL_INTERVAL = 1
+#: Seconds to wait after a hotplug event for the device to be set up.
+USB_SETTLE_TIME = 0.5
+#: The netlink protocol through which the Linux kernel reports hotplug events.
+NETLINK_KOBJECT_UEVENT = 15
+#: The speed of the serial link to MicroPython devices.
+SERIAL_BAUDRATE = 115200
+#: Seconds the serial reader waits for data before checking if it's stopped.
+SERIAL_READ_TIMEOUT = 0.1
+#: Seconds a write to the serial link may take before the device is given up
+#: on, so a stalled device can't freeze the UI.
+SERIAL_WRITE_TIMEOUT = 1
+#: Milliseconds between handing the bytes read from the serial link to the UI.
+SERIAL_DELIVERY_INTERVAL = 20
+#: The most bytes read from the serial link kept waiting for the UI. If the
+#: UI falls further behind the oldest bytes are dropped.
+SERIAL_QUEUE_SIZE = 64 * 1024
+#: How many lines of output the REPL and runner panes keep by default.
+SCROLLBACK_LINES = 10000
+#: The name of the log (in the workspace) of output trimmed from the panes.
+SCROLLBACK_LOG = 'output.log'
+#: Linux's table of mounted volumes (which can be polled for changes).
+MOUNTINFO = '/proc/self/mountinfo'
+#: Where macOS mounts volumes (in directories named after their labels).
+VOLUMES_DIR = '/Volumes'
+#: Escaped characters (e.g. spaces) in the mount points of MOUNTINFO.
+MOUNTINFO_ESCAPE = re.compile(r'\\([0-7]{3})')
 MOTD = [  # Candidate phrases for the message of the day (MOTD).
     _('Hello, World!'),
     _("This editor is free software written in Python. You can modify it, "
@@ -402,53 +449,57 @@ def check_pycodestyle(code):
     of items describing issues of coding style. See:
 
     https://pycodestyle.readthedocs.io/en/latest/intro.html
+
+    The code is checked in memory (no temporary files or redirection of
+    stdout) so this is safe to call from several threads at once.
     """
-    # PyCodeStyle reads input from files, so make a temporary file containing
-    # the code.
-    code_fd, code_filename = tempfile.mkstemp()
-    os.close(code_fd)
-    with open(code_filename, 'w', newline='') as code_file:
-        write_and_flush(code_file, code)
-    # Configure which PEP8 rules to ignore.
-    ignore = ('E121', 'E123', 'E126', 'E226', 'E302', 'E305', 'E24', 'E704',
-              'W291', 'W292', 'W293', 'W391', 'W503', )
+    # Split the code into lines in the same way PyCodeStyle reads files.
+    lines = io.StringIO(code, newline=None).readlines()
     style = StyleGuide(parse_argv=False, config_file=False)
-    style.options.ignore = ignore
-    checker = Checker(code_filename, options=style.options)
-    # Re-route stdout to a temporary buffer to be parsed below.
-    temp_out = io.StringIO()
-    sys.stdout = temp_out
-    # Check the code.
+    style.options.ignore = STYLE_IGNORE
+    reporter = MuStyleReport(style.options)
+    checker = Checker(lines=lines, options=style.options, report=reporter)
     checker.check_all()
-    # Put stdout back and read the content of the buffer. Remove the temporary
-    # file created at the start.
-    sys.stdout = sys.__stdout__
-    temp_out.seek(0)
-    results = temp_out.read()
-    temp_out.close()
-    code_file.close()
-    os.remove(code_filename)
-    # Parse the output from the tool into a dictionary of structured data.
+    # Turn the results into a dictionary of structured data.
     style_feedback = {}
-    for result in results.split('\n'):
-        matcher = STYLE_REGEX.match(result)
-        if matcher:
-            line_no, col, msg = matcher.groups()
-            line_no = int(line_no) - 1
-            code, description = msg.split(' ', 1)
-            if code == 'E303':
-                description += _(' above this line')
-            if line_no not in style_feedback:
-                style_feedback[line_no] = []
-            style_feedback[line_no].append({
-                'line_no': line_no,
-                'column': int(col) - 1,
-                'message': description.capitalize(),
-                'code': code,
-            })
+    for line_no, col, code, description in sorted(reporter.log):
+        if code == 'E303':
+            description += _(' above this line')
+        if line_no not in style_feedback:
+            style_feedback[line_no] = []
+        style_feedback[line_no].append({
+            'line_no': line_no,
+            'column': col,
+            'message': description.capitalize(),
+            'code': code,
+        })
     return style_feedback
 
 
+class MuStyleReport(BaseReport):
+    """
+    Collects the results of a PyCodeStyle check in memory rather than
+    printing them to stdout.
+    """
+
+    def __init__(self, options):
+        """
+        Set up the report object to be used to record PyCodeStyle's results.
+        """
+        super().__init__(options)
+        self.log = []
+
+    def error(self, line_number, offset, text, check):
+        """
+        Records a problem (unless it's one to be ignored) as a tuple of the
+        zero based line number and column, the code and its description.
+        """
+        code = super().error(line_number, offset, text, check)
+        if code:
+            self.log.append((line_number - 1, offset, code, text[5:]))
+        return code
+
+
 class MuFlakeCodeReporter:
     """
     The class instantiates a reporter that creates structured data about
@@ -511,6 +562,868 @@ class MuFlakeCodeReporter:
             })
 
 
+def _imported_names(node):
+    """
+    Return a list of the names bound by the referenced import statement, or
+    None if it's a star import whose names aren't known.
+    """
+    names = []
+    for alias in node.names:
+        if alias.name != '*':
+            names.append(alias.asname or alias.name.split('.')[0])
+        elif getattr(node, 'module', None) == 'microbit':
+            expanded = ast.parse(EXPANDED_IMPORT).body[0]
+            names.extend(a.name for a in expanded.names)
+        else:
+            return None
+    return names
+
+
+def _bound_names(node, has_globals=True):
+    """
+    Return a tuple of the module-level names bound by the referenced top-level
+    statement and those bound by imports, or None if it contains a star import
+    whose names aren't known. The body of a def or class is only searched for
+    global statements if has_globals.
+    """
+    definition = isinstance(node, DEFINITIONS)
+    if definition and not has_globals:
+        return [node.name], []
+    names = [node.name] if definition else []
+    imports = []
+    for child in ast.walk(node):
+        if isinstance(child, ast.Global):
+            names.extend(child.names)
+        elif definition:
+            # Everything else in a def or class is local to it.
+            continue
+        elif isinstance(child, ast.Name):
+            if not isinstance(child.ctx, ast.Load):
+                names.append(child.id)
+        elif isinstance(child, DEFINITIONS):
+            names.append(child.name)
+        elif isinstance(child, ast.ExceptHandler) and child.name:
+            names.append(child.name)
+        elif isinstance(child, (ast.Import, ast.ImportFrom)):
+            imported = _imported_names(child)
+            if imported is None:
+                return None
+            names.extend(imported)
+            imports.extend(imported)
+    return names, imports
+
+
+def _local_names(node):
+    """
+    Return the set of names bound anywhere within the referenced def or class
+    (other than its own name).
+    """
+    names = set()
+    for child in ast.walk(node):
+        if isinstance(child, ast.Name) and not isinstance(child.ctx,
+                                                          ast.Load):
+            names.add(child.id)
+        elif isinstance(child, ast.arg):
+            names.add(child.arg)
+        elif isinstance(child, DEFINITIONS) and child is not node:
+            names.add(child.name)
+        elif isinstance(child, ast.ExceptHandler) and child.name:
+            names.add(child.name)
+        elif isinstance(child, (ast.Import, ast.ImportFrom)):
+            names.update(_imported_names(child) or [])
+    return names
+
+
+def _definition_time_nodes(node):
+    """
+    Yield the parts of a def or class that are evaluated when it is defined
+    rather than when it is called (decorators, defaults, bases, class bodies).
+    """
+    yield from node.decorator_list
+    if isinstance(node, ast.ClassDef):
+        yield from node.bases
+        yield from node.keywords
+        for child in node.body:
+            if isinstance(child, DEFINITIONS):
+                yield from _definition_time_nodes(child)
+            else:
+                yield child
+    else:
+        yield node.args
+        if node.returns:
+            yield node.returns
+
+
+def _loaded_names(nodes):
+    """
+    Return the set of names loaded anywhere within the referenced nodes.
+    """
+    return {child.id for node in nodes for child in ast.walk(node)
+            if isinstance(child, ast.Name) and
+            isinstance(child.ctx, ast.Load)}
+
+
+def _block_usage(block):
+    """
+    Return a tuple of the names used in the referenced block of an outline,
+    the names bound within it and the names used while it is being defined
+    (see outline_code). These are only worked out (once) for blocks that
+    change, since doing so means walking the whole of the block.
+    """
+    if 'usage' not in block:
+        node = block['nodes'][0]
+        block['usage'] = (_loaded_names([node, ]), _local_names(node),
+                          _loaded_names(_definition_time_nodes(node)))
+    return block['usage']
+
+
+def outline_code(code):
+    """
+    Describe the top-level blocks of the code so that changes to it can be
+    checked one block at a time (see check_changes).
+
+    Returns None if the code can't be parsed or contains a star import,
+    otherwise a dictionary of the code's lines and a list of its blocks. Each
+    block is a dictionary of its zero based first line, the line after it
+    ends, its text, its statements, whether it's a single def or class, the
+    module-level names it binds and those bound by imports.
+    """
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return None
+    # Split the code into lines in the same way Python and PyCodeStyle do.
+    lines = io.StringIO(code, newline=None).readlines()
+    # Group statements by the line on which they start, including decorators.
+    statements = OrderedDict()
+    for node in tree.body:
+        decorators = getattr(node, 'decorator_list', [])
+        start = min([node.lineno] + [d.lineno for d in decorators]) - 1
+        statements.setdefault(start, []).append(node)
+    starts = list(statements) or [0]
+    # Comments and blank lines at the start belong to the first block.
+    starts[0] = 0
+    ends = starts[1:] + [len(lines)]
+    blocks = []
+    for start, end, nodes in zip(starts, ends, statements.values() or [[]]):
+        text = ''.join(lines[start:end])
+        binds = []
+        imports = []
+        for node in nodes:
+            names = _bound_names(node, 'global' in text)
+            if names is None:
+                return None
+            binds.extend(names[0])
+            imports.extend(names[1])
+        blocks.append({
+            'start': start,
+            'end': end,
+            'text': text,
+            'nodes': nodes,
+            'definition': (len(nodes) == 1 and
+                           isinstance(nodes[0], DEFINITIONS)),
+            'binds': binds,
+            'imports': imports,
+        })
+    return {'lines': lines, 'blocks': blocks}
+
+
+def _move_feedback(feedback, first, last=None, delta=0, since=None):
+    """
+    Return the feedback for the lines from first up to (but not including)
+    last, with the lines from since (by default, first) onwards moved by delta
+    lines. Line numbers mentioned in messages (for example, "redefinition of
+    unused 'x' from line 3") are moved in the same way.
+    """
+    if since is None:
+        since = first
+
+    def move(line_no):
+        return line_no + delta if line_no >= since else line_no
+
+    def move_reference(match):
+        # Messages count lines from one, feedback counts them from zero.
+        return 'line {}'.format(move(int(match.group(1)) - 1) + 1)
+
+    moved = {}
+    for line_no, messages in feedback.items():
+        if line_no < first or (last is not None and line_no >= last):
+            continue
+        moved[move(line_no)] = [
+            dict(message, line_no=move(message['line_no']),
+                 message=LINE_REFERENCE.sub(move_reference,
+                                            message['message']))
+            for message in messages]
+    return moved
+
+
+def check_changes(filename, outline, builtins, previous):
+    """
+    Check only the top-level blocks of code that have changed since the
+    previous check. The previous check is described by a tuple of the outline
+    of the code that was checked and its flake and style feedback. The
+    feedback for unchanged blocks is re-used (moved to their new lines).
+
+    Returns a tuple of the flake and style feedback for the whole of the
+    code, or None if a full check is needed because the changes aren't
+    confined to defs and classes, or change the module-level names or the
+    use of imports.
+    """
+    old_outline, old_flake, old_pep8 = previous
+    old = old_outline['blocks']
+    new = outline['blocks']
+    # Match the unchanged blocks at the start and end of the code.
+    size = min(len(old), len(new))
+    head = 0
+    while head < size and old[head]['text'] == new[head]['text']:
+        head += 1
+    if head == len(old) == len(new):
+        return old_flake, old_pep8
+    tail = 0
+    while (tail < size - head and
+           old[-1 - tail]['text'] == new[-1 - tail]['text']):
+        tail += 1
+    # A block added or removed changes the blocks either side of it (e.g.
+    # trailing blank lines at the end of the file), so recheck one of those.
+    while head + tail in (len(old), len(new)):
+        if tail:
+            tail -= 1
+        elif head:
+            head -= 1
+        else:
+            return None
+    changed_old = old[head:len(old) - tail]
+    changed_new = new[head:len(new) - tail]
+    changed = changed_old + changed_new
+    if not all(block['definition'] for block in changed):
+        return None
+    names = [name for block in new for name in block['binds']]
+    if names != [name for block in old for name in block['binds']]:
+        return None
+    module_names = set(names)
+    definitions = [block['binds'][0] for block in new if block['definition']]
+    if any(names.count(name) > 1 for name in definitions):
+        # Redefinitions are only reported by checking the whole module.
+        return None
+    imports = {name for block in new for name in block['imports']}
+    old_uses = set().union(*[_block_usage(b)[0] for b in changed_old])
+    new_uses = set().union(*[_block_usage(b)[0] for b in changed_new])
+    if old_uses & imports != new_uses & imports:
+        # Imports may have become used or unused.
+        return None
+    if any(_block_usage(block)[1] & imports for block in changed):
+        # Shadowing an import may make it unused or redefine it.
+        return None
+    bound = set()
+    for index, block in enumerate(new):
+        if head <= index < len(new) - tail:
+            if _block_usage(block)[2] & (module_names - bound):
+                # Names used while defining must already exist.
+                return None
+        bound.update(block['binds'])
+    lines = outline['lines']
+    first = changed_new[0]['start']
+    last = changed_new[-1]['end']
+    old_last = changed_old[-1]['end']
+    delta = last - old_last
+    # Pad the changed blocks so PyFlakes reports the right line numbers and
+    # treat the module-level names as builtins.
+    region = '\n' * first + ''.join(lines[first:last])
+    # The feedback for the blocks before the changes may refer to the lines
+    # after them, which have moved.
+    flake = _move_feedback(old_flake, 0, first, delta, since=old_last)
+    flake.update(check_flake(filename, region,
+                             list(builtins or []) + sorted(module_names)))
+    flake.update(_move_feedback(old_flake, old_last, delta=delta))
+    # PyCodeStyle needs the blocks either side of the changes for context
+    # (e.g. blank lines) and the block after may be affected by the changes.
+    start = new[head - 1]['start'] if head else first
+    end = new[len(new) - tail]['end'] if tail else last
+    old_end = old[len(old) - tail]['end'] if tail else old_last
+    window = check_pycodestyle(''.join(lines[start:end]))
+    pep8 = _move_feedback(old_pep8, 0, first, delta, since=old_last)
+    pep8.update(_move_feedback(window, first - start, delta=start))
+    pep8.update(_move_feedback(old_pep8, old_end, delta=delta))
+    return flake, pep8
+
+
+class CheckCache:
+    """
+    A bounded, least recently used cache of the results of checking code.
+
+    Results are keyed on a hash of the code and everything else that affects
+    them (see key). The most recent result for each tab is never evicted. If
+    a path is given the cache can be loaded from and saved to that file, so
+    unchanged code isn't checked again after Mu restarts.
+
+    The cache is used from both the UI and the code checker's thread, so all
+    access is guarded by a lock.
+    """
+
+    def __init__(self, size=CHECK_CACHE_SIZE, path=None):
+        self.size = size
+        self.path = path
+        self.entries = OrderedDict()  # Oldest first.
+        self.owners = {}  # Maps tab ids to the key of their latest result.
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(code, builtins=None, ignore=STYLE_IGNORE):
+        """
+        Return a hash of the code, the mode's builtins and the ignored style
+        rules. Mu's version and language are included since they affect the
+        messages in the results.
+        """
+        parts = [__version__, language_code, sorted(builtins or []),
+                 sorted(ignore), code]
+        return hashlib.sha256(json.dumps(parts).encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """
+        Return the (flake, pep8) results for the key, or None if they're not
+        in the cache.
+        """
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def put(self, key, flake, pep8, owner=None):
+        """
+        Remember the results for the key, recording them as the latest ones
+        for the referenced owner (usually a tab id). Evicts the least recently
+        used results if the cache is full.
+        """
+        with self.lock:
+            self.entries[key] = (flake, pep8)
+            self.entries.move_to_end(key)
+            if owner is not None:
+                self.owners[owner] = key
+            self._evict()
+
+    def release(self, owner):
+        """
+        Forget which results are the latest for the referenced owner (e.g.
+        when its tab is closed), so they can be evicted like any others.
+        """
+        with self.lock:
+            self.owners.pop(owner, None)
+            self._evict()
+
+    def _evict(self):
+        """
+        Remove the least recently used results that are not the latest ones
+        for a tab, until the cache is no larger than its size.
+        """
+        pinned = set(self.owners.values())
+        for key in list(self.entries):
+            if len(self.entries) <= self.size:
+                break
+            if key not in pinned:
+                del self.entries[key]
+
+    def load(self):
+        """
+        Load previously saved results from the cache's file (if there is one).
+        """
+        if not self.path:
+            return
+        try:
+            with open(self.path, encoding=ENCODING) as f:
+                saved = json.load(f)
+            entries = OrderedDict()
+            for key, flake, pep8 in saved:
+                # JSON turns the line numbers into strings, so turn them back.
+                entries[key] = ({int(k): v for k, v in flake.items()},
+                                {int(k): v for k, v in pep8.items()})
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, TypeError, AttributeError):
+            logger.error('Unable to load check cache: {}'.format(self.path))
+            return
+        with self.lock:
+            entries.update(self.entries)
+            self.entries = entries
+            self._evict()
+        logger.info('Loaded check cache from: {}'.format(self.path))
+
+    def save(self):
+        """
+        Save the results in the cache to the cache's file (if there is one).
+        """
+        if not self.path:
+            return
+        with self.lock:
+            saved = [[key, flake, pep8]
+                     for key, (flake, pep8) in self.entries.items()]
+        try:
+            with open(self.path, 'w', encoding=ENCODING) as f:
+                json.dump(saved, f)
+        except OSError:
+            logger.error('Unable to save check cache: {}'.format(self.path))
+
+
+class CodeChecker(QObject):
+    """
+    Checks code with PyFlakes and PyCodeStyle in a worker thread so the UI
+    remains responsive while long scripts are being checked.
+
+    Requests are numbered per tab. A request superseded by a newer one for the
+    same tab before it starts is skipped, and results from a superseded
+    request are never emitted. If a CheckCache is given, code that has
+    already been checked isn't checked again.
+
+    The outline and results of the most recent check for each tab are kept
+    so scoped requests only need to check the blocks that have changed.
+    """
+
+    # Emitted with the tab id, request number, flake and style feedback.
+    on_checked = pyqtSignal(object, int, object, object)
+    # Hands requests over to the thread in which the checker lives.
+    _requested = pyqtSignal(object, int, str, str, object, bool)
+
+    def __init__(self, cache=None):
+        super().__init__()
+        self.cache = cache
+        self.latest = {}  # Maps tab ids to their most recent request number.
+        # Maps tab ids to the builtins, outline and results of their last
+        # check.
+        self.previous = OrderedDict()
+        self._requested.connect(self.run_check)
+
+    def request(self, tab_id, filename, code, builtins=None, scoped=False):
+        """
+        Ask for the referenced code to be checked. If scoped, only the parts
+        changed since the tab was last checked are checked, where possible.
+        Supersedes any outstanding request for the same tab. Returns the
+        number of the new request.
+        """
+        number = self.latest.get(tab_id, 0) + 1
+        self.latest[tab_id] = number
+        self._requested.emit(tab_id, number, filename, code, builtins, scoped)
+        return number
+
+    def release(self, tab_id):
+        """
+        Forget everything about the tab with the referenced id (e.g. once
+        it's closed), including which cached results are its latest.
+        Results of outstanding requests for it are discarded.
+        """
+        self.latest.pop(tab_id, None)
+        self.previous.pop(tab_id, None)
+        if self.cache:
+            self.cache.release(tab_id)
+
+    def is_current(self, tab_id, number):
+        """
+        Returns a boolean indication if the referenced request is the most
+        recent one for the tab.
+        """
+        return self.latest.get(tab_id) == number
+
+    @pyqtSlot(object, int, str, str, object, bool)
+    def run_check(self, tab_id, number, filename, code, builtins, scoped):
+        """
+        Check the code (unless the request has become stale) and emit the
+        results.
+        """
+        if not self.is_current(tab_id, number):
+            return
+        outline = outline_code(code)
+        previous_builtins, previous = self.previous.pop(tab_id, (None, None))
+        results = None
+        if self.cache:
+            key = self.cache.key(code, builtins)
+            results = self.cache.get(key)
+        if (results is None and scoped and outline and previous and
+                previous_builtins == builtins):
+            results = check_changes(filename, outline, builtins, previous)
+        if results is None:
+            results = (check_flake(filename, code, builtins),
+                       check_pycodestyle(code))
+        flake, pep8 = results
+        if outline:
+            self.previous[tab_id] = (builtins, (outline, flake, pep8))
+            while len(self.previous) > CHECK_CACHE_SIZE:
+                self.previous.popitem(last=False)
+        if self.cache:
+            # A tab closed while it was being checked isn't pinned again.
+            owner = tab_id if self.is_current(tab_id, number) else None
+            self.cache.put(key, flake, pep8, owner=owner)
+        if self.is_current(tab_id, number):
+            self.on_checked.emit(tab_id, number, flake, pep8)
+
+
+def open_uevent_socket():
+    """
+    Return a socket from which the Linux kernel's hotplug (uevent)
+    notifications can be read, or None if they're not available (e.g. not on
+    Linux).
+    """
+    try:
+        sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM,
+                             NETLINK_KOBJECT_UEVENT)
+    except (AttributeError, OSError):
+        return None
+    try:
+        sock.bind((0, 1))  # Let the kernel pick the address, kernel events.
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def is_serial_uevent(message):
+    """
+    Return True if the referenced uevent notification is about a serial
+    (tty) device being added or removed.
+    """
+    fields = message.split(b'\0')
+    return (b'SUBSYSTEM=tty' in fields and
+            (b'ACTION=add' in fields or b'ACTION=remove' in fields))
+
+
+#: A serial port's name and the vendor and product IDs of its device.
+SerialPort = namedtuple('SerialPort', ['name', 'vid', 'pid'])
+
+
+class PortScanner:
+    """
+    Enumerates the serial ports on behalf of all the modes, so a single
+    enumeration answers every mode looking for its device.
+
+    While a DeviceWatcher keeps the scanner up to date (it's "watched") the
+    latest snapshot of the ports is used, so they're only enumerated when
+    they change. Otherwise the ports are enumerated whenever they're needed.
+    """
+
+    def __init__(self):
+        self.snapshot = None
+        self.watched = False
+
+    def scan(self):
+        """
+        Enumerate the available serial ports, remember and return them.
+        """
+        self.snapshot = tuple(SerialPort(port.portName(),
+                                         port.vendorIdentifier(),
+                                         port.productIdentifier())
+                              for port in QSerialPortInfo.availablePorts())
+        return self.snapshot
+
+    def ports(self):
+        """
+        Return the available serial ports.
+        """
+        snapshot = self.snapshot
+        if self.watched and snapshot is not None:
+            return snapshot
+        return self.scan()
+
+    def find_devices(self, boards, ports=None):
+        """
+        Given a dictionary mapping names (of modes) to the VID and PID of
+        their valid boards, return a dictionary mapping each name to the
+        first port with one of its boards attached (names without a device
+        are left out). The referenced ports are used if given, otherwise the
+        available ports.
+        """
+        index = {}
+        for name, ids in boards.items():
+            for board in ids:
+                index.setdefault(tuple(board), []).append(name)
+        devices = {}
+        for port in self.ports() if ports is None else ports:
+            for name in index.get((port.vid, port.pid), []):
+                devices.setdefault(name, port)
+        return devices
+
+
+#: Shared by the modes and the editor so the ports are enumerated just once.
+PORTS = PortScanner()
+
+
+class MountTable:
+    """
+    Finds where volumes (e.g. a CIRCUITPY or MICROBIT device) are mounted,
+    given their labels (the last part of their mount point).
+
+    On Linux a map of labels to mount points is read from MOUNTINFO, which is
+    polled (without blocking) so it's only read again after something has
+    been mounted or unmounted. On macOS the volumes are listed from
+    VOLUMES_DIR. Otherwise the mount command is run.
+    """
+
+    def __init__(self, mountinfo=MOUNTINFO, volumes_dir=VOLUMES_DIR):
+        self.mountinfo = mountinfo
+        self.volumes_dir = volumes_dir
+        self.volumes = None
+        self.file = None
+        self.poller = None
+
+    def read_mountinfo(self):
+        """
+        Return a dictionary mapping labels to mount points, re-reading the
+        mount table only if it has changed.
+        """
+        if self.file is None:
+            self.file = open(self.mountinfo, 'rb')
+            self.poller = select.poll()
+            self.poller.register(self.file, select.POLLPRI | select.POLLERR)
+        elif self.volumes is not None and not self.poller.poll(0):
+            return self.volumes
+        self.file.seek(0)
+        volumes = {}
+        for line in self.file.read().splitlines():
+            fields = line.split()
+            if len(fields) > 4:
+                mount_point = MOUNTINFO_ESCAPE.sub(
+                    lambda match: chr(int(match.group(1), 8)),
+                    fields[4].decode('utf-8', 'replace'))
+                volumes[os.path.basename(mount_point)] = mount_point
+        self.volumes = volumes
+        return volumes
+
+    def read_mount_command(self):
+        """
+        Return a dictionary mapping labels to mount points from the output of
+        the mount command (found in /sbin if it's not on the path).
+        """
+        for mount_command in ['mount', '/sbin/mount']:
+            try:
+                mount_output = check_output(mount_command).splitlines()
+            except FileNotFoundError:
+                continue
+            mounted_volumes = [x.split()[2].decode('utf-8')
+                               for x in mount_output]
+            return {os.path.basename(volume): volume
+                    for volume in mounted_volumes}
+        return {}
+
+    def find(self, label):
+        """
+        Return the mount point of the volume with the referenced label, or
+        None if it isn't mounted.
+        """
+        if os.path.isfile(self.mountinfo):
+            volumes = self.read_mountinfo()
+        elif os.path.isdir(self.volumes_dir):
+            volumes = {name: os.path.join(self.volumes_dir, name)
+                       for name in os.listdir(self.volumes_dir)}
+        else:
+            volumes = self.read_mount_command()
+        return volumes.get(label)
+
+
+#: Shared by the modes looking for their devices' volumes.
+MOUNTS = MountTable()
+
+
+class DeviceWatcher(QThread):
+    """
+    Watches, in its own thread, for serial devices being plugged in or
+    unplugged and emits on_changed when the set of available ports changes.
+
+    On Linux the ports are only enumerated when the kernel reports a serial
+    device has been added or removed. Elsewhere (or if hotplug events aren't
+    available) the ports are polled every interval seconds, but off the UI
+    thread. Each enumeration updates the referenced PortScanner's snapshot.
+    """
+
+    on_changed = pyqtSignal()
+
+    def __init__(self, interval=USB_POLL_INTERVAL, scanner=PORTS):
+        super().__init__()
+        self.interval = interval
+        self.scanner = scanner
+        self.ports = None
+        self.stopping = threading.Event()
+
+    def check(self):
+        """
+        Emit on_changed if the available serial ports have changed.
+        """
+        ports = frozenset(self.scanner.scan())
+        if ports != self.ports:
+            self.ports = ports
+            self.on_changed.emit()
+
+    def wait_for_event(self, sock):
+        """
+        Wait up to the interval for a serial hotplug event on the referenced
+        uevent socket. Return True if there's been one.
+        """
+        ready = select.select([sock], [], [], self.interval)[0]
+        found = False
+        while ready:
+            try:
+                message = sock.recv(8192)
+            except OSError:
+                break
+            found = found or is_serial_uevent(message)
+            ready = select.select([sock], [], [], 0)[0]
+        return found
+
+    def run(self):
+        """
+        Check the ports until stopped, whenever there's a hotplug event or
+        every interval seconds if there are no hotplug events.
+        """
+        sock = open_uevent_socket()
+        if sock:
+            logger.info('Watching for USB devices via hotplug events.')
+        else:
+            logger.info('Polling for USB devices every {}s.'.format(
+                self.interval))
+        try:
+            self.check()
+            self.scanner.watched = True
+            while not self.stopping.is_set():
+                if sock:
+                    if self.wait_for_event(sock):
+                        # Give the device a moment to be set up.
+                        self.stopping.wait(USB_SETTLE_TIME)
+                        self.check()
+                elif not self.stopping.wait(self.interval):
+                    self.check()
+        finally:
+            self.scanner.watched = False
+            if sock:
+                sock.close()
+
+    def stop(self):
+        """
+        Ask the watcher to stop and wait for it to do so.
+        """
+        self.stopping.set()
+        self.wait()
+
+
+class SerialLink(QThread):
+    """
+    A serial connection to a device, read from in its own thread so slow
+    consumers of the data (such as the REPL or plotter) don't delay reading
+    and the device's output doesn't overflow.
+
+    The bytes read are queued (up to max_queued bytes, beyond which the
+    oldest are dropped) and emitted by data_received, coalesced into a single
+    chunk, every interval milliseconds on the UI thread. The bytes received,
+    queued and dropped are counted so the link can be monitored.
+
+    Raises an IOError if the port can't be opened.
+    """
+
+    data_received = pyqtSignal(bytes)
+
+    def __init__(self, port, baudrate=SERIAL_BAUDRATE,
+                 max_queued=SERIAL_QUEUE_SIZE,
+                 interval=SERIAL_DELIVERY_INTERVAL):
+        super().__init__()
+        try:
+            # Data terminal ready (DTR) is set on opening the port.
+            self.serial = serial.Serial(port, baudrate,
+                                        timeout=SERIAL_READ_TIMEOUT,
+                                        write_timeout=SERIAL_WRITE_TIMEOUT)
+        except serial.SerialException as ex:
+            raise IOError('Cannot connect to device on port '
+                          '{}'.format(port)) from ex
+        self.port = port
+        self.max_queued = max_queued
+        self.queue = bytearray()
+        self.lock = threading.Lock()
+        self.received = 0
+        self.dropped = 0
+        self.stopping = threading.Event()
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.deliver)
+
+    @property
+    def queued(self):
+        """
+        The number of bytes read but not yet delivered.
+        """
+        return len(self.queue)
+
+    def start(self):
+        """
+        Start reading from the device and delivering what's read.
+        """
+        super().start()
+        self.timer.start()
+
+    def run(self):
+        """
+        Read from the device until stopped.
+        """
+        try:
+            while not self.stopping.is_set():
+                data = self.serial.read(max(1, self.serial.in_waiting))
+                if data:
+                    self.enqueue(data)
+        except (serial.SerialException, OSError) as ex:
+            # The device has gone away (or the port has been closed).
+            if not self.stopping.is_set():
+                logger.error('Unable to read from {}: {}'.format(self.port,
+                                                                 ex))
+
+    def enqueue(self, data):
+        """
+        Add the referenced bytes to the queue of bytes to deliver, dropping
+        the oldest if the queue is full.
+        """
+        with self.lock:
+            self.received += len(data)
+            self.queue.extend(data)
+            excess = len(self.queue) - self.max_queued
+            if excess > 0:
+                del self.queue[:excess]
+                self.dropped += excess
+                logger.warning('Dropped {} bytes from {}.'.format(excess,
+                                                                  self.port))
+
+    def deliver(self):
+        """
+        Emit everything read since the last delivery as a single chunk.
+        """
+        with self.lock:
+            if not self.queue:
+                return
+            data = bytes(self.queue)
+            self.queue.clear()
+        self.data_received.emit(data)
+
+    def write(self, data):
+        """
+        Write the referenced bytes to the device.
+
+        If the device has gone away (or stopped accepting data) the error is
+        logged and the link closed, and further writes are ignored.
+        """
+        if self.stopping.is_set():
+            return
+        try:
+            self.serial.write(data)
+        except (serial.SerialException, OSError) as ex:
+            logger.error('Unable to write to {}: {}'.format(self.port, ex))
+            self.close()
+
+    def close(self):
+        """
+        Stop reading and delivering (discarding anything undelivered) and
+        close the port.
+        """
+        self.timer.stop()
+        self.stopping.set()
+        if hasattr(self.serial, 'cancel_read'):
+            self.serial.cancel_read()
+        self.wait()
+        self.serial.close()
+        logger.info('Serial link to {} closed (received {} bytes, dropped '
+                    '{}).'.format(self.port, self.received, self.dropped))
+
+
 class REPL:
     """
     Read, Evaluate, Print, Loop.
@@ -548,7 +1461,13 @@ class Editor:
         self.envars = []  # See restore session and show_admin
         self.minify = False
         self.microbit_runtime = ''
+        self.scrollback = SCROLLBACK_LINES
+        self.scrollback_log = False
+        self.capture_format = 'csv'  # See mu.capture.CAPTURE_WRITERS.
         self.connected_devices = set()
+        self.check_cache = CheckCache(path=CHECK_CACHE_FILE)
+        self.checker = CodeChecker(self.check_cache)
+        self.checker.on_checked.connect(self.on_code_checked)
         if not os.path.exists(DATA_DIR):
             logger.debug('Creating directory: {}'.format(DATA_DIR))
             os.makedirs(DATA_DIR)
@@ -562,6 +1481,17 @@ class Editor:
             # Open the file
             self.direct_load(file)
 
+        @view.tab_closed.connect
+        def on_tab_closed(tab):
+            # Let the results of checking the tab's code be forgotten.
+            self.checker.release(id(tab))
+
+        @view.code_changed.connect
+        def on_code_changed(tab):
+            # Keep displayed annotations up to date as the code is edited.
+            if tab.has_annotations:
+                self.request_check(tab, scoped=True)
+
     def setup(self, modes):
         """
         Define the available modes and ensure there's a default working
@@ -597,9 +1527,10 @@ class Editor:
         if not os.path.exists(music_path):
             logger.debug('Creating directory: {}'.format(music_path))
             os.makedirs(music_path)
-        # Start the timer to poll every second for an attached or removed
-        # USB device.
-        self._view.set_usb_checker(1, self.check_usb)
+        # Watch for attached or removed USB devices.
+        self._view.set_usb_checker(USB_POLL_INTERVAL, self.check_usb)
+        # Check code in a separate thread so the UI remains responsive.
+        self._view.set_code_checker(self.checker)
 
     def restore_session(self, paths=None):
         """
@@ -609,6 +1540,8 @@ class Editor:
         ignored).
         """
         settings_path = get_session_path()
+        # Remember previous check results so unchanged code isn't re-checked.
+        self.check_cache.load()
         self.change_mode(self.mode)
         with open(settings_path) as f:
             try:
@@ -658,18 +1591,41 @@ class Editor:
                             logger.warning('The specified micro:bit runtime '
                                            'does not exist. Using default '
                                            'runtime instead.')
+                if 'scrollback' in old_session:
+                    self.scrollback = old_session['scrollback']
+                    logger.info('Scrollback: {} lines'.format(
+                                self.scrollback))
+                if 'scrollback_log' in old_session:
+                    self.scrollback_log = old_session['scrollback_log']
+                if old_session.get('capture_format') in CAPTURE_WRITERS:
+                    self.capture_format = old_session['capture_format']
+                    logger.info('Plotter data captured as: {}'.format(
+                                self.capture_format))
+        self._view.set_scrollback(self.scrollback, self.scrollback_log_file())
         # handle os passed file last,
         # so it will not be focused over by another tab
         if paths and len(paths) > 0:
             self.load_cli(paths)
         if not self._view.tab_count:
             py = _('# Write your code here :-)')
-            self._view.add_tab(None, py, self.modes[self.mode].api(), NEWLINE)
+            self._view.add_tab(None, py, self.modes[self.mode].api_source(),
+                               NEWLINE)
             logger.info('Starting with blank file.')
         self.change_mode(self.mode)
         self._view.set_theme(self.theme)
         self.show_status_message(random.choice(MOTD), 10)
 
+    def scrollback_log_file(self):
+        """
+        Return the file to which output trimmed from the REPL and runner panes
+        is written, or None if it's just discarded.
+        """
+        if not self.scrollback_log:
+            return None
+        # Imported here since the modes themselves depend on this module.
+        from mu.modes.base import get_default_workspace
+        return os.path.join(get_default_workspace(), 'logs', SCROLLBACK_LOG)
+
     def toggle_theme(self):
         """
         Switches between themes (night, day or high-contrast).
@@ -688,7 +1644,8 @@ class Editor:
         Adds a new tab to the editor.
         """
         logger.info('Added a new tab.')
-        self._view.add_tab(None, '', self.modes[self.mode].api(), NEWLINE)
+        self._view.add_tab(None, '', self.modes[self.mode].api_source(),
+                           NEWLINE)
 
     def _load(self, path):
         """
@@ -776,7 +1733,7 @@ class Editor:
                     self.change_mode(file_mode)
             logger.debug(text)
             self._view.add_tab(
-                name, text, self.modes[self.mode].api(), newline)
+                name, text, self.modes[self.mode].api_source(), newline)
 
     def load(self):
         """
@@ -910,40 +1867,61 @@ class Editor:
         """
         Uses PyFlakes and PyCodeStyle to gather information about potential
         problems with the code in the current tab.
+
+        The check happens in the background and the results are displayed by
+        on_code_checked when they arrive.
         """
         tab = self._view.current_tab
         if tab is None:
             # There is no active text editor so abort.
             return
         tab.has_annotations = not tab.has_annotations
+        self._view.reset_annotations()
         if tab.has_annotations:
             logger.info('Checking code.')
-            self._view.reset_annotations()
-            filename = tab.path if tab.path else _('untitled')
-            builtins = self.modes[self.mode].builtins
-            flake = check_flake(filename, tab.text(), builtins)
-            if flake:
-                logger.info(flake)
-                self._view.annotate_code(flake, 'error')
-            pep8 = check_pycodestyle(tab.text())
-            if pep8:
-                logger.info(pep8)
-                self._view.annotate_code(pep8, 'style')
-            self._view.show_annotations()
-            tab.has_annotations = bool(flake or pep8)
-            if not tab.has_annotations:
-                # No problems detected, so confirm this with a friendly
-                # message.
-                ok_messages = [
-                    _('Good job! No problems found.'),
-                    _('Hurrah! Checker turned up no problems.'),
-                    _('Nice one! Zero problems detected.'),
-                    _('Well done! No problems here.'),
-                    _('Awesome! Zero problems found.'),
-                ]
-                self.show_status_message(random.choice(ok_messages))
+            self.request_check(tab)
+
+    def request_check(self, tab, scoped=False):
+        """
+        Ask the code checker to check the code in the referenced tab. If
+        scoped, only the parts changed since the last check are re-checked.
+        """
+        filename = tab.path if tab.path else _('untitled')
+        builtins = self.modes[self.mode].builtins
+        self.checker.request(id(tab), filename, tab.text(), builtins, scoped)
+
+    def on_code_checked(self, tab_id, number, flake, pep8):
+        """
+        Display the results of checking the code in the tab with the
+        referenced id. Results from stale requests, for tabs that have since
+        been closed or whose annotations have been toggled off are ignored.
+        """
+        if not self.checker.is_current(tab_id, number):
+            return
+        for tab in self._view.widgets:
+            if id(tab) == tab_id:
+                break
         else:
-            self._view.reset_annotations()
+            return
+        if not tab.has_annotations:
+            return
+        if flake:
+            logger.info(flake)
+        if pep8:
+            logger.info(pep8)
+        tab.update_check_annotations({'error': flake, 'style': pep8})
+        tab.has_annotations = bool(flake or pep8)
+        if not tab.has_annotations:
+            # No problems detected, so confirm this with a friendly
+            # message.
+            ok_messages = [
+                _('Good job! No problems found.'),
+                _('Hurrah! Checker turned up no problems.'),
+                _('Nice one! Zero problems detected.'),
+                _('Well done! No problems here.'),
+                _('Awesome! Zero problems found.'),
+            ]
+            self.show_status_message(random.choice(ok_messages))
 
     def show_help(self):
         """
@@ -982,6 +1960,10 @@ class Editor:
             # If quitting while debugging, make sure everything is cleaned
             # up.
             self.modes[self.mode].stop()
+        # Finish saving any data captured by the plotter.
+        self.modes[self.mode].stop_capture()
+        self._view.stop_code_checker()
+        self._view.stop_usb_checker()
         session = {
             'theme': self.theme,
             'mode': self.mode,
@@ -989,12 +1971,16 @@ class Editor:
             'envars': self.envars,
             'minify': self.minify,
             'microbit_runtime': self.microbit_runtime,
+            'scrollback': self.scrollback,
+            'scrollback_log': self.scrollback_log,
+            'capture_format': self.capture_format,
         }
         session_path = get_session_path()
         with open(session_path, 'w') as out:
             logger.debug('Session: {}'.format(session))
             logger.debug('Saving session to: {}'.format(session_path))
             json.dump(session, out, indent=2)
+        self.check_cache.save()
         logger.info('Quitting.\n\n')
         sys.exit(0)
 
@@ -1046,6 +2032,9 @@ class Editor:
         Given the name of a mode, will make the necessary changes to put the
         editor into the new mode.
         """
+        if self.mode in self.modes:
+            # Finish saving the data captured by the old mode's plotter.
+            self.modes[self.mode].stop_capture()
         self.mode = mode
         # Remove the old mode's REPL / filesystem / plotter if required.
         self._view.remove_repl()
@@ -1106,14 +2095,16 @@ class Editor:
         """
         devices = []
         device_types = set()
-        # Detect connected devices.
-        for name, mode in self.modes.items():
-            if hasattr(mode, 'find_device'):
-                # The mode can detect an attached device.
-                port = mode.find_device(with_logging=False)
-                if port:
-                    devices.append((name, port))
-                    device_types.add(name)
+        # Detect connected devices for all the modes that can detect an
+        # attached device from a single look at the available ports. Only the
+        # modes with an attached device are loaded.
+        boards = self.modes.boards()
+        found = PORTS.find_devices(boards)
+        for name in boards:
+            if name in found:
+                port = self.modes[name].port_path(found[name].name)
+                devices.append((name, port))
+                device_types.add(name)
         # Remove no-longer connected devices.
         to_remove = []
         for connected in self.connected_devices:
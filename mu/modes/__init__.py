@@ -1,8 +1,26 @@
-from .python3 import PythonMode
-from .adafruit import AdafruitMode
-from .microbit import MicrobitMode
-from .debugger import DebugMode
-from .pygamezero import PyGameZeroMode
-
-__all__ = ['PythonMode', 'AdafruitMode', 'MicrobitMode', 'DebugMode',
-           'PyGameZeroMode', ]
+"""
+The modes available in Mu.
+
+A mode's module (along with its dependencies) is only imported when the mode
+is first used, so Mu starts without having to load every mode.
+"""
+import importlib
+from collections import OrderedDict
+
+
+#: The module and class name of each mode, keyed by the mode's short name.
+MODES = OrderedDict([
+    ('python', ('mu.modes.python3', 'PythonMode')),
+    ('adafruit', ('mu.modes.adafruit', 'AdafruitMode')),
+    ('microbit', ('mu.modes.microbit', 'MicrobitMode')),
+    ('debugger', ('mu.modes.debugger', 'DebugMode')),
+    ('pygamezero', ('mu.modes.pygamezero', 'PyGameZeroMode')),
+])
+
+
+def load_mode(name):
+    """
+    Import and return the class of the mode with the referenced short name.
+    """
+    module_name, class_name = MODES[name]
+    return getattr(importlib.import_module(module_name), class_name)
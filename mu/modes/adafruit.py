@@ -18,9 +18,8 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 import os
 import ctypes
-from subprocess import check_output
+from mu.logic import MOUNTS
 from mu.modes.base import MicroPythonMode
-from mu.modes.api import ADAFRUIT_APIS, SHARED_APIS
 from mu.interface.panes import CHARTS
 
 
@@ -30,6 +29,7 @@ class AdafruitMode(MicroPythonMode):
     """
 
     name = _('Adafruit CircuitPython')
+    short_name = 'adafruit'
     description = _("Use CircuitPython on Adafruit's line of boards.")
     icon = 'adafruit'
     save_timeout = 0  #: Don't autosave on Adafruit boards. Casues a restart.
@@ -86,15 +86,7 @@ class AdafruitMode(MicroPythonMode):
         # plugged in CIRCUITPY board.
         if os.name == 'posix':
             # We're on Linux or OSX
-            for mount_command in ['mount', '/sbin/mount']:
-                try:
-                    mount_output = check_output(mount_command).splitlines()
-                    mounted_volumes = [x.split()[2] for x in mount_output]
-                    for volume in mounted_volumes:
-                        if volume.endswith(b'CIRCUITPY'):
-                            device_dir = volume.decode('utf-8')
-                except FileNotFoundError:
-                    next
+            device_dir = MOUNTS.find('CIRCUITPY')
         elif os.name == 'nt':
             # We're on Windows.
 
@@ -157,4 +149,5 @@ class AdafruitMode(MicroPythonMode):
         Return a list of API specifications to be used by auto-suggest and call
         tips.
         """
+        from mu.modes.api import ADAFRUIT_APIS, SHARED_APIS
         return SHARED_APIS + ADAFRUIT_APIS
@@ -19,12 +19,13 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import json
 import os
 import os.path
-import csv
-import time
 import logging
-from PyQt5.QtSerialPort import QSerialPortInfo
 from PyQt5.QtCore import QObject
-from mu.logic import HOME_DIRECTORY, WORKSPACE_NAME, get_settings_path
+from mu import __version__, language_code
+from mu.capture import CAPTURE_WRITERS, CaptureWriter
+from mu.logic import (HOME_DIRECTORY, WORKSPACE_NAME, PORTS,
+                      get_settings_path)
+from mu.resources import path
 
 
 logger = logging.getLogger(__name__)
@@ -43,6 +44,17 @@ BOARD_IDS = set([
 ])
 
 
+def compiled_api_path(short_name, language=None):
+    """
+    Return the path of the file containing the API definitions for the
+    referenced mode compiled (prepared for QScintilla) by utils/mkapi.py for
+    this version of Mu in the referenced language (defaults to Mu's language).
+    """
+    filename = '{}-{}-{}.pap'.format(short_name, __version__,
+                                     language or language_code)
+    return path(filename, 'api/')
+
+
 def get_default_workspace():
     """
     Return the location on the filesystem for opening and closing files.
@@ -78,10 +90,12 @@ class BaseMode(QObject):
     """
 
     name = 'UNNAMED MODE'
+    short_name = None  #: Identifies the mode (e.g. its compiled API files).
     description = 'DESCRIPTION NOT AVAILABLE.'
     icon = 'help'
     repl = None
     plotter = None
+    capture = None  #: Writes the plotter's data to file (see start_capture).
     is_debugger = False
     has_debugger = False
     save_timeout = 5  #: Number of seconds to wait before saving work.
@@ -117,6 +131,18 @@ class BaseMode(QObject):
         """
         return NotImplemented
 
+    def api_source(self):
+        """
+        Return the API to be used by auto-suggest and call tips: the path to
+        the mode's API definitions compiled by utils/mkapi.py if they exist,
+        otherwise the list of API specifications returned by api().
+        """
+        if self.short_name:
+            compiled = compiled_api_path(self.short_name)
+            if os.path.isfile(compiled):
+                return compiled
+        return self.api()
+
     def set_buttons(self, **kwargs):
         """
         Given the names and boolean settings of buttons associated with actions
@@ -135,47 +161,34 @@ class BaseMode(QObject):
 
     def remove_plotter(self):
         """
-        If there's an active plotter, hide it.
-
-        Save any data captured while the plotter was active into a directory
-        called 'data_capture' in the workspace directory. The file contains
-        CSV data and is named with a timestamp for easy identification.
+        If there's an active plotter, hide it and stop capturing its data.
         """
-        data_dir = os.path.join(get_default_workspace(), 'data_capture')
-        if not os.path.exists(data_dir):
-            logger.debug('Creating directory: {}'.format(data_dir))
-            os.makedirs(data_dir)
-        # Save the raw data as CSV
-        filename = "{}.csv".format(time.strftime("%Y%m%d-%H%M%S"))
-        f = os.path.join(data_dir, filename)
-        with open(f, 'w') as csvfile:
-            csv_writer = csv.writer(csvfile)
-            csv_writer.writerows(self.view.plotter_pane.raw_data)
+        self.stop_capture()
         self.view.remove_plotter()
         self.plotter = None
         logger.info('Removing plotter')
 
-    def on_data_flood(self):
+    def start_capture(self):
         """
-        Handle when the plotter is being flooded by data (which usually causes
-        Mu to become unresponsive). In this case, remove the plotter and
-        display a warning dialog to explain what's happened and how to fix
-        things (usually, put a time.sleep(x) into the code generating the
-        data).
+        Save the data from the plotter, as it arrives, into a directory called
+        'data_capture' in the workspace directory. The files contain CSV data
+        (or, if the editor's capture_format is 'binary', Mu's binary capture
+        format) and are named with a timestamp for easy identification.
         """
-        logger.error('Plotting data flood detected.')
-        self.view.remove_plotter()
-        self.plotter = None
-        msg = _('Data Flood Detected!')
-        info = _("The plotter is flooded with data which will make Mu "
-                 "unresponsive and freeze. As a safeguard, the plotter has "
-                 "been stopped.\n\n"
-                 "Flooding is when chunks of data of more than 1024 bytes are "
-                 "repeatedly sent to the plotter.\n\n"
-                 "To fix this, make sure your code prints small tuples of "
-                 "data between calls to 'sleep' for a very short period of "
-                 "time.")
-        self.view.show_message(msg, info)
+        self.stop_capture()
+        data_dir = os.path.join(get_default_workspace(), 'data_capture')
+        writer = CAPTURE_WRITERS.get(self.editor.capture_format, CaptureWriter)
+        self.capture = writer(data_dir)
+        self.capture.start()
+        self.view.plotter_pane.data_added.connect(self.capture.write)
+
+    def stop_capture(self):
+        """
+        If the plotter's data is being captured, finish writing it to file.
+        """
+        if self.capture:
+            self.capture.close()
+            self.capture = None
 
     def open_file(self, path):
         """
@@ -195,23 +208,21 @@ class MicroPythonMode(BaseMode):
         """
         Returns the port for the first MicroPython-ish device found connected
         to the host computer. If no device is found, return None.
+
+        The ports are those last seen by the shared PortScanner, which only
+        enumerates them again if they're not being watched for changes.
         """
-        available_ports = QSerialPortInfo.availablePorts()
-        for port in available_ports:
-            pid = port.productIdentifier()
-            vid = port.vendorIdentifier()
-            # Look for the port VID & PID in the list of know board IDs
-            if (vid, pid) in self.valid_boards:
-                port_name = port.portName()
-                if with_logging:
-                    logger.info('Found device on port: {}'.format(port_name))
-                return self.port_path(port_name)
+        available_ports = PORTS.ports()
+        device = PORTS.find_devices({self.name: self.valid_boards},
+                                    available_ports).get(self.name)
+        if device:
+            if with_logging:
+                logger.info('Found device on port: {}'.format(device.name))
+            return self.port_path(device.name)
         if with_logging:
             logger.warning('Could not find device.')
             logger.debug('Available ports:')
-            logger.debug(['PID:{} VID:{} PORT:{}'.format(p.productIdentifier(),
-                                                         p.vendorIdentifier(),
-                                                         p.portName())
+            logger.debug(['PID:{} VID:{} PORT:{}'.format(p.pid, p.vid, p.name)
                          for p in available_ports])
         return None
 
@@ -292,7 +303,8 @@ class MicroPythonMode(BaseMode):
         device_port = self.find_device()
         if device_port:
             try:
-                self.view.add_micropython_plotter(device_port, self.name, self)
+                self.view.add_micropython_plotter(device_port, self.name)
+                self.start_capture()
                 logger.info('Started plotter')
                 self.plotter = True
             except IOError as ex:
@@ -312,10 +324,3 @@ class MicroPythonMode(BaseMode):
                             " the device's reset button and wait a few seconds"
                             ' before trying again.')
             self.view.show_message(message, information)
-
-    def on_data_flood(self):
-        """
-        Ensure the REPL is stopped if there is data flooding of the plotter.
-        """
-        self.remove_repl()
-        super().on_data_flood()
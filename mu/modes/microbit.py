@@ -22,9 +22,8 @@ import sys
 import os.path
 import logging
 from tokenize import TokenError
-from mu.logic import HOME_DIRECTORY
+from mu.logic import HOME_DIRECTORY, MOUNTS
 from mu.contrib import uflash, microfs
-from mu.modes.api import MICROBIT_APIS, SHARED_APIS
 from mu.modes.base import MicroPythonMode
 from mu.interface.panes import CHARTS
 from PyQt5.QtCore import QObject, QThread, pyqtSignal, QTimer
@@ -80,13 +79,22 @@ class FileManager(QObject):
     UI remains responsive.
 
     Provides an FTP-ish API. Emits signals on success or failure of different
-    operations.
+    operations. The get_files, put_files and delete_files operations work on
+    a whole selection of files, listing the files on the micro:bit just once
+    at the end.
+
+    All the operations are run in a single session with the micro:bit (see
+    microfs.MicrobitSession), so the device is only reset into the raw REPL
+    for the first of them. Call close once finished with the file manager.
     """
 
     # Emitted when the tuple of files on the micro:bit is known.
     on_list_files = pyqtSignal(tuple)
     # Emitted when the file with referenced filename is got from the micro:bit.
     on_get_file = pyqtSignal(str)
+    # Emitted as the file with referenced filename is got from the micro:bit,
+    # with the number of bytes received so far and the size of the file.
+    on_get_progress = pyqtSignal(str, int, int)
     # Emitted when the file with referenced filename is put onto the micro:bit.
     on_put_file = pyqtSignal(str)
     # Emitted when the file with referenced filename is deleted from the
@@ -100,6 +108,16 @@ class FileManager(QObject):
     on_put_fail = pyqtSignal(str)
     # Emitted when the referenced file fails to be deleted from the micro:bit.
     on_delete_fail = pyqtSignal(str)
+    # Emitted when the micro:bit is synced with a local directory, with the
+    # lists of files copied onto and removed from the micro:bit.
+    on_sync = pyqtSignal(list, list)
+    # Emitted when syncing the micro:bit with the referenced local directory
+    # fails.
+    on_sync_fail = pyqtSignal(str)
+
+    def __init__(self):
+        super().__init__()
+        self.session = microfs.MicrobitSession()
 
     def on_start(self):
         """
@@ -114,7 +132,7 @@ class FileManager(QObject):
         or emit a failure signal.
         """
         try:
-            result = tuple(microfs.ls())
+            result = tuple(microfs.ls(self.session))
             self.on_list_files.emit(result)
         except Exception as ex:
             logger.exception(ex)
@@ -123,11 +141,15 @@ class FileManager(QObject):
     def get(self, microbit_filename, local_filename):
         """
         Get the referenced micro:bit filename and save it to the local
-        filename. Emit the name of the filename when complete or emit a
-        failure signal.
+        filename. Emit the progress as it's received, then the name of the
+        filename when complete or emit a failure signal.
         """
+        def progress(received, size):
+            self.on_get_progress.emit(microbit_filename, received, size)
+
         try:
-            microfs.get(microbit_filename, local_filename)
+            microfs.get(microbit_filename, local_filename, self.session,
+                        progress)
             self.on_get_file.emit(microbit_filename)
         except Exception as ex:
             logger.error(ex)
@@ -140,7 +162,7 @@ class FileManager(QObject):
         a failure signal.
         """
         try:
-            microfs.put(local_filename, target=None)
+            microfs.put(local_filename, target=None, serial=self.session)
             self.on_put_file.emit(os.path.basename(local_filename))
         except Exception as ex:
             logger.error(ex)
@@ -152,21 +174,77 @@ class FileManager(QObject):
         of the file when complete, or emit a failure signal.
         """
         try:
-            microfs.rm(microbit_filename)
+            microfs.rm(microbit_filename, self.session)
             self.on_delete_file.emit(microbit_filename)
         except Exception as ex:
             logger.error(ex)
             self.on_delete_fail.emit(microbit_filename)
 
+    def get_files(self, files):
+        """
+        Get each of the referenced (micro:bit filename, local filename) pairs
+        in turn, emitting the signals for each as with get, then list the
+        files on the micro:bit once they're all done.
+        """
+        for microbit_filename, local_filename in files:
+            self.get(microbit_filename, local_filename)
+        self.ls()
+
+    def put_files(self, local_filenames):
+        """
+        Put each of the referenced local files onto the micro:bit in turn,
+        emitting the signals for each as with put, then list the files on the
+        micro:bit once they're all done.
+        """
+        for local_filename in local_filenames:
+            self.put(local_filename)
+        self.ls()
+
+    def delete_files(self, microbit_filenames):
+        """
+        Delete each of the referenced files on the micro:bit in turn, emitting
+        the signals for each as with delete, then list the files on the
+        micro:bit once they're all done.
+        """
+        for microbit_filename in microbit_filenames:
+            self.delete(microbit_filename)
+        self.ls()
+
+    def sync(self, local_directory, delete):
+        """
+        Copy the new and changed files in the referenced local directory onto
+        the micro:bit (see microfs.sync), removing the files which aren't in
+        the directory if delete is True. Emit the files copied and removed,
+        or a failure signal, then list the files on the micro:bit.
+        """
+        try:
+            copied, removed = microfs.sync(local_directory, self.session,
+                                           delete)
+            self.on_sync.emit(copied, removed)
+        except Exception as ex:
+            logger.error(ex)
+            self.on_sync_fail.emit(local_directory)
+        self.ls()
+
+    def close(self):
+        """
+        End the session with the micro:bit, leaving it out of raw mode and
+        freeing its serial port for the REPL or plotter.
+        """
+        self.session.close()
+
 
 class MicrobitMode(MicroPythonMode):
     """
     Represents the functionality required by the micro:bit mode.
     """
     name = _('BBC micro:bit')
+    short_name = 'microbit'
     description = _("Write MicroPython for the BBC micro:bit.")
     icon = 'microbit'
     fs = None  #: Reference to filesystem navigator.
+    file_manager = None  #: Runs the filesystem navigator's operations.
+    file_manager_thread = None
     flash_thread = None
     flash_timer = None
     file_extensions = ['hex']
@@ -220,6 +298,7 @@ class MicrobitMode(MicroPythonMode):
         Return a list of API specifications to be used by auto-suggest and call
         tips.
         """
+        from mu.modes.api import MICROBIT_APIS, SHARED_APIS
         return SHARED_APIS + MICROBIT_APIS
 
     def flash(self):
@@ -277,7 +356,10 @@ class MicrobitMode(MicroPythonMode):
                 return
         # Determine the location of the BBC micro:bit. If it can't be found
         # fall back to asking the user to locate it.
-        path_to_microbit = uflash.find_microbit()
+        if os.name == 'posix':
+            path_to_microbit = MOUNTS.find('MICROBIT')
+        else:
+            path_to_microbit = uflash.find_microbit()
         if path_to_microbit is None:
             # Has the path to the device already been specified?
             if self.user_defined_microbit_path:
@@ -426,7 +508,7 @@ class MicrobitMode(MicroPythonMode):
         Add the file system navigator to the UI.
         """
         # Check for micro:bit
-        if not microfs.find_microbit():
+        if not self.find_device(with_logging=False):
             message = _('Could not find an attached BBC micro:bit.')
             information = _("Please make sure the device is plugged "
                             "into this computer.\n\nThe device must "
@@ -455,18 +537,15 @@ class MicrobitMode(MicroPythonMode):
         if self.fs is None:
             raise RuntimeError("File system not running")
         self.view.remove_filesystem()
+        if self.file_manager_thread:
+            # Let any operation in progress finish before ending the session.
+            self.file_manager_thread.quit()
+            self.file_manager_thread.wait()
+            self.file_manager.close()
         self.file_manager = None
         self.file_manager_thread = None
         self.fs = None
 
-    def on_data_flood(self):
-        """
-        Ensure the Files button is active before the REPL is killed off when
-        a data flood of the plotter is detected.
-        """
-        self.set_buttons(files=True)
-        super().on_data_flood()
-
     def open_file(self, path):
         """
         Tries to open a MicroPython hex file with an embedded Python script.
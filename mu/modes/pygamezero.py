@@ -19,7 +19,6 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import os
 import logging
 from mu.modes.base import BaseMode
-from mu.modes.api import PYTHON3_APIS, SHARED_APIS, PI_APIS, PYGAMEZERO_APIS
 from mu.logic import write_and_flush
 from mu.resources import load_icon
 
@@ -33,6 +32,7 @@ class PyGameZeroMode(BaseMode):
     """
 
     name = _('Pygame Zero')
+    short_name = 'pygamezero'
     description = _('Make games with Pygame Zero.')
     icon = 'pygamezero'
     runner = None
@@ -88,6 +88,8 @@ class PyGameZeroMode(BaseMode):
         Return a list of API specifications to be used by auto-suggest and call
         tips.
         """
+        from mu.modes.api import (PYTHON3_APIS, SHARED_APIS, PI_APIS,
+                                  PYGAMEZERO_APIS)
         return SHARED_APIS + PYTHON3_APIS + PI_APIS + PYGAMEZERO_APIS
 
     def play_toggle(self, event):
@@ -20,12 +20,9 @@ import sys
 import os
 import logging
 from mu.modes.base import BaseMode
-from mu.modes.api import PYTHON3_APIS, SHARED_APIS, PI_APIS
 from mu.logic import write_and_flush
 from mu.resources import load_icon
 from mu.interface.panes import CHARTS
-from qtconsole.manager import QtKernelManager
-from qtconsole.client import QtKernelClient
 from PyQt5.QtCore import QObject, QThread, pyqtSignal
 
 
@@ -37,7 +34,9 @@ class KernelRunner(QObject):
     Used to control the iPython kernel in a non-blocking manner so the UI
     remains responsive.
     """
-    kernel_started = pyqtSignal(QtKernelManager, QtKernelClient)
+    # Emits the QtKernelManager and QtKernelClient (their types aren't given
+    # so qtconsole is only imported when the kernel is started).
+    kernel_started = pyqtSignal(object, object)
     kernel_finished = pyqtSignal()
     # Used to build context with user defined envars when running the REPL.
     default_envars = os.environ.copy()
@@ -55,6 +54,7 @@ class KernelRunner(QObject):
         Create the expected context, start the kernel, obtain a client and
         emit a signal when both are started.
         """
+        from qtconsole.manager import QtKernelManager
         logger.info(sys.path)
         os.chdir(self.cwd)  # Ensure the kernel runs with the expected CWD.
         # Add user defined envars to os.environ so they can be picked up by
@@ -95,6 +95,7 @@ class PythonMode(BaseMode):
     """
 
     name = _('Python 3')
+    short_name = 'python'
     description = _('Create code using standard Python 3.')
     icon = 'python'
     runner = None
@@ -145,6 +146,7 @@ class PythonMode(BaseMode):
         Return a list of API specifications to be used by auto-suggest and call
         tips.
         """
+        from mu.modes.api import PYTHON3_APIS, SHARED_APIS, PI_APIS
         return SHARED_APIS + PYTHON3_APIS + PI_APIS
 
     def run_toggle(self, event):
@@ -276,7 +278,8 @@ class PythonMode(BaseMode):
         """
         Add a plotter pane.
         """
-        self.view.add_python3_plotter(self)
+        self.view.add_python3_plotter()
+        self.start_capture()
         logger.info('Started plotter')
         self.plotter = True
         self.set_buttons(debug=False)
@@ -292,19 +295,6 @@ class PythonMode(BaseMode):
         self.set_buttons(run=True, repl=True, debug=True)
         super().remove_plotter()
 
-    def on_data_flood(self):
-        """
-        Ensure the process (REPL or runner) causing the data flood is stopped
-        *before* the base on_data_flood is called to turn off the plotter and
-        tell the user what to fix.
-        """
-        self.set_buttons(run=True, repl=True, debug=True)
-        if self.kernel_runner:
-            self.remove_repl()
-        elif self.runner:
-            self.run_toggle(None)
-        super().on_data_flood()
-
     def on_kernel_start(self, kernel_manager, kernel_client):
         """
         Handles UI update when the kernel runner has started the iPython
@@ -0,0 +1,576 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the vendored microfs module's protocol for talking to a micro:bit.
+"""
+import os
+import re
+import struct
+import pytest
+from mu.contrib import microfs
+from unittest import mock
+
+
+class FakeSerial:
+    """
+    Stands in for the serial connection to a micro:bit. Everything written is
+    recorded. What the device sends is read from the responses, to which the
+    result of calling device (if given) with each write is added.
+    """
+
+    def __init__(self, responses=b'', device=None):
+        self.responses = responses
+        self.device = device
+        self.written = []
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.written.append(data)
+        if self.device:
+            self.responses += self.device(data)
+
+    def read(self, size=1):
+        data = self.responses[:size]
+        self.responses = self.responses[size:]
+        return data
+
+    def read_until(self, terminator):
+        end = self.responses.find(terminator)
+        if end < 0:
+            end = len(self.responses)
+        else:
+            end += len(terminator)
+        return self.read(end)
+
+    def inWaiting(self):
+        return len(self.responses)
+
+    def close(self):
+        self.closed = True
+
+
+def fake_session(serial, *helpers):
+    """
+    Return a session using the serial connection, as if the device were
+    already in raw mode with the referenced helpers defined.
+    """
+    session = microfs.MicrobitSession(serial)
+    session.raw = True
+    session.defined.update(helpers)
+    return session
+
+
+def sent_chunks(written):
+    """
+    Return the chunks of a file sent by put, from what was written after
+    asking the device to receive it.
+    """
+    chunks = []
+    for data in written:
+        assert data[0] - 32 == len(data) - 1
+        chunks.append(data[1:])
+    return chunks
+
+
+def decode_chunk(chunk):
+    """
+    Unescape a chunk of a file sent by put, as the device does (see
+    RECEIVER).
+    """
+    i = chunk.find(b'\x10')
+    while i >= 0:
+        chunk = chunk[:i] + bytes([chunk[i + 1] - 64]) + chunk[i + 2:]
+        i = chunk.find(b'\x10', i + 1)
+    return chunk
+
+
+#: The stderr output of a device which is out of space.
+DISK_FULL = b'Traceback (most recent call last):\r\nOSError: 28\r\n'
+
+
+def test_encode_file():
+    """
+    CTRL-C and the escape byte are escaped, everything else is left alone.
+    """
+    assert microfs.encode_file(b'a\x03b\x10c\x04') == b'a\x10Cb\x10Pc\x04'
+    assert decode_chunk(microfs.encode_file(bytes(range(256)))) == \
+        bytes(range(256))
+
+
+def test_send_file():
+    """
+    The file is sent a chunk at a time, each once the device has asked for
+    it, ending with an empty chunk. An escaped byte is never split between
+    chunks.
+    """
+    content = b'x' * 62 + b'\x03' + b'\x10' * 35
+    serial = FakeSerial(b'OK' + microfs.ACK * 4 + b'\x04\x04>')
+    session = fake_session(serial, '_mufs_recv')
+    assert microfs.send_file(session, content, 'foo.py') == (b'', b'')
+    assert serial.written[0] == b"_mufs_recv('foo.py')\x04"
+    chunks = sent_chunks(serial.written[1:])
+    # Both the first and second chunks would otherwise end with the escape
+    # byte.
+    assert [len(chunk) for chunk in chunks] == [62, 62, 10, 0]
+    assert not any(chunk.endswith(b'\x10') for chunk in chunks)
+    assert b''.join(decode_chunk(chunk) for chunk in chunks) == content
+    assert serial.responses == b''
+
+
+def test_send_file_defines_receiver():
+    """
+    The receiver is defined on the device the first time a file is sent in
+    the session.
+    """
+    serial = FakeSerial(b'OK\x04\x04>' + b'OK' + microfs.ACK * 2 +
+                        b'\x04\x04>')
+    session = fake_session(serial)
+    with mock.patch('mu.contrib.microfs.time.sleep'):
+        assert microfs.send_file(session, b'x', 'foo.py') == (b'', b'')
+    assert b''.join(serial.written).startswith(
+        microfs.RECEIVER.encode('utf-8'))
+    assert '_mufs_recv' in session.defined
+
+
+def test_send_file_define_fails():
+    """
+    If the receiver can't be defined, the error is returned and the file
+    isn't sent.
+    """
+    serial = FakeSerial(b'OK\x04' + DISK_FULL + b'\x04>')
+    session = fake_session(serial)
+    with mock.patch('mu.contrib.microfs.time.sleep'):
+        assert microfs.send_file(session, b'x', 'foo.py') == (b'', DISK_FULL)
+    assert not any(data.startswith(b'_mufs_recv(') for data in
+                   serial.written)
+    assert '_mufs_recv' not in session.defined
+
+
+def test_send_file_device_error():
+    """
+    If the device fails while receiving the file it stops acknowledging the
+    chunks and its error is returned.
+    """
+    serial = FakeSerial(b'OK' + microfs.ACK + b'\x04' + DISK_FULL + b'\x04>')
+    session = fake_session(serial, '_mufs_recv')
+    assert microfs.send_file(session, b'x' * 100, 'foo.py') == \
+        (b'', DISK_FULL)
+    assert len(sent_chunks(serial.written[1:])) == 1
+
+
+def test_send_file_no_response():
+    """
+    If the device stops responding while receiving the file, the connection
+    has failed.
+    """
+    serial = FakeSerial(b'OK' + microfs.ACK)
+    session = fake_session(serial, '_mufs_recv')
+    with pytest.raises(microfs.ConnectionFailed):
+        microfs.send_file(session, b'x' * 100, 'foo.py')
+
+
+def test_send_file_not_ok():
+    """
+    If the device doesn't accept the command to receive the file, the
+    connection has failed.
+    """
+    serial = FakeSerial(b'>>> ')
+    session = fake_session(serial, '_mufs_recv')
+    with pytest.raises(microfs.ConnectionFailed):
+        microfs.send_file(session, b'x', 'foo.py')
+    assert len(serial.written) == 1
+
+
+def test_put_error(tmpdir):
+    """
+    A device error while putting a file is raised as an IOError with the
+    last line of the device's error.
+    """
+    path = tmpdir.join('foo.py')
+    path.write_binary(b'x' * 100)
+    serial = FakeSerial(b'OK' + microfs.ACK + b'\x04' + DISK_FULL + b'\x04>')
+    session = fake_session(serial, '_mufs_recv')
+    with pytest.raises(IOError) as ex:
+        microfs.put(str(path), serial=session)
+    assert str(ex.value) == 'OSError: 28'
+
+
+#: What get sends to ask for the chunk at an offset (or -1 to finish).
+OFFSET = re.compile(br'^-?\d+\n$')
+
+
+#: A file which is sent to get in three chunks.
+CONTENT = bytes(range(256)) * 4 + b'The end.'
+
+
+def sender(content, damaged=None):
+    """
+    Return a device for a FakeSerial which sends the content as a file to
+    get (see SENDER). Damaged is a dict of the number of times the frame for
+    each offset arrives damaged before it arrives intact.
+    """
+    damaged = dict(damaged or {})
+
+    def device(data):
+        if data.startswith(b'_mufs_send('):
+            return b'OK' + '{}\n'.format(len(content)).encode('utf-8')
+        if data == b'\x04':
+            # The end of a command, such as defining the sender.
+            return b'OK\x04\x04>'
+        if not OFFSET.match(data):
+            # Part of a command.
+            return b''
+        offset = int(data)
+        if offset < 0:
+            return b'\x04\x04>'
+        chunk = content[offset:offset + microfs.GET_CHUNK_SIZE]
+        frame = struct.pack('>IHH', offset, len(chunk), microfs.crc(chunk))
+        if damaged.get(offset):
+            damaged[offset] -= 1
+            chunk = b'?' + chunk[1:]
+        return frame + chunk
+    return device
+
+
+def requested_offsets(written):
+    """
+    Return the offsets of the chunks get asked the device for.
+    """
+    return [int(data) for data in written if OFFSET.match(data)]
+
+
+def test_crc():
+    """
+    The CRC is CRC-16/XMODEM, as worked out on the device.
+    """
+    assert microfs.crc(b'123456789') == 0x31c3
+    assert microfs.crc(b'') == 0
+
+
+def test_receive_file():
+    """
+    The file is received a chunk at a time, with progress reported once the
+    size is known and as each chunk arrives.
+    """
+    serial = FakeSerial(device=sender(CONTENT))
+    session = fake_session(serial, '_mufs_send')
+    chunks = {}
+    progress = mock.MagicMock()
+    assert microfs.receive_file(session, 'foo.py', chunks, progress) == \
+        (len(CONTENT), b'')
+    assert serial.written[0] == b"_mufs_send('foo.py', 512)\x04"
+    assert requested_offsets(serial.written) == [0, 512, 1024, -1]
+    assert b''.join(chunks[offset] for offset in sorted(chunks)) == CONTENT
+    assert progress.call_args_list == [mock.call(0, 1032),
+                                       mock.call(512, 1032),
+                                       mock.call(1024, 1032),
+                                       mock.call(1032, 1032)]
+
+
+def test_receive_file_resume():
+    """
+    Chunks which have already been received aren't asked for again.
+    """
+    serial = FakeSerial(device=sender(CONTENT))
+    session = fake_session(serial, '_mufs_send')
+    chunks = {0: CONTENT[:512], 1024: b'Too short'}
+    microfs.receive_file(session, 'foo.py', chunks)
+    assert requested_offsets(serial.written) == [512, 1024, -1]
+    assert chunks[1024] == CONTENT[1024:]
+
+
+def test_receive_file_error():
+    """
+    If the device fails instead of sending the size of the file (e.g. there's
+    no such file), its error is returned.
+    """
+    err = b'Traceback (most recent call last):\r\nOSError: 2\r\n'
+    serial = FakeSerial(b'OK\x04' + err + b'\x04>')
+    session = fake_session(serial, '_mufs_send')
+    assert microfs.receive_file(session, 'foo.py', {}) == (0, err)
+
+
+def test_receive_file_bad_size():
+    """
+    If what the device sends isn't the size of the file or an error, the
+    connection has failed.
+    """
+    serial = FakeSerial(b'OK' + b'Hello\n\x04\x04>')
+    session = fake_session(serial, '_mufs_send')
+    with pytest.raises(microfs.ConnectionFailed):
+        microfs.receive_file(session, 'foo.py', {})
+
+
+def test_receive_chunk_damaged():
+    """
+    A chunk which arrives damaged is asked for again.
+    """
+    serial = FakeSerial(device=sender(CONTENT, {512: 2}))
+    with mock.patch('mu.contrib.microfs.time.sleep'):
+        assert microfs.receive_chunk(serial, 512, 512) == CONTENT[512:1024]
+    assert requested_offsets(serial.written) == [512, 512, 512]
+
+
+def test_receive_chunk_gives_up():
+    """
+    If a chunk arrives damaged GET_RETRIES times, the connection has failed.
+    """
+    serial = FakeSerial(device=sender(CONTENT, {0: microfs.GET_RETRIES}))
+    with mock.patch('mu.contrib.microfs.time.sleep'), \
+            pytest.raises(microfs.ConnectionFailed):
+        microfs.receive_chunk(serial, 0, 512)
+    assert requested_offsets(serial.written) == [0] * microfs.GET_RETRIES
+
+
+def test_get_resumes(tmpdir):
+    """
+    If the connection fails part of the way through a get, the session is
+    re-synced and the get carries on from where it left off.
+    """
+    target = str(tmpdir.join('foo.py'))
+    damaged = {512: microfs.GET_RETRIES}
+    serial = FakeSerial(device=sender(CONTENT, damaged))
+    session = fake_session(serial, '_mufs_send')
+    with mock.patch('mu.contrib.microfs.time.sleep'), \
+            mock.patch('mu.contrib.microfs.raw_on') as raw_on:
+        assert microfs.get('foo.py', target, session)
+    raw_on.assert_called_once_with(serial)
+    assert requested_offsets(serial.written) == \
+        [0] + [512] * microfs.GET_RETRIES + [512, 1024, -1]
+    with open(target, 'rb') as f:
+        assert f.read() == CONTENT
+
+
+def test_get_error(tmpdir):
+    """
+    A device error is raised as an IOError and nothing is written.
+    """
+    target = str(tmpdir.join('foo.py'))
+    err = b'Traceback (most recent call last):\r\nOSError: 2\r\n'
+    serial = FakeSerial(b'OK\x04' + err + b'\x04>')
+    session = fake_session(serial, '_mufs_send')
+    with pytest.raises(IOError) as ex:
+        microfs.get('foo.py', target, session)
+    assert str(ex.value) == 'OSError: 2'
+    assert not os.path.exists(target)
+
+
+def test_write_file(tmpdir):
+    """
+    The file is replaced with the content, without leaving anything behind.
+    """
+    target = tmpdir.join('foo.py')
+    target.write_binary(b'Old')
+    microfs.write_file(str(target), b'New')
+    assert target.read_binary() == b'New'
+    assert tmpdir.listdir() == [target]
+
+
+def test_write_file_fails(tmpdir):
+    """
+    If writing the file fails, the original file is left as it was and the
+    partly written file is removed.
+    """
+    target = tmpdir.join('foo.py')
+    target.write_binary(b'Old')
+    with mock.patch('mu.contrib.microfs.os.replace',
+                    side_effect=OSError('Boom')), \
+            pytest.raises(OSError):
+        microfs.write_file(str(target), b'New')
+    assert target.read_binary() == b'Old'
+    assert tmpdir.listdir() == [target]
+
+
+@pytest.mark.parametrize('error', [microfs.ConnectionFailed('Boom'),
+                                   microfs.SerialException('Boom')])
+def test_MicrobitSession_run_resyncs(error):
+    """
+    If the connection fails, the session is re-synced (reconnected and put
+    back into raw mode) and the operation run once more.
+    """
+    serials = [FakeSerial(), FakeSerial()]
+    session = microfs.MicrobitSession()
+    operation = mock.MagicMock(side_effect=[error, 'Done'])
+    with mock.patch('mu.contrib.microfs.get_serial', side_effect=serials), \
+            mock.patch('mu.contrib.microfs.time.sleep'), \
+            mock.patch('mu.contrib.microfs.raw_on') as raw_on:
+        assert session.run(operation) == 'Done'
+    assert operation.call_count == 2
+    assert raw_on.call_args_list == [mock.call(serials[0]),
+                                     mock.call(serials[1])]
+    assert serials[0].closed
+    assert session.serial is serials[1]
+
+
+def test_MicrobitSession_run_device_error():
+    """
+    An error reported by the device doesn't re-sync the session.
+    """
+    session = microfs.MicrobitSession(FakeSerial())
+    operation = mock.MagicMock(side_effect=IOError('OSError: 2'))
+    with mock.patch('mu.contrib.microfs.time.sleep'), \
+            mock.patch('mu.contrib.microfs.raw_on') as raw_on, \
+            pytest.raises(IOError):
+        session.run(operation)
+    assert operation.call_count == 1
+    assert raw_on.call_count == 1
+    assert session.raw
+
+
+def test_MicrobitSession_run_gives_up():
+    """
+    If the connection fails again once re-synced, the failure is raised.
+    """
+    session = microfs.MicrobitSession(FakeSerial())
+    operation = mock.MagicMock(side_effect=microfs.ConnectionFailed('Boom'))
+    with mock.patch('mu.contrib.microfs.time.sleep'), \
+            mock.patch('mu.contrib.microfs.raw_on') as raw_on, \
+            pytest.raises(microfs.ConnectionFailed):
+        session.run(operation)
+    assert operation.call_count == 2
+    assert raw_on.call_count == 2
+
+
+def test_MicrobitSession_sync_once():
+    """
+    Several commands in a session only put the device into raw mode once.
+    """
+    # Each of these sends two commands, the first of which imports os.
+    serial = FakeSerial(b'OK\x04\x04>' + b'OK[]\r\n\x04\x04>' +
+                        b'OK\x04\x04>' * 3 +
+                        b"OK['bar.py']\r\n\x04\x04>")
+    session = microfs.MicrobitSession(serial)
+    with mock.patch('mu.contrib.microfs.time.sleep'), \
+            mock.patch('mu.contrib.microfs.raw_on') as raw_on:
+        assert microfs.ls(session) == []
+        assert microfs.rm('foo.py', session)
+        assert microfs.ls(session) == ['bar.py']
+    raw_on.assert_called_once_with(serial)
+    assert serial.responses == b''
+
+
+def test_MicrobitSession_define():
+    """
+    Helpers are only defined once, until the session is reset (which resets
+    the device and so forgets them).
+    """
+    serial = FakeSerial(b'OK\x04\x04>' * 2)
+    session = fake_session(serial)
+    with mock.patch('mu.contrib.microfs.time.sleep'):
+        assert session.define('_x', 'def _x():\n pass\n') == b''
+        assert session.define('_x', 'def _x():\n pass\n') == b''
+        assert serial.written.count(b'\x04') == 1
+        session.reset()
+        assert session.defined == set()
+        assert not session.raw
+        assert session.define('_x', 'def _x():\n pass\n') == b''
+    assert serial.written.count(b'\x04') == 2
+
+
+def test_MicrobitSession_close():
+    """
+    Closing the session takes the device out of raw mode and closes the
+    connection only if the session opened it.
+    """
+    serial = FakeSerial()
+    session = microfs.MicrobitSession()
+    with mock.patch('mu.contrib.microfs.get_serial', return_value=serial), \
+            mock.patch('mu.contrib.microfs.time.sleep'), \
+            mock.patch('mu.contrib.microfs.raw_on'):
+        session.sync()
+    session.close()
+    assert serial.written == [b'\x02']
+    assert serial.closed
+    assert session.serial is None
+    serial = FakeSerial()
+    with microfs.MicrobitSession(serial) as session, \
+            mock.patch('mu.contrib.microfs.time.sleep'), \
+            mock.patch('mu.contrib.microfs.raw_on'):
+        session.sync()
+    assert serial.written == [b'\x02']
+    assert not serial.closed
+    assert session.serial is serial
+
+
+def sync_directory(tmpdir):
+    """
+    Fill the directory with files to sync and return the size and CRC of
+    each file on the device (as from file_hashes), where same.py is
+    unchanged, changed.py has changed, new.py is new and old.py isn't in the
+    directory.
+    """
+    tmpdir.join('same.py').write_binary(b'Same')
+    tmpdir.join('changed.py').write_binary(b'Changed')
+    tmpdir.join('new.py').write_binary(b'New')
+    tmpdir.join('.hidden').write_binary(b'Ignored')
+    tmpdir.mkdir('subdirectory').join('ignored.py').write_binary(b'Ignored')
+    return {
+        'same.py': (4, microfs.crc(b'Same')),
+        'changed.py': (7, microfs.crc(b'Chinged')),
+        'old.py': (3, microfs.crc(b'Old')),
+    }
+
+
+def test_sync(tmpdir):
+    """
+    Only new and changed files are copied, and nothing's removed unless
+    asked.
+    """
+    session = microfs.MicrobitSession(FakeSerial())
+    remote = sync_directory(tmpdir)
+    with mock.patch('mu.contrib.microfs.file_hashes',
+                    return_value=remote) as file_hashes, \
+            mock.patch('mu.contrib.microfs.put') as put, \
+            mock.patch('mu.contrib.microfs.rm') as rm:
+        assert microfs.sync(str(tmpdir), session) == \
+            (['changed.py', 'new.py'], [])
+    file_hashes.assert_called_once_with(session)
+    assert put.call_args_list == [
+        mock.call(str(tmpdir.join('changed.py')), serial=session),
+        mock.call(str(tmpdir.join('new.py')), serial=session),
+    ]
+    assert rm.call_count == 0
+
+
+def test_sync_delete(tmpdir):
+    """
+    With delete, files on the device which aren't in the directory are
+    removed.
+    """
+    session = microfs.MicrobitSession(FakeSerial())
+    remote = sync_directory(tmpdir)
+    with mock.patch('mu.contrib.microfs.file_hashes', return_value=remote), \
+            mock.patch('mu.contrib.microfs.put'), \
+            mock.patch('mu.contrib.microfs.rm') as rm:
+        assert microfs.sync(str(tmpdir), session, delete=True) == \
+            (['changed.py', 'new.py'], ['old.py'])
+    rm.assert_called_once_with('old.py', session)
+
+
+def test_sync_own_session(tmpdir):
+    """
+    If not given a session, sync runs everything in a session of its own,
+    which is closed once it's done.
+    """
+    serial = FakeSerial()
+    with mock.patch('mu.contrib.microfs.file_hashes', return_value={}), \
+            mock.patch('mu.contrib.microfs.MicrobitSession.close') as close:
+        assert microfs.sync(str(tmpdir), serial) == ([], [])
+    close.assert_called_once_with()
+
+
+def test_main_sync(capsys):
+    """
+    The sync command syncs the referenced directory and reports what was
+    copied and removed.
+    """
+    with mock.patch('mu.contrib.microfs.sync',
+                    return_value=(['a.py'], ['b.py'])) as sync:
+        microfs.main(['sync', 'foo', '--delete'])
+    sync.assert_called_once_with('foo', delete=True)
+    assert capsys.readouterr().out == 'put: a.py\nrm: b.py\n'
+    with mock.patch('mu.contrib.microfs.sync',
+                    return_value=([], [])) as sync:
+        microfs.main(['sync'])
+    sync.assert_called_once_with(None, delete=False)
+    assert capsys.readouterr().out == ''
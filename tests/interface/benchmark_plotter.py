@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Measures how quickly the plotter parses and stores incoming tuples, compared
+with parsing a line and a value at a time and storing a tuple at a time.
+
+    python -m tests.interface.benchmark_plotter [LINES]
+
+Parses LINES (default 20000) lines of tuples of ints, floats and a mix of
+both, with some lines of other output, and prints the tuples per second for
+each way of parsing and storing them.
+"""
+import sys
+import random
+import timeit
+from mu.interface.plotter import PlotData, parse_tuples
+from tests.interface.test_plotter import legacy_parse_tuples
+
+
+#: Formats of the lines of each kind of data.
+FORMATS = {
+    'ints': '({}, {}, {})',
+    'floats': '({:.3f}, {:.3f}, {:.3f})',
+    'mixed': '({}, {:.3f}, {})',
+}
+
+
+def make_data(kind, lines):
+    """
+    Return the referenced number of lines of tuples of the referenced kind,
+    with every tenth line being something other than a tuple.
+    """
+    rng = random.Random(0)
+    result = []
+    for i in range(lines):
+        if i % 10:
+            values = [rng.uniform(-1000, 1000) for j in range(3)]
+            if kind != 'floats':
+                values[0] = int(values[0])
+                values[2] = int(values[2])
+            result.append(FORMATS[kind].format(*values))
+        else:
+            result.append('Reading sensor...')
+    return '\n'.join(result).encode('utf-8') + b'\n'
+
+
+def legacy(data):
+    """
+    Parse a line and a value at a time, storing a tuple at a time.
+    """
+    plot_data = PlotData(100, 3)
+    for values in legacy_parse_tuples(data):
+        plot_data.append(values)
+
+
+def batched(data):
+    """
+    Parse all the lines in one go, storing the tuples together.
+    """
+    plot_data = PlotData(100, 3)
+    plot_data.extend(parse_tuples(data))
+
+
+def benchmark(lines=20000, repeat=3):
+    """
+    Print how many tuples per second are parsed (and then stored) for each
+    kind of data.
+    """
+    for kind in sorted(FORMATS):
+        data = make_data(kind, lines)
+        count = len(parse_tuples(data))
+        for name, parse in (('line at a time', legacy_parse_tuples),
+                            ('parse_tuples', parse_tuples)):
+            duration = min(timeit.repeat(lambda: parse(data), number=1,
+                                         repeat=repeat))
+            print('{:>6} parsed, {:>14}: {:>10.0f} tuples/s'.format(
+                kind, name, count / duration))
+        for name, store in (('tuple at a time', legacy),
+                            ('batched', batched)):
+            duration = min(timeit.repeat(lambda: store(data), number=1,
+                                         repeat=repeat))
+            print('{:>6} stored, {:>14}: {:>10.0f} tuples/s'.format(
+                kind, name, count / duration))
+
+
+if __name__ == '__main__':
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
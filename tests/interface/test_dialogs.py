@@ -4,7 +4,10 @@ Tests for the user interface elements of Mu.
 """
 from PyQt5.QtWidgets import QApplication, QDialog
 from unittest import mock
-from mu.modes import PythonMode, AdafruitMode, MicrobitMode, DebugMode
+from mu.modes.python3 import PythonMode
+from mu.modes.adafruit import AdafruitMode
+from mu.modes.microbit import MicrobitMode
+from mu.modes.debugger import DebugMode
 import mu.interface.dialogs
 import pytest
 
@@ -47,6 +47,23 @@ def test_EditorPane_init():
         assert editor.newline == '\r\n'
 
 
+def test_EditorPane_code_changed_debounced():
+    """
+    Ensure changes to the text (re)start the timer that eventually emits the
+    code_changed signal.
+    """
+    ep = mu.interface.editor.EditorPane('/foo/bar.py', 'baz')
+    assert ep.check_timer.isSingleShot()
+    assert ep.check_timer.interval() == mu.interface.editor.CHECK_DELAY
+    assert not ep.check_timer.isActive()
+    ep.setText('qux')
+    assert ep.check_timer.isActive()
+    mock_handler = mock.MagicMock()
+    ep.code_changed.connect(mock_handler)
+    ep.check_timer.timeout.emit()
+    mock_handler.assert_called_once_with()
+
+
 def test_EditorPane_configure():
     """
     Check the expected configuration takes place. NOTE - this is checking the
@@ -125,12 +142,87 @@ def test_EditorPane_set_theme():
     ep = mu.interface.editor.EditorPane('/foo/bar.py', 'baz')
     ep.lexer = mock.MagicMock()
     mock_api = mock.MagicMock()
-    with mock.patch('mu.interface.editor.QsciAPIs',
+    with mock.patch('mu.interface.editor.prepared_api',
                     return_value=mock_api) as mapi:
         ep.set_api(api)
-        mapi.assert_called_once_with(ep.lexer)
-        mock_api.add.assert_called_once_with('api help text')
-        mock_api.prepare.assert_called_once_with()
+    mapi.assert_called_once_with(api)
+    assert ep.api == mock_api
+    ep.lexer.setAPIs.assert_called_once_with(mock_api)
+
+
+def test_prepared_api():
+    """
+    The API definitions are added to a new QsciAPIs instance and prepared the
+    first time they're used.
+    """
+    api = ['api help text', ]
+    mock_api = mock.MagicMock()
+    with mock.patch('mu.interface.editor.API_CACHE', {}), \
+            mock.patch('mu.interface.editor.QsciAPIs',
+                       return_value=mock_api) as mapi:
+        assert mu.interface.editor.prepared_api(api) == mock_api
+        assert mu.interface.editor.prepared_api(list(api)) == mock_api
+    lexer = mapi.call_args[0][0]
+    assert isinstance(lexer, mu.interface.editor.PythonLexer)
+    assert mapi.call_count == 1
+    mock_api.add.assert_called_once_with('api help text')
+    mock_api.prepare.assert_called_once_with()
+
+
+def test_prepared_api_compiled():
+    """
+    A compiled API file is loaded into a new QsciAPIs instance (without
+    preparing it again) the first time it's used.
+    """
+    mock_api = mock.MagicMock()
+    mock_api.loadPrepared.return_value = True
+    with mock.patch('mu.interface.editor.API_CACHE', {}), \
+            mock.patch('mu.interface.editor.QsciAPIs',
+                       return_value=mock_api) as mapi, \
+            mock.patch('mu.interface.editor.logger') as mock_log:
+        assert mu.interface.editor.prepared_api('foo.pap') == mock_api
+        assert mu.interface.editor.prepared_api('foo.pap') == mock_api
+    assert mapi.call_count == 1
+    mock_api.loadPrepared.assert_called_once_with('foo.pap')
+    assert mock_api.add.call_count == 0
+    assert mock_api.prepare.call_count == 0
+    assert mock_log.error.call_count == 0
+
+
+def test_prepared_api_compiled_fails():
+    """
+    If a compiled API file can't be loaded, the problem is logged.
+    """
+    mock_api = mock.MagicMock()
+    mock_api.loadPrepared.return_value = False
+    with mock.patch('mu.interface.editor.API_CACHE', {}), \
+            mock.patch('mu.interface.editor.QsciAPIs',
+                       return_value=mock_api), \
+            mock.patch('mu.interface.editor.logger') as mock_log:
+        assert mu.interface.editor.prepared_api('foo.pap') == mock_api
+    msg = 'Could not load compiled API: foo.pap'
+    mock_log.error.assert_called_once_with(msg)
+
+
+def test_prepared_api_shared():
+    """
+    Editor panes with the same API definitions share a QsciAPIs instance that
+    outlives them, while different definitions have their own instance.
+
+    (The real cache is used since a QsciAPIs instance mustn't be destroyed
+    while QScintilla is preparing it.)
+    """
+    ep1 = mu.interface.editor.EditorPane(None, 'foo')
+    ep2 = mu.interface.editor.EditorPane(None, 'bar')
+    ep3 = mu.interface.editor.EditorPane(None, 'baz')
+    ep1.set_api(['test_prepared_api_shared(foo)', ])
+    ep2.set_api(['test_prepared_api_shared(foo)', ])
+    ep3.set_api(['test_prepared_api_shared(bar)', ])
+    assert ep1.api is ep2.api
+    assert ep1.api is not ep3.api
+    assert ep1.lexer.apis() is ep1.api
+    assert ep2.lexer.apis() is ep1.api
+    assert ep1.api.lexer() is not ep1.lexer
 
 
 def test_EditorPane_label():
@@ -170,30 +262,106 @@ def test_EditorPane_reset_check_indicators():
     """
     Ensure code check indicators are reset.
     """
-    ep = mu.interface.editor.EditorPane(None, 'baz')
-    ep.clearIndicatorRange = mock.MagicMock()
-    ep.check_indicators = {
+    ep = mu.interface.editor.EditorPane(None, 'foo\nbar\nbaz\n')
+    ep.fillIndicatorRange(0, 0, 0, 2, 19)
+    ep.fillIndicatorRange(2, 1, 2, 3, 20)
+    ep.check_indicators['error']['markers'] = {0: []}
+    ep.check_indicators['style']['markers'] = {2: []}
+    ep.reset_check_indicators()
+    assert ep.indicator_lines(19) == set()
+    assert ep.indicator_lines(20) == set()
+    for indicator in ep.check_indicators:
+        assert ep.check_indicators[indicator]['markers'] == {}
+
+
+def test_EditorPane_indicator_lines():
+    """
+    The lines on which an indicator is shown are found, including those it
+    spans.
+    """
+    ep = mu.interface.editor.EditorPane(None, 'foo\nbar\nbaz\nqux')
+    assert ep.indicator_lines(19) == set()
+    ep.fillIndicatorRange(1, 1, 1, 2, 19)
+    ep.fillIndicatorRange(2, 2, 3, 1, 19)
+    ep.fillIndicatorRange(0, 0, 0, 1, 20)
+    assert ep.indicator_lines(19) == {1, 2, 3}
+
+
+def test_EditorPane_indicator_lines_stuck():
+    """
+    If the end of an indicator can't be found, give up rather than loop
+    forever.
+    """
+    ep = mu.interface.editor.EditorPane(None, 'foo\nbar\n')
+    ep.SendScintilla = mock.MagicMock(return_value=0)
+    assert ep.indicator_lines(19) == set()
+
+
+def test_EditorPane_clear_indicator_line():
+    """
+    An indicator is cleared from the whole of the line (and only that line).
+    """
+    ep = mu.interface.editor.EditorPane(None, 'foo\nbar\nbaz')
+    ep.fillIndicatorRange(0, 0, 2, 3, 19)
+    ep.clear_indicator_line(1, 19)
+    assert ep.indicator_lines(19) == {0, 2}
+    ep.clear_indicator_line(2, 19)
+    assert ep.indicator_lines(19) == {0, }
+
+
+def test_EditorPane_update_check_annotations():
+    """
+    Indicators and annotations are updated in place: stale ones are removed,
+    unchanged annotations are left alone and new ones are added.
+    """
+    ep = mu.interface.editor.EditorPane(None, 'foo\nbar\nbaz\nqux\n')
+    ep.fillIndicatorRange(0, 0, 0, 2, 19)
+    ep.annotate(0, '\u2191 old', ep.annotationDisplay())
+    ep.annotate(1, '\u2191 same', ep.annotationDisplay())
+    feedback = {
         'error': {
-            'id': 19,
-            'markers': {
-                1: [{'column': 0, 'line_no': 1, 'message': 'indicator detail'}]
-            },
+            1: [{'line_no': 1, 'column': 0, 'message': 'same'}],
         },
         'style': {
-            'id': 20,
-            'markers': {
-                2: [{'code': 'x', 'column': 0, 'line_no': 1,
-                     'message': 'indicator detail'}]
-            }
-        }
+            3: [{'line_no': 3, 'column': 2, 'message': 'new', 'code': 'E1'},
+                {'line_no': 3, 'column': 0, 'message': 'newer',
+                 'code': 'E2'}],
+        },
     }
-    ep.reset_check_indicators()
-    ep.clearIndicatorRange.assert_has_calls(
-        [mock.call(1, 0, 1, 999999, 19), mock.call(1, 0, 1, 999999, 20)],
-        any_order=True)
-    for indicator in ep.check_indicators:
-        assert ep.check_indicators[indicator]['markers'] == {}
-        assert ep.check_indicators[indicator]['markers'] == {}
+    ep.annotate = mock.MagicMock(wraps=ep.annotate)
+    ep.update_check_annotations(feedback)
+    assert ep.check_indicators['error']['markers'] == feedback['error']
+    assert ep.check_indicators['style']['markers'] == feedback['style']
+    assert ep.indicator_lines(19) == set()
+    assert ep.indicator_lines(20) == {3, }
+    assert ep.annotation_text(0) == ''
+    assert ep.annotation_text(1) == '\u2191 same'
+    assert ep.annotation_text(3) == '\u2191 new\n\u2191 newer'
+    ep.annotate.assert_called_once_with(3, '\u2191 new\n\u2191 newer',
+                                        ep.annotationDisplay())
+
+
+def test_EditorPane_annotation_text():
+    """
+    The text of a line's annotation is returned, or an empty string if the
+    line isn't annotated.
+    """
+    ep = mu.interface.editor.EditorPane(None, 'foo\nbar\n')
+    ep.annotate(1, '\u2191 annotation', ep.annotationDisplay())
+    assert ep.annotation_text(0) == ''
+    assert ep.annotation_text(1) == '\u2191 annotation'
+
+
+def test_EditorPane_update_check_annotations_empty():
+    """
+    Without feedback, all check indicators and annotations are removed.
+    """
+    ep = mu.interface.editor.EditorPane(None, 'foo\nbar\n')
+    ep.fillIndicatorRange(1, 0, 1, 2, 20)
+    ep.annotate(1, '\u2191 old', ep.annotationDisplay())
+    ep.update_check_annotations({'error': {}, 'style': None})
+    assert ep.indicator_lines(20) == set()
+    assert ep.annotation_text(1) == ''
 
 
 def test_EditorPane_reset_search_indicators():
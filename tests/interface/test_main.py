@@ -3,7 +3,7 @@
 Tests for the user interface elements of Mu.
 """
 from PyQt5.QtWidgets import QAction, QWidget, QFileDialog, QMessageBox
-from PyQt5.QtCore import Qt, QSize, QIODevice
+from PyQt5.QtCore import Qt, QSize
 from PyQt5.QtGui import QIcon, QKeySequence
 from unittest import mock
 from mu import __version__
@@ -187,6 +187,7 @@ def test_FileTabs_removeTab_ok():
     mock_window = mock.MagicMock()
     mock_window.show_confirmation.return_value = QMessageBox.Ok
     qtw.nativeParentWidget = mock.MagicMock(return_value=mock_window)
+    qtw.tab_closed = mock.MagicMock()
     tab_id = 1
     with mock.patch('mu.interface.main.QTabWidget.removeTab',
                     return_value='foo') as rt:
@@ -197,6 +198,7 @@ def test_FileTabs_removeTab_ok():
         rt.assert_called_once_with(tab_id)
         qtw.widget.assert_called_once_with(tab_id)
         assert mock_tab.isModified.call_count == 1
+        qtw.tab_closed.emit.assert_called_once_with(mock_tab)
 
 
 def test_FileTabs_change_tab():
@@ -293,7 +295,7 @@ def test_Window_change_mode():
     """
     mock_mode = mock.MagicMock()
     api = ['API details', ]
-    mock_mode.api.return_value = api
+    mock_mode.api_source.return_value = api
     w = mu.interface.main.Window()
     w.tabs = mock.MagicMock()
     w.tabs.count = mock.MagicMock(return_value=2)
@@ -472,6 +474,27 @@ def test_Window_add_tab():
     w.tabs.setTabText.assert_called_once_with(new_tab_index, ep.label)
 
 
+def test_Window_add_tab_code_changed():
+    """
+    Ensure the code_changed signal of a new tab is bubbled up with a reference
+    to the tab.
+    """
+    w = mu.interface.main.Window()
+    w.read_only_tabs = False
+    w.tabs = mock.MagicMock()
+    w.connect_zoom = mock.MagicMock(return_value=None)
+    w.set_theme = mock.MagicMock(return_value=None)
+    w.theme = mock.MagicMock()
+    w.breakpoint_toggle = mock.MagicMock()
+    w.code_changed = mock.MagicMock()
+    ep = mu.interface.editor.EditorPane('/foo/bar.py', 'baz')
+    ep.set_api = mock.MagicMock()
+    with mock.patch('mu.interface.main.EditorPane', return_value=ep):
+        w.add_tab('/foo/bar.py', 'baz', [], '\n')
+    ep.code_changed.emit()
+    w.code_changed.emit.assert_called_once_with(ep)
+
+
 def test_Window_focus_tab():
     """
     Given a tab instance, ensure it has focus.
@@ -535,10 +558,8 @@ def test_Window_on_serial_read():
     When data is received the data_received signal should emit it.
     """
     w = mu.interface.main.Window()
-    w.serial = mock.MagicMock()
-    w.serial.readAll.return_value = b'Hello'
     w.data_received = mock.MagicMock()
-    w.on_serial_read()
+    w.on_serial_read(b'Hello')
     w.data_received.emit.assert_called_once_with(b'Hello')
 
 
@@ -554,62 +575,29 @@ def test_Window_on_stdout_write():
 
 def test_Window_open_serial_link():
     """
-    Ensure the serial port is opened in the expected manner.
+    Ensure the serial link is opened and started in the expected manner.
     """
-    mock_serial = mock.MagicMock()
-    mock_serial.setPortName = mock.MagicMock(return_value=None)
-    mock_serial.setBaudRate = mock.MagicMock(return_value=None)
-    mock_serial.open = mock.MagicMock(return_value=True)
-    mock_serial.readyRead = mock.MagicMock()
-    mock_serial.readyRead.connect = mock.MagicMock(return_value=None)
-    mock_serial_class = mock.MagicMock(return_value=mock_serial)
-    with mock.patch('mu.interface.main.QSerialPort', mock_serial_class):
+    mock_link = mock.MagicMock()
+    with mock.patch('mu.interface.main.SerialLink',
+                    return_value=mock_link) as mock_link_class:
         w = mu.interface.main.Window()
         w.open_serial_link('COM0')
-        assert w.input_buffer == []
-    mock_serial.setPortName.assert_called_once_with('COM0')
-    mock_serial.setBaudRate.assert_called_once_with(115200)
-    mock_serial.open.assert_called_once_with(QIODevice.ReadWrite)
-    mock_serial.readyRead.connect.assert_called_once_with(w.on_serial_read)
+    mock_link_class.assert_called_once_with('COM0')
+    assert w.serial == mock_link
+    mock_link.data_received.connect.assert_called_once_with(w.on_serial_read)
+    mock_link.start.assert_called_once_with()
 
 
 def test_Window_open_serial_link_unable_to_connect():
     """
-    If serial.open fails raise an IOError.
+    If the serial link can't be opened the IOError is raised.
     """
-    mock_serial = mock.MagicMock()
-    mock_serial.setPortName = mock.MagicMock(return_value=None)
-    mock_serial.setBaudRate = mock.MagicMock(return_value=None)
-    mock_serial.open = mock.MagicMock(return_value=False)
-    mock_serial_class = mock.MagicMock(return_value=mock_serial)
-    with mock.patch('mu.interface.main.QSerialPort', mock_serial_class):
+    with mock.patch('mu.interface.main.SerialLink', side_effect=IOError()):
         with pytest.raises(IOError):
             w = mu.interface.main.Window()
             w.open_serial_link('COM0')
 
 
-def test_Window_open_serial_link_DTR_unset():
-    """
-    If data terminal ready (DTR) is unset (as can be the case on some
-    Windows / Qt combinations) then fall back to PySerial to correct. See
-    issues #281 and #302 for details.
-    """
-    mock_qt_serial = mock.MagicMock()
-    mock_qt_serial.isDataTerminalReady.return_value = False
-    mock_py_serial = mock.MagicMock()
-    mock_serial_class = mock.MagicMock(return_value=mock_qt_serial)
-    with mock.patch('mu.interface.main.QSerialPort', mock_serial_class):
-        with mock.patch('mu.interface.main.serial', mock_py_serial):
-            w = mu.interface.main.Window()
-            w.open_serial_link('COM0')
-    mock_qt_serial.close.assert_called_once_with()
-    assert mock_qt_serial.open.call_count == 2
-    mock_py_serial.Serial.assert_called_once_with('COM0')
-    mock_pyser = mock_py_serial.Serial('COM0')
-    assert mock_pyser.dtr is True
-    mock_pyser.close.assert_called_once_with()
-
-
 def test_Window_close_serial_link():
     """
     Ensure the serial link is closed / cleaned up as expected.
@@ -649,12 +637,13 @@ def test_Window_add_filesystem():
         assert_called_once_with(mock_fs.on_ls)
     mock_fs.list_files.connect.assert_called_once_with(mock_file_manager.ls)
     mock_fs.microbit_fs.put.connect.\
-        assert_called_once_with(mock_file_manager.put)
+        assert_called_once_with(mock_file_manager.put_files)
     mock_fs.microbit_fs.delete.connect.\
-        assert_called_once_with(mock_file_manager.delete)
+        assert_called_once_with(mock_file_manager.delete_files)
     mock_fs.microbit_fs.list_files.connect.\
         assert_called_once_with(mock_file_manager.ls)
-    mock_fs.local_fs.get.connect.assert_called_once_with(mock_file_manager.get)
+    mock_fs.local_fs.get.connect.\
+        assert_called_once_with(mock_file_manager.get_files)
     mock_fs.local_fs.list_files.connect.\
         assert_called_once_with(mock_file_manager.ls)
     mock_file_manager.on_put_file.connect.\
@@ -663,6 +652,8 @@ def test_Window_add_filesystem():
         assert_called_once_with(mock_fs.microbit_fs.on_delete)
     mock_file_manager.on_get_file.connect.\
         assert_called_once_with(mock_fs.local_fs.on_get)
+    mock_file_manager.on_get_progress.connect.\
+        assert_called_once_with(mock_fs.local_fs.on_get_progress)
     mock_file_manager.on_list_fail.connect.\
         assert_called_once_with(mock_fs.on_ls_fail)
     mock_file_manager.on_put_fail.connect.\
@@ -671,6 +662,11 @@ def test_Window_add_filesystem():
         assert_called_once_with(mock_fs.on_delete_fail)
     mock_file_manager.on_get_fail.connect.\
         assert_called_once_with(mock_fs.on_get_fail)
+    mock_fs.sync.connect.assert_called_once_with(mock_file_manager.sync)
+    mock_file_manager.on_sync.connect.\
+        assert_called_once_with(mock_fs.on_sync)
+    mock_file_manager.on_sync_fail.connect.\
+        assert_called_once_with(mock_fs.on_sync_fail)
     w.connect_zoom.assert_called_once_with(mock_fs)
 
 
@@ -693,6 +689,8 @@ def test_Window_add_micropython_repl():
     with mock.patch('mu.interface.main.MicroPythonREPLPane', mock_repl_class):
         w.add_micropython_repl('COM0', 'Test REPL')
     mock_repl_class.assert_called_once_with(serial=w.serial, theme=w.theme)
+    mock_repl.set_scrollback.assert_called_once_with(w.scrollback,
+                                                     w.scrollback_log)
     w.open_serial_link.assert_called_once_with('COM0')
     assert w.serial.write.call_count == 2
     assert w.serial.write.call_args_list[0][0][0] == b'\x02'
@@ -742,14 +740,11 @@ def test_Window_add_micropython_plotter():
     w.data_received = mock.MagicMock()
     mock_plotter = mock.MagicMock()
     mock_plotter_class = mock.MagicMock(return_value=mock_plotter)
-    mock_mode = mock.MagicMock()
     with mock.patch('mu.interface.main.PlotterPane', mock_plotter_class):
-        w.add_micropython_plotter('COM0', 'MicroPython Plotter', mock_mode)
+        w.add_micropython_plotter('COM0', 'MicroPython Plotter')
     mock_plotter_class.assert_called_once_with(theme=w.theme)
     w.open_serial_link.assert_called_once_with('COM0')
     w.data_received.connect.assert_called_once_with(mock_plotter.process_bytes)
-    mock_plotter.data_flood.connect.\
-        assert_called_once_with(mock_mode.on_data_flood)
     w.add_plotter.assert_called_once_with(mock_plotter, 'MicroPython Plotter')
 
 
@@ -763,12 +758,9 @@ def test_Window_add_python3_plotter():
     w.data_received = mock.MagicMock()
     mock_plotter = mock.MagicMock()
     mock_plotter_class = mock.MagicMock(return_value=mock_plotter)
-    mock_mode = mock.MagicMock()
     with mock.patch('mu.interface.main.PlotterPane', mock_plotter_class):
-        w.add_python3_plotter(mock_mode)
+        w.add_python3_plotter()
     w.data_received.connect.assert_called_once_with(mock_plotter.process_bytes)
-    mock_plotter.data_flood.connect.\
-        assert_called_once_with(mock_mode.on_data_flood)
     w.add_plotter.assert_called_once_with(mock_plotter, 'Python3 data tuple')
 
 
@@ -785,7 +777,7 @@ def test_Window_add_jupyter_repl():
     mock_kernel_client = mock.MagicMock()
     mock_pane = mock.MagicMock()
     mock_pane_class = mock.MagicMock(return_value=mock_pane)
-    with mock.patch('mu.interface.main.JupyterREPLPane', mock_pane_class):
+    with mock.patch('mu.interface.jupyter.JupyterREPLPane', mock_pane_class):
         w.add_jupyter_repl(mock_kernel_manager, mock_kernel_client)
     mock_pane_class.assert_called_once_with(theme=w.theme)
     assert mock_pane.kernel_manager == mock_kernel_manager
@@ -853,6 +845,8 @@ def test_Window_add_python3_runner():
         result = w.add_python3_runner(name, path)
         assert result == mock_process_runner
     assert w.process_runner == mock_process_runner
+    mock_process_runner.set_scrollback.assert_called_once_with(
+        w.scrollback, w.scrollback_log)
     assert w.runner == mock_dock
     w.runner.setWidget.assert_called_once_with(w.process_runner)
     w.addDockWidget.assert_called_once_with(Qt.BottomDockWidgetArea, mock_dock)
@@ -1048,6 +1042,39 @@ def test_Window_remove_debug_inspector():
     mock_inspector.deleteLater.assert_called_once_with()
 
 
+def test_Window_set_scrollback():
+    """
+    Ensure the scrollback is applied to the MicroPython REPL and the runner.
+    """
+    w = mu.interface.main.Window()
+    w.repl = mock.MagicMock()
+    w.repl_pane = mock.MagicMock(spec=mu.interface.panes.ScrollbackPane)
+    w.runner = mock.MagicMock()
+    w.process_runner = mock.MagicMock()
+    mock_log = mock.MagicMock()
+    with mock.patch('mu.interface.main.get_scrollback_log',
+                    return_value=mock_log) as gsl:
+        w.set_scrollback(100, 'foo.log')
+    gsl.assert_called_once_with('foo.log')
+    assert w.scrollback == 100
+    assert w.scrollback_log == mock_log
+    w.repl_pane.set_scrollback.assert_called_once_with(100, mock_log)
+    w.process_runner.set_scrollback.assert_called_once_with(100, mock_log)
+
+
+def test_Window_set_scrollback_no_panes():
+    """
+    Without a log file, trimmed output isn't logged. A Jupyter REPL (with its
+    own scrollback) is left alone.
+    """
+    w = mu.interface.main.Window()
+    w.repl = mock.MagicMock()
+    w.repl_pane = mock.MagicMock(spec=['set_theme'])
+    w.set_scrollback(100)
+    assert w.scrollback == 100
+    assert w.scrollback_log is None
+
+
 def test_Window_set_theme():
     """
     Check the theme is correctly applied to the window.
@@ -1283,8 +1310,8 @@ def test_Window_autosize_window():
     mock_qdw.assert_called_once_with()
     w.resize.assert_called_once_with(int(1024 * 0.8), int(768 * 0.8))
     w.geometry.assert_called_once_with()
-    x = (1024 - 819) / 2
-    y = (768 - 614) / 2
+    x = (1024 - 819) // 2
+    y = (768 - 614) // 2
     w.move.assert_called_once_with(x, y)
 
 
@@ -1375,17 +1402,69 @@ def test_Window_setup():
 
 def test_Window_set_usb_checker():
     """
-    Ensure the callback for checking for connected devices is set as expected.
+    Ensure a device watcher is started which calls the callback when the
+    connected devices change.
     """
     w = mu.interface.main.Window()
-    mock_timer = mock.MagicMock()
-    mock_timer_class = mock.MagicMock(return_value=mock_timer)
+    mock_watcher = mock.MagicMock()
+    mock_watcher_class = mock.MagicMock(return_value=mock_watcher)
     mock_callback = mock.MagicMock()
-    with mock.patch('mu.interface.main.QTimer', mock_timer_class):
+    with mock.patch('mu.interface.main.DeviceWatcher', mock_watcher_class):
         w.set_usb_checker(1, mock_callback)
-        assert w.usb_checker == mock_timer
-        w.usb_checker.timeout.connect.assert_called_once_with(mock_callback)
-        w.usb_checker.start.assert_called_once_with(1000)
+        assert w.usb_checker == mock_watcher
+        mock_watcher_class.assert_called_once_with(1)
+        mock_watcher.on_changed.connect.assert_called_once_with(mock_callback)
+        mock_watcher.start.assert_called_once_with()
+
+
+def test_Window_stop_usb_checker():
+    """
+    Ensure the device watcher is stopped.
+    """
+    w = mu.interface.main.Window()
+    mock_watcher = mock.MagicMock()
+    w.usb_checker = mock_watcher
+    w.stop_usb_checker()
+    mock_watcher.stop.assert_called_once_with()
+    assert w.usb_checker is None
+    w.stop_usb_checker()
+    assert mock_watcher.stop.call_count == 1
+
+
+def test_Window_set_code_checker():
+    """
+    Ensure the code checker is moved into a new thread which is started.
+    """
+    w = mu.interface.main.Window()
+    mock_thread = mock.MagicMock()
+    mock_checker = mock.MagicMock()
+    with mock.patch('mu.interface.main.QThread', return_value=mock_thread):
+        w.set_code_checker(mock_checker)
+    assert w.checker_thread == mock_thread
+    mock_checker.moveToThread.assert_called_once_with(mock_thread)
+    mock_thread.start.assert_called_once_with()
+
+
+def test_Window_stop_code_checker():
+    """
+    Ensure the code checker's thread is stopped and waited upon.
+    """
+    w = mu.interface.main.Window()
+    mock_thread = mock.MagicMock()
+    w.checker_thread = mock_thread
+    w.stop_code_checker()
+    mock_thread.quit.assert_called_once_with()
+    mock_thread.wait.assert_called_once_with()
+    assert w.checker_thread is None
+
+
+def test_Window_stop_code_checker_not_started():
+    """
+    Stopping the code checker before it was started does nothing.
+    """
+    w = mu.interface.main.Window()
+    w.stop_code_checker()
+    assert w.checker_thread is None
 
 
 def test_Window_set_timer():
@@ -10,10 +10,12 @@ from unittest import mock
 import sys
 import os
 import signal
+import tempfile
+from logging.handlers import RotatingFileHandler
 import mu
 import platform
-from collections import deque
 import mu.interface.panes
+from mu.interface.plotter import PlotData
 
 # Required so the QWidget tests don't abort with the message:
 # "QWidget: Must construct a QApplication before a QWidget"
@@ -307,42 +309,141 @@ def test_MicroPythonREPLPane_keyPressEvent_meta():
     mock_serial.write.assert_called_once_with(bytes([expected]))
 
 
+def test_get_scrollback_log():
+    """
+    Ensure the scrollback log writes just the trimmed text to a rotating log
+    (creating its directory if needed), and not to Mu's own log.
+    """
+    with tempfile.TemporaryDirectory() as log_dir:
+        filename = os.path.join(log_dir, 'logs', 'output.log')
+        log = mu.interface.panes.get_scrollback_log(filename)
+        # Calling it again replaces the old handler.
+        log = mu.interface.panes.get_scrollback_log(filename)
+        assert len(log.handlers) == 1
+        handler = log.handlers[0]
+        assert isinstance(handler, RotatingFileHandler)
+        assert handler.maxBytes == mu.interface.panes.SCROLLBACK_LOG_SIZE
+        assert handler.backupCount == mu.interface.panes.SCROLLBACK_LOG_COUNT
+        assert not log.propagate
+        log.info('hello\nworld')
+        handler.close()
+        with open(filename, encoding='utf-8') as log_file:
+            assert log_file.read() == 'hello\nworld\n'
+
+
+def test_ScrollbackPane_trim_scrollback():
+    """
+    Ensure only the last scrollback lines are kept and the trimmed lines are
+    logged.
+    """
+    pane = mu.interface.panes.ScrollbackPane()
+    pane.setPlainText('one\ntwo\nthree\nfour')
+    mock_log = mock.MagicMock()
+    pane.set_scrollback(2, mock_log)
+    assert pane.toPlainText() == 'three\nfour'
+    mock_log.info.assert_called_once_with('one\ntwo')
+    # Nothing more to trim.
+    pane.trim_scrollback()
+    assert mock_log.info.call_count == 1
+
+
+def test_ScrollbackPane_trim_scrollback_no_log():
+    """
+    Ensure the trimmed lines are discarded if there's no log.
+    """
+    pane = mu.interface.panes.ScrollbackPane()
+    pane.setPlainText('one\ntwo\nthree')
+    pane.set_scrollback(1)
+    assert pane.toPlainText() == 'three'
+
+
+def test_ScrollbackPane_trim_scrollback_unlimited():
+    """
+    By default (or if the scrollback is 0) all the lines are kept.
+    """
+    pane = mu.interface.panes.ScrollbackPane()
+    assert pane.scrollback is None
+    pane.setPlainText('one\ntwo\nthree')
+    pane.trim_scrollback()
+    pane.set_scrollback(0)
+    assert pane.toPlainText() == 'one\ntwo\nthree'
+
+
 def test_MicroPythonREPLPane_process_bytes():
+    """
+    Ensure bytes coming from the device are queued and only rendered once the
+    frame has elapsed.
+    """
+    mock_serial = mock.MagicMock()
+    rp = mu.interface.panes.MicroPythonREPLPane(mock_serial)
+    rp.render_timer = mock.MagicMock()
+    rp.render_timer.isActive.side_effect = [False, True]
+    rp.process_bytes(b'abc')
+    rp.process_bytes(b'def')
+    assert rp.pending == b'abcdef'
+    rp.render_timer.start.assert_called_once_with()
+
+
+def test_MicroPythonREPLPane_render_timer():
+    """
+    Ensure the render timer is a single shot timer limited to the frame
+    interval.
+    """
+    mock_serial = mock.MagicMock()
+    rp = mu.interface.panes.MicroPythonREPLPane(mock_serial)
+    assert rp.render_timer.isSingleShot()
+    assert rp.render_timer.interval() == \
+        mu.interface.panes.REPL_FRAME_INTERVAL
+
+
+def test_MicroPythonREPLPane_render():
     """
     Ensure bytes coming from the device to the application are processed as
     expected. Backspace is enacted, carriage-return is ignored, newline moves
     the cursor position to the end of the line before enacted and all others
-    are simply inserted.
+    overwrite the text after the cursor, a whole run at a time. The widget's
+    cursor is only updated once.
     """
     mock_serial = mock.MagicMock()
     mock_tc = mock.MagicMock()
     mock_tc.movePosition = mock.MagicMock(side_effect=[True, False, True,
-                                                       True])
-    mock_tc.deleteChar = mock.MagicMock(return_value=None)
+                                                       True, True])
     rp = mu.interface.panes.MicroPythonREPLPane(mock_serial)
     rp.textCursor = mock.MagicMock(return_value=mock_tc)
     rp.setTextCursor = mock.MagicMock(return_value=None)
-    rp.insertPlainText = mock.MagicMock(return_value=None)
     rp.ensureCursorVisible = mock.MagicMock(return_value=None)
-    bs = bytes([8, 13, 10, 65, ])  # \b, \r, \n, 'A'
-    rp.process_bytes(bs)
+    rp.pending = bytearray([8, 13, 10, 65, 66])  # \b, \r, \n, 'A', 'B'
+    rp.render()
+    assert rp.pending == b''
     rp.textCursor.assert_called_once_with()
-    assert mock_tc.movePosition.call_count == 4
+    assert mock_tc.movePosition.call_count == 5
     assert mock_tc.movePosition.call_args_list[0][0][0] == QTextCursor.Down
     assert mock_tc.movePosition.call_args_list[1][0][0] == QTextCursor.Down
     assert mock_tc.movePosition.call_args_list[2][0][0] == QTextCursor.Left
     assert mock_tc.movePosition.call_args_list[3][0][0] == QTextCursor.End
-    assert rp.setTextCursor.call_count == 3
-    assert rp.setTextCursor.call_args_list[0][0][0] == mock_tc
-    assert rp.setTextCursor.call_args_list[1][0][0] == mock_tc
-    assert rp.setTextCursor.call_args_list[2][0][0] == mock_tc
-    assert rp.insertPlainText.call_count == 2
-    assert rp.insertPlainText.call_args_list[0][0][0] == chr(10)
-    assert rp.insertPlainText.call_args_list[1][0][0] == chr(65)
+    assert mock_tc.movePosition.call_args_list[4][0] == \
+        (QTextCursor.NextCharacter, QTextCursor.KeepAnchor, 2)
+    assert mock_tc.insertText.call_count == 2
+    assert mock_tc.insertText.call_args_list[0][0][0] == '\n'
+    assert mock_tc.insertText.call_args_list[1][0][0] == 'AB'
+    mock_tc.beginEditBlock.assert_called_once_with()
+    mock_tc.endEditBlock.assert_called_once_with()
+    rp.setTextCursor.assert_called_once_with(mock_tc)
     rp.ensureCursorVisible.assert_called_once_with()
 
 
-def test_MicroPythonREPLPane_process_bytes_VT100():
+def test_MicroPythonREPLPane_render_nothing_pending():
+    """
+    If there's nothing waiting to be displayed, the widget isn't touched.
+    """
+    mock_serial = mock.MagicMock()
+    rp = mu.interface.panes.MicroPythonREPLPane(mock_serial)
+    rp.textCursor = mock.MagicMock()
+    rp.render()
+    assert rp.textCursor.call_count == 0
+
+
+def test_MicroPythonREPLPane_render_VT100():
     """
     Ensure bytes coming from the device to the application are processed as
     expected. In this case, make sure VT100 related codes are handled properly.
@@ -351,11 +452,9 @@ def test_MicroPythonREPLPane_process_bytes_VT100():
     mock_tc = mock.MagicMock()
     mock_tc.movePosition = mock.MagicMock(return_value=False)
     mock_tc.removeSelectedText = mock.MagicMock()
-    mock_tc.deleteChar = mock.MagicMock(return_value=None)
     rp = mu.interface.panes.MicroPythonREPLPane(mock_serial)
     rp.textCursor = mock.MagicMock(return_value=mock_tc)
     rp.setTextCursor = mock.MagicMock(return_value=None)
-    rp.insertPlainText = mock.MagicMock(return_value=None)
     rp.ensureCursorVisible = mock.MagicMock(return_value=None)
     bs = bytes([
         27, 91, ord('1'), ord('A'),  # <Esc>[1A
@@ -365,6 +464,7 @@ def test_MicroPythonREPLPane_process_bytes_VT100():
         27, 91, ord('K'),  # <Esc>[K
     ])
     rp.process_bytes(bs)
+    rp.render()
     rp.textCursor.assert_called_once_with()
     assert mock_tc.movePosition.call_count == 6
     assert mock_tc.movePosition.call_args_list[0][0][0] == QTextCursor.Down
@@ -377,16 +477,35 @@ def test_MicroPythonREPLPane_process_bytes_VT100():
         QTextCursor.EndOfLine
     assert mock_tc.movePosition.call_args_list[5][1]['mode'] == \
         QTextCursor.KeepAnchor
-    assert rp.setTextCursor.call_count == 5
-    assert rp.setTextCursor.call_args_list[0][0][0] == mock_tc
-    assert rp.setTextCursor.call_args_list[1][0][0] == mock_tc
-    assert rp.setTextCursor.call_args_list[2][0][0] == mock_tc
-    assert rp.setTextCursor.call_args_list[3][0][0] == mock_tc
-    assert rp.setTextCursor.call_args_list[4][0][0] == mock_tc
+    rp.setTextCursor.assert_called_once_with(mock_tc)
     mock_tc.removeSelectedText.assert_called_once_with()
     rp.ensureCursorVisible.assert_called_once_with()
 
 
+def test_MicroPythonREPLPane_render_document():
+    """
+    Check the rendered text of a real document: text overwrites what follows
+    the cursor and <Esc>[K erases to the end of the line.
+    """
+    mock_serial = mock.MagicMock()
+    rp = mu.interface.panes.MicroPythonREPLPane(mock_serial)
+    rp.process_bytes(b'>>> hello\r\nworld\x08\x08XY')
+    rp.process_bytes(b'\x1b[3D\x1b[K!')
+    rp.render()
+    assert rp.toPlainText() == '>>> hello\nwo!'
+    # A UTF-8 character split between reads.
+    rp.process_bytes(b'\xc3')
+    rp.render()
+    rp.process_bytes(b'\xa9')
+    rp.render()
+    assert rp.toPlainText() == '>>> hello\nwo!\xe9'
+    # Only the scrollback is kept.
+    rp.set_scrollback(2)
+    rp.process_bytes(b'\r\nfoo\r\nbar')
+    rp.render()
+    assert rp.toPlainText() == 'foo\nbar'
+
+
 def test_MicroPythonREPLPane_clear():
     """
     Ensure setText is called with an empty string.
@@ -434,9 +553,8 @@ def test_MicrobitFileList_dropEvent():
     """
     mock_event = mock.MagicMock()
     source = mu.interface.panes.LocalFileList('homepath')
-    mock_item = mock.MagicMock()
-    mock_item.text.return_value = 'foo.py'
-    source.currentItem = mock.MagicMock(return_value=mock_item)
+    source.addItems(['foo.py', 'bar.py'])
+    source.item(0).setSelected(True)
     mock_event.source.return_value = source
     mfs = mu.interface.panes.MicrobitFileList('homepath')
     mfs.disable = mock.MagicMock()
@@ -446,7 +564,52 @@ def test_MicrobitFileList_dropEvent():
     mfs.dropEvent(mock_event)
     fn = os.path.join('homepath', 'foo.py')
     assert mfs.set_message.emit.call_count == 1
-    mfs.put.emit.assert_called_once_with(fn)
+    mfs.put.emit.assert_called_once_with([fn])
+
+
+def test_MicrobitFileList_dropEvent_many():
+    """
+    All the selected files are put together, once the user agrees to
+    overwrite those which already exist.
+    """
+    mock_event = mock.MagicMock()
+    source = mu.interface.panes.LocalFileList('homepath')
+    source.addItems(['a.py', 'b.py', 'c.py'])
+    source.item(0).setSelected(True)
+    source.item(2).setSelected(True)
+    mock_event.source.return_value = source
+    mfs = mu.interface.panes.MicrobitFileList('homepath')
+    mfs.addItem('c.py')
+    mfs.disable = mock.MagicMock()
+    mfs.set_message = mock.MagicMock()
+    mfs.put = mock.MagicMock()
+    mfs.show_confirm_overwrite_dialog = mock.MagicMock(return_value=True)
+    mfs.dropEvent(mock_event)
+    assert mfs.show_confirm_overwrite_dialog.call_count == 1
+    mfs.disable.emit.assert_called_once_with()
+    mfs.set_message.emit.\
+        assert_called_once_with("Copying 2 files to micro:bit.")
+    mfs.put.emit.assert_called_once_with([os.path.join('homepath', 'a.py'),
+                                          os.path.join('homepath', 'c.py')])
+
+
+def test_MicrobitFileList_dropEvent_no_overwrite():
+    """
+    Nothing is put if the user doesn't want to overwrite existing files.
+    """
+    mock_event = mock.MagicMock()
+    source = mu.interface.panes.LocalFileList('homepath')
+    source.addItems(['a.py', 'b.py'])
+    source.selectAll()
+    mock_event.source.return_value = source
+    mfs = mu.interface.panes.MicrobitFileList('homepath')
+    mfs.addItem('b.py')
+    mfs.disable = mock.MagicMock()
+    mfs.put = mock.MagicMock()
+    mfs.show_confirm_overwrite_dialog = mock.MagicMock(return_value=False)
+    mfs.dropEvent(mock_event)
+    assert mfs.disable.emit.call_count == 0
+    assert mfs.put.emit.call_count == 0
 
 
 def test_MicrobitFileList_dropEvent_wrong_source():
@@ -465,7 +628,8 @@ def test_MicrobitFileList_dropEvent_wrong_source():
 
 def test_MicrobitFileList_on_put():
     """
-    A message and list_files signal should be emitted.
+    A message should be emitted (the files are listed once the file manager
+    has put all the files).
     """
     mfs = mu.interface.panes.MicrobitFileList('homepath')
     mfs.set_message = mock.MagicMock()
@@ -473,7 +637,7 @@ def test_MicrobitFileList_on_put():
     mfs.on_put('my_file.py')
     msg = "'my_file.py' successfully copied to micro:bit."
     mfs.set_message.emit.assert_called_once_with(msg)
-    mfs.list_files.emit.assert_called_once_with()
+    assert mfs.list_files.emit.call_count == 0
 
 
 def test_MicrobitFileList_contextMenuEvent():
@@ -486,9 +650,9 @@ def test_MicrobitFileList_contextMenuEvent():
     mock_menu.addAction.return_value = mock_action
     mock_menu.exec_.return_value = mock_action
     mfs = mu.interface.panes.MicrobitFileList('homepath')
-    mock_current = mock.MagicMock()
-    mock_current.text.return_value = 'foo.py'
-    mfs.currentItem = mock.MagicMock(return_value=mock_current)
+    mfs.addItems(['foo.py', 'bar.py', 'baz.py'])
+    mfs.item(0).setSelected(True)
+    mfs.item(2).setSelected(True)
     mfs.disable = mock.MagicMock()
     mfs.set_message = mock.MagicMock()
     mfs.delete = mock.MagicMock()
@@ -497,13 +661,15 @@ def test_MicrobitFileList_contextMenuEvent():
     with mock.patch('mu.interface.panes.QMenu', return_value=mock_menu):
         mfs.contextMenuEvent(mock_event)
     mfs.disable.emit.assert_called_once_with()
-    assert mfs.set_message.emit.call_count == 1
-    mfs.delete.emit.assert_called_once_with('foo.py')
+    mfs.set_message.emit.\
+        assert_called_once_with("Deleting 2 files from micro:bit.")
+    mfs.delete.emit.assert_called_once_with(['foo.py', 'baz.py'])
 
 
 def test_MicrobitFileList_on_delete():
     """
-    On delete should emit a message and list_files signal.
+    On delete should emit a message (the files are listed once the file
+    manager has deleted all the files).
     """
     mfs = mu.interface.panes.MicrobitFileList('homepath')
     mfs.set_message = mock.MagicMock()
@@ -511,7 +677,7 @@ def test_MicrobitFileList_on_delete():
     mfs.on_delete('my_file.py')
     msg = "'my_file.py' successfully deleted from micro:bit."
     mfs.set_message.emit.assert_called_once_with(msg)
-    mfs.list_files.emit.assert_called_once_with()
+    assert mfs.list_files.emit.call_count == 0
 
 
 def test_LocalFileList_init():
@@ -529,9 +695,8 @@ def test_LocalFileList_dropEvent():
     """
     mock_event = mock.MagicMock()
     source = mu.interface.panes.MicrobitFileList('homepath')
-    mock_item = mock.MagicMock()
-    mock_item.text.return_value = 'foo.py'
-    source.currentItem = mock.MagicMock(return_value=mock_item)
+    source.addItems(['foo.py', 'bar.py'])
+    source.item(0).setSelected(True)
     mock_event.source.return_value = source
     lfs = mu.interface.panes.LocalFileList('homepath')
     lfs.disable = mock.MagicMock()
@@ -542,7 +707,29 @@ def test_LocalFileList_dropEvent():
     fn = os.path.join('homepath', 'foo.py')
     lfs.disable.emit.assert_called_once_with()
     assert lfs.set_message.emit.call_count == 1
-    lfs.get.emit.assert_called_once_with('foo.py', fn)
+    lfs.get.emit.assert_called_once_with([('foo.py', fn)])
+
+
+def test_LocalFileList_dropEvent_many():
+    """
+    All the selected files are got together.
+    """
+    mock_event = mock.MagicMock()
+    source = mu.interface.panes.MicrobitFileList('homepath')
+    source.addItems(['foo.py', 'bar.py'])
+    source.selectAll()
+    mock_event.source.return_value = source
+    lfs = mu.interface.panes.LocalFileList('homepath')
+    lfs.disable = mock.MagicMock()
+    lfs.set_message = mock.MagicMock()
+    lfs.get = mock.MagicMock()
+    lfs.dropEvent(mock_event)
+    msg = "Getting 2 files from micro:bit. Copying to 'homepath'."
+    lfs.set_message.emit.assert_called_once_with(msg)
+    lfs.get.emit.assert_called_once_with([
+        ('foo.py', os.path.join('homepath', 'foo.py')),
+        ('bar.py', os.path.join('homepath', 'bar.py')),
+    ])
 
 
 def test_LocalFileList_dropEvent_wrong_source():
@@ -559,9 +746,24 @@ def test_LocalFileList_dropEvent_wrong_source():
     assert lfs.findItems.call_count == 0
 
 
+def test_LocalFileList_on_get_progress():
+    """
+    The progress of a get is shown as a message.
+    """
+    lfs = mu.interface.panes.LocalFileList('homepath')
+    lfs.set_message = mock.MagicMock()
+    lfs.on_get_progress('my_file.py', 512, 2048)
+    lfs.on_get_progress('empty.py', 0, 0)
+    assert lfs.set_message.emit.call_args_list == [
+        mock.call("Getting 'my_file.py' from micro:bit: 25%."),
+        mock.call("Getting 'empty.py' from micro:bit: 100%."),
+    ]
+
+
 def test_LocalFileList_on_get():
     """
-    On get should emit two signals: a message and list_files.
+    On get should emit a message (the files are listed once the file manager
+    has got all the files).
     """
     lfs = mu.interface.panes.LocalFileList('homepath')
     lfs.set_message = mock.MagicMock()
@@ -570,7 +772,7 @@ def test_LocalFileList_on_get():
     msg = ("Successfully copied 'my_file.py' from the micro:bit "
            "to your computer.")
     lfs.set_message.emit.assert_called_once_with(msg)
-    lfs.list_files.emit.assert_called_once_with()
+    assert lfs.list_files.emit.call_count == 0
 
 
 def test_FileSystemPane_init():
@@ -611,6 +813,7 @@ def test_FileSystemPane_disable():
     fsp.disable()
     fsp.microbit_fs.setDisabled.assert_called_once_with(True)
     fsp.local_fs.setDisabled.assert_called_once_with(True)
+    assert not fsp.sync_button.isEnabled()
     fsp.microbit_fs.setAcceptDrops.assert_called_once_with(False)
     fsp.local_fs.setAcceptDrops.assert_called_once_with(False)
 
@@ -625,6 +828,7 @@ def test_FileSystemPane_enable():
     fsp.enable()
     fsp.microbit_fs.setDisabled.assert_called_once_with(False)
     fsp.local_fs.setDisabled.assert_called_once_with(False)
+    assert fsp.sync_button.isEnabled()
     fsp.microbit_fs.setAcceptDrops.assert_called_once_with(True)
     fsp.local_fs.setAcceptDrops.assert_called_once_with(True)
 
@@ -746,6 +950,88 @@ def test_FileSystemPane_set_theme_contrast():
         mu.interface.themes.CONTRAST_STYLE)
 
 
+def test_FileSystemPane_start_sync():
+    """
+    Clicking the sync button disables the pane and asks for the home
+    directory to be synced, removing other files if the box is ticked.
+    """
+    fsp = mu.interface.panes.FileSystemPane('homepath')
+    fsp.disable = mock.MagicMock()
+    fsp.set_message = mock.MagicMock()
+    fsp.sync = mock.MagicMock()
+    fsp.sync_button.click()
+    fsp.disable.assert_called_once_with()
+    fsp.set_message.emit.\
+        assert_called_once_with("Syncing 'homepath' with micro:bit.")
+    fsp.sync.emit.assert_called_once_with('homepath', False)
+
+
+def test_FileSystemPane_start_sync_delete():
+    """
+    Removing other files from the micro:bit has to be confirmed, and nothing
+    happens if it isn't.
+    """
+    fsp = mu.interface.panes.FileSystemPane('homepath')
+    fsp.disable = mock.MagicMock()
+    fsp.sync = mock.MagicMock()
+    fsp.delete_checkbox.setChecked(True)
+    fsp.show_confirm_delete_dialog = mock.MagicMock(return_value=False)
+    fsp.start_sync()
+    assert fsp.disable.call_count == 0
+    assert fsp.sync.emit.call_count == 0
+    fsp.show_confirm_delete_dialog.return_value = True
+    fsp.start_sync()
+    fsp.disable.assert_called_once_with()
+    fsp.sync.emit.assert_called_once_with('homepath', True)
+
+
+def test_FileSystemPane_show_confirm_delete_dialog():
+    """
+    Ensure the user is warned that other files will be removed from the
+    micro:bit.
+    """
+    fsp = mu.interface.panes.FileSystemPane('homepath')
+    mock_qmb = mock.MagicMock()
+    mock_qmb.exec_ = mock.MagicMock(return_value=QMessageBox.Ok)
+    mock_qmb_class = mock.MagicMock(return_value=mock_qmb)
+    mock_qmb_class.Ok = QMessageBox.Ok
+    mock_qmb_class.Warning = QMessageBox.Warning
+    with mock.patch('mu.interface.panes.QMessageBox', mock_qmb_class):
+        assert fsp.show_confirm_delete_dialog()
+        mock_qmb.exec_.return_value = QMessageBox.Cancel
+        assert not fsp.show_confirm_delete_dialog()
+    msg = ("Files on the micro:bit which aren't in 'homepath' will be "
+           "removed. This cannot be undone. Continue?")
+    mock_qmb.setText.assert_called_with(msg)
+    mock_qmb.setIcon.assert_called_with(QMessageBox.Warning)
+
+
+def test_FileSystemPane_on_sync():
+    """
+    A message shows what the sync did.
+    """
+    fsp = mu.interface.panes.FileSystemPane('homepath')
+    fsp.set_message = mock.MagicMock()
+    fsp.on_sync(['a.py', 'b.py'], ['old.py'])
+    fsp.on_sync([], [])
+    assert fsp.set_message.emit.call_args_list == [
+        mock.call('Synced micro:bit: 2 file(s) copied, 1 file(s) removed.'),
+        mock.call('The micro:bit is already up to date.'),
+    ]
+
+
+def test_FileSystemPane_on_sync_fail():
+    """
+    A warning is shown when syncing fails.
+    """
+    fsp = mu.interface.panes.FileSystemPane('homepath')
+    fsp.show_warning = mock.MagicMock()
+    fsp.on_sync_fail('homepath')
+    msg = ("There was a problem syncing 'homepath' with the micro:bit. "
+           "Please check Mu's logs for more information.")
+    fsp.show_warning.assert_called_once_with(msg)
+
+
 def test_FileSystemPane_set_font_size():
     """
     Ensure the right size is set as the point size and the text based UI child
@@ -757,12 +1043,16 @@ def test_FileSystemPane_set_font_size():
     fsp.local_label = mock.MagicMock()
     fsp.microbit_fs = mock.MagicMock()
     fsp.local_fs = mock.MagicMock()
+    fsp.sync_button = mock.MagicMock()
+    fsp.delete_checkbox = mock.MagicMock()
     fsp.set_font_size(22)
     fsp.font.setPointSize.assert_called_once_with(22)
     fsp.microbit_label.setFont.assert_called_once_with(fsp.font)
     fsp.local_label.setFont.assert_called_once_with(fsp.font)
     fsp.microbit_fs.setFont.assert_called_once_with(fsp.font)
     fsp.local_fs.setFont.assert_called_once_with(fsp.font)
+    fsp.sync_button.setFont.assert_called_once_with(fsp.font)
+    fsp.delete_checkbox.setFont.assert_called_once_with(fsp.font)
 
 
 def test_FileSystemPane_zoom_in():
@@ -787,104 +1077,6 @@ def test_FileSystemPane_zoom_out():
     fsp.set_font_size.assert_called_once_with(expected)
 
 
-def test_JupyterREPLPane_init():
-    """
-    Ensure the widget is setup with the correct defaults.
-    """
-    jw = mu.interface.panes.JupyterREPLPane()
-    assert jw.console_height == 10
-
-
-def test_JupyterREPLPane_append_plain_text():
-    """
-    """
-    jw = mu.interface.panes.JupyterREPLPane()
-    jw.on_append_text = mock.MagicMock()
-    jw._append_plain_text('hello')
-    jw.on_append_text.emit.assert_called_once_with('hello'.encode('utf-8'))
-
-
-def test_JupyterREPLPane_set_font_size():
-    """
-    Check the correct stylesheet values are being set.
-    """
-    jw = mu.interface.panes.JupyterREPLPane()
-    jw.setStyleSheet = mock.MagicMock()
-    jw.set_font_size(16)
-    style = jw.setStyleSheet.call_args[0][0]
-    assert 'font-size: 16pt;' in style
-    assert 'font-family: Monospace;' in style
-
-
-def test_JupyterREPLPane_zoomIn():
-    """
-    Ensure zooming in increases the font size.
-    """
-    jw = mu.interface.panes.JupyterREPLPane()
-    jw.set_font_size = mock.MagicMock()
-    old_size = jw.font.pointSize()
-    jw.zoomIn(delta=4)
-    jw.set_font_size.assert_called_once_with(old_size + 4)
-
-
-def test_JupyterREPLPane_zoomOut():
-    """
-    Ensure zooming out decreases the font size.
-    """
-    jw = mu.interface.panes.JupyterREPLPane()
-    jw.set_font_size = mock.MagicMock()
-    old_size = jw.font.pointSize()
-    jw.zoomOut(delta=4)
-    jw.set_font_size.assert_called_once_with(old_size - 4)
-
-
-def test_JupyterREPLPane_set_theme_day():
-    """
-    Make sure the theme is correctly set for day.
-    """
-    jw = mu.interface.panes.JupyterREPLPane()
-    jw.set_default_style = mock.MagicMock()
-    jw.setStyleSheet = mock.MagicMock()
-    jw.set_theme('day')
-    jw.set_default_style.assert_called_once_with()
-    jw.setStyleSheet.assert_called_once_with(mu.interface.themes.DAY_STYLE)
-
-
-def test_JupyterREPLPane_set_theme_night():
-    """
-    Make sure the theme is correctly set for night.
-    """
-    jw = mu.interface.panes.JupyterREPLPane()
-    jw.set_default_style = mock.MagicMock()
-    jw.setStyleSheet = mock.MagicMock()
-    jw.set_theme('night')
-    jw.set_default_style.assert_called_once_with(colors='nocolor')
-    jw.setStyleSheet.assert_called_once_with(mu.interface.themes.NIGHT_STYLE)
-
-
-def test_JupyterREPLPane_set_theme_contrast():
-    """
-    Make sure the theme is correctly set for high contrast.
-    """
-    jw = mu.interface.panes.JupyterREPLPane()
-    jw.set_default_style = mock.MagicMock()
-    jw.setStyleSheet = mock.MagicMock()
-    jw.set_theme('contrast')
-    jw.set_default_style.assert_called_once_with(colors='nocolor')
-    jw.setStyleSheet.assert_called_once_with(
-        mu.interface.themes.CONTRAST_STYLE)
-
-
-def test_JupyterREPLPane_setFocus():
-    """
-    Ensures setFocus actually occurs to the _control containing the REPL.
-    """
-    jw = mu.interface.panes.JupyterREPLPane()
-    jw._control = mock.MagicMock()
-    jw.setFocus()
-    jw._control.setFocus.assert_called_once_with()
-
-
 def test_PythonProcessPane_init():
     """
     Check the font and input_buffer is set.
@@ -1640,8 +1832,10 @@ def test_PythonProcessPane_read_from_stdout():
     ppp.process = mock.MagicMock()
     ppp.process.readAll().data.return_value = b'hello world'
     ppp.on_append_text = mock.MagicMock()
+    ppp.trim_scrollback = mock.MagicMock()
     ppp.read_from_stdout()
     assert ppp.append.call_count == 1
+    ppp.trim_scrollback.assert_called_once_with()
     assert ppp.process.readAll().data.call_count == 1
     assert ppp.start_of_current_line == 123
     ppp.on_append_text.emit.assert_called_once_with(b'hello world')
@@ -1948,11 +2142,14 @@ def test_PlotterPane_init():
     """
     pp = mu.interface.panes.PlotterPane()
     assert pp.input_buffer == []
-    assert pp.raw_data == []
     assert pp.max_x == 100
     assert pp.max_y == 1000
     assert len(pp.data) == 1
-    assert isinstance(pp.data[0], deque)
+    assert isinstance(pp.data, PlotData)
+    assert pp.data.size == pp.max_x
+    assert pp.plot_timer.isSingleShot()
+    assert pp.plot_timer.interval() == \
+        mu.interface.panes.PLOTTER_FRAME_INTERVAL
     assert len(pp.series) == 1
     assert isinstance(pp.series[0], QLineSeries)
     assert isinstance(pp.chart, QChart)
@@ -1964,45 +2161,40 @@ def test_PlotterPane_process_bytes():
     """
     If a byte representation of a Python tuple containing numeric values,
     starting at the beginning of a new line and terminating with a new line is
-    received, then the add_data method is called with the resulting Python
+    received, then the add_rows method is called with the resulting Python
     tuple.
     """
     pp = mu.interface.panes.PlotterPane()
-    pp.add_data = mock.MagicMock()
+    pp.add_rows = mock.MagicMock()
     pp.process_bytes(b'(1, 2.3, 4)\r\n')
-    pp.add_data.assert_called_once_with((1, 2.3, 4))
+    pp.add_rows.assert_called_once_with([(1, 2.3, 4)])
 
 
-def test_PlotterPane_process_bytes_guards_against_data_flood():
+def test_PlotterPane_process_bytes_lots_of_data():
     """
-    If the process_bytes method gets data of more than 1024 bytes then trigger
-    a data_flood signal and ensure the plotter no longer processes incoming
-    bytes.
-
-    (The assumption is that Mu will clean up once the data_flood signal is
-    emitted.)
+    However much data arrives at once, every tuple is added to the plotter,
+    with consecutive tuples of the same size added together.
     """
     pp = mu.interface.panes.PlotterPane()
-    pp.data_flood = mock.MagicMock()
-    pp.add_data = mock.MagicMock()
-    data_flood = b'X' * 1025
-    pp.process_bytes(data_flood)
-    assert pp.flooded is True
-    pp.data_flood.emit.assert_called_once_with()
-    assert pp.add_data.call_count == 0
-    pp.process_bytes(data_flood)
-    assert pp.add_data.call_count == 0
+    pp.add_rows = mock.MagicMock()
+    pp.process_bytes(b'(1, 2.3, 4)\r\n' * 1000 + b'>>> \r\n(5, )\r\n' +
+                     b'(6, 7)\r\n' * 10)
+    assert pp.add_rows.call_args_list == [
+        mock.call([(1, 2.3, 4)] * 1000),
+        mock.call([(5, )]),
+        mock.call([(6, 7)] * 10),
+    ]
 
 
 def test_PlotterPane_process_bytes_tuple_not_numeric():
     """
     If a byte representation of a tuple is received but it doesn't contain
-    numeric values, then the add_data method MUST NOT be called.
+    numeric values, then the add_rows method MUST NOT be called.
     """
     pp = mu.interface.panes.PlotterPane()
-    pp.add_data = mock.MagicMock()
+    pp.add_rows = mock.MagicMock()
     pp.process_bytes(b'("a", "b", "c")\r\n')
-    assert pp.add_data.call_count == 0
+    assert pp.add_rows.call_count == 0
 
 
 def test_PlotterPane_process_bytes_overrun_input_buffer():
@@ -2011,33 +2203,54 @@ def test_PlotterPane_process_bytes_overrun_input_buffer():
     until the newline is detected.
     """
     pp = mu.interface.panes.PlotterPane()
-    pp.add_data = mock.MagicMock()
+    pp.add_rows = mock.MagicMock()
     pp.process_bytes(b'(1, 2.3, 4)\r\n')
-    pp.add_data.assert_called_once_with((1, 2.3, 4))
-    pp.add_data.reset_mock()
+    pp.add_rows.assert_called_once_with([(1, 2.3, 4)])
+    pp.add_rows.reset_mock()
     pp.process_bytes(b'(1, 2.')
-    assert pp.add_data.call_count == 0
-    pp.process_bytes(b'3, 4)\r\n')
-    pp.add_data.assert_called_once_with((1, 2.3, 4))
-    pp.add_data.reset_mock()
+    assert pp.add_rows.call_count == 0
+    pp.process_bytes(b'3, 4)\r')
+    assert pp.add_rows.call_count == 0
+    pp.process_bytes(b'\n')
+    pp.add_rows.assert_called_once_with([(1, 2.3, 4)])
+    assert pp.input_buffer == []
+    pp.add_rows.reset_mock()
     pp.process_bytes(b'(1, 2.3, 4)\r\n')
-    pp.add_data.assert_called_once_with((1, 2.3, 4))
+    pp.add_rows.assert_called_once_with([(1, 2.3, 4)])
 
 
 def test_PlotterPane_add_data():
     """
-    Given a tuple with a single value, ensure it is logged and correctly added
-    to the chart.
+    Given a tuple with a single value, ensure it is emitted and correctly
+    added to the data, and the chart is updated once the frame has passed.
     """
     pp = mu.interface.panes.PlotterPane()
-    mock_line_series = mock.MagicMock()
-    pp.series = [mock_line_series, ]
+    pp.plot_timer = mock.MagicMock()
+    pp.plot_timer.isActive.side_effect = [False, True]
+    mock_added = mock.MagicMock()
+    pp.data_added.connect(mock_added)
     pp.add_data((1, ))
-    assert (1, ) in pp.raw_data
-    mock_line_series.clear.assert_called_once_with()
-    for i in range(99):
-        mock_line_series.append.call_args_list[i][0] == (i, 0)
-    mock_line_series.append.call_args_list[99][0] == (99, 1)
+    pp.add_data((2, ))
+    mock_added.assert_any_call([(1, )])
+    assert list(pp.data.series(0)[-2:, 1]) == [1, 2]
+    pp.plot_timer.start.assert_called_once_with()
+
+
+def test_PlotterPane_add_rows():
+    """
+    Given a list of tuples, ensure they're all emitted, counted and added to
+    the data together.
+    """
+    pp = mu.interface.panes.PlotterPane()
+    pp.data.extend = mock.MagicMock()
+    mock_added = mock.MagicMock()
+    pp.data_added.connect(mock_added)
+    rows = [(1, 2), (3, 4), (5, 6)]
+    pp.add_rows(rows)
+    mock_added.assert_called_once_with(rows)
+    assert pp.sample_count == 3
+    assert len(pp.series) == 2
+    pp.data.extend.assert_called_once_with(rows)
 
 
 def test_PlotterPane_add_data_adjust_values_up():
@@ -2064,8 +2277,7 @@ def test_PlotterPane_add_data_adjust_values_down():
     """
     pp = mu.interface.panes.PlotterPane()
     pp.series = [mock.MagicMock(), mock.MagicMock(), mock.MagicMock()]
-    pp.data.append(mock.MagicMock())
-    pp.data.append(mock.MagicMock())
+    pp.data.resize(3)
     pp.chart = mock.MagicMock()
     with mock.patch('mu.interface.panes.QLineSeries'):
         pp.add_data((1, ))
@@ -2074,21 +2286,71 @@ def test_PlotterPane_add_data_adjust_values_down():
     assert pp.chart.removeSeries.call_count == 2
 
 
-def test_PlotterPane_add_data_re_scale_up():
+def test_PlotterPane_plot():
+    """
+    Ensure each line series has its points replaced with the latest data.
+    """
+    pp = mu.interface.panes.PlotterPane()
+    pp.add_data((1, ))
+    pp.plot()
+    points = pp.series[0].pointsVector()
+    assert len(points) == pp.max_x * 2
+    assert [(p.x(), p.y()) for p in points[-4:]] == [
+        (98, 0), (98, 0), (99, 1), (99, 1)]
+
+
+def test_PlotterPane_update_rate():
+    """
+    Once the rate interval has passed, the rate samples arrive is shown in
+    the title and samples are combined so the chart moves at about the
+    display rate.
+    """
+    pp = mu.interface.panes.PlotterPane()
+    pp.chart = mock.MagicMock()
+    pp.rate_started = 100
+    pp.sample_count = 10
+    with mock.patch('mu.interface.panes.time.monotonic', return_value=100.5):
+        pp.update_rate()
+    assert pp.chart.setTitle.call_count == 0
+    with mock.patch('mu.interface.panes.time.monotonic', return_value=102):
+        pp.update_rate()
+    assert pp.sample_rate == 5
+    assert pp.data.decimation == 1
+    pp.chart.setTitle.assert_called_once_with('5 samples per second')
+    assert pp.sample_count == 0
+    assert pp.rate_started == 102
+    pp.sample_count = 4 * mu.interface.panes.PLOTTER_DISPLAY_RATE + 1
+    with mock.patch('mu.interface.panes.time.monotonic', return_value=103):
+        pp.update_rate()
+    assert pp.data.decimation == 5
+    assert '(each point shows the range of 5 samples)' in \
+        pp.chart.setTitle.call_args[0][0]
+
+
+def test_PlotterPane_add_data_counts_samples():
+    """
+    Each sample added is counted to measure the rate they arrive.
+    """
+    pp = mu.interface.panes.PlotterPane()
+    pp.add_data((1, ))
+    pp.add_data((2, ))
+    assert pp.sample_count == 2
+
+
+def test_PlotterPane_plot_re_scale_up():
     """
     If the y axis contains data greater than the current range, then ensure
     the range is doubled.
     """
     pp = mu.interface.panes.PlotterPane()
     pp.axis_y = mock.MagicMock()
-    mock_line_series = mock.MagicMock()
-    pp.series = [mock_line_series, ]
     pp.add_data((1001, ))
+    pp.plot()
     assert pp.max_y == 2000
     pp.axis_y.setRange.assert_called_once_with(-2000, 2000)
 
 
-def test_PlotterPane_add_data_re_scale_down():
+def test_PlotterPane_plot_re_scale_down():
     """
     If the y axis contains data less than half of the current range, then
     ensure the range is halved.
@@ -2096,9 +2358,8 @@ def test_PlotterPane_add_data_re_scale_down():
     pp = mu.interface.panes.PlotterPane()
     pp.max_y = 4000
     pp.axis_y = mock.MagicMock()
-    mock_line_series = mock.MagicMock()
-    pp.series = [mock_line_series, ]
     pp.add_data((1999, ))
+    pp.plot()
     assert pp.max_y == 2000
     pp.axis_y.setRange.assert_called_once_with(-2000, 2000)
 
@@ -2111,9 +2372,8 @@ def test_PlotterPane_set_label_format_to_float_when_range_small():
     pp = mu.interface.panes.PlotterPane()
     pp.max_y = 10
     pp.axis_y = mock.MagicMock()
-    mock_line_series = mock.MagicMock()
-    pp.series = [mock_line_series, ]
     pp.add_data((1, ))
+    pp.plot()
     assert pp.max_y == 1
     pp.axis_y.setRange.assert_called_once_with(-1, 1)
     pp.axis_y.setLabelFormat.assert_called_once_with("%2.2f")
@@ -2127,9 +2387,8 @@ def test_PlotterPane_set_label_format_to_int_when_range_large():
     pp = mu.interface.panes.PlotterPane()
     pp.max_y = 5
     pp.axis_y = mock.MagicMock()
-    mock_line_series = mock.MagicMock()
-    pp.series = [mock_line_series, ]
     pp.add_data((10, ))
+    pp.plot()
     assert pp.max_y == 10
     pp.axis_y.setRange.assert_called_once_with(-10, 10)
     pp.axis_y.setLabelFormat.assert_called_once_with("%d")
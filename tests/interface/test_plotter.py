@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the data held by the plotter.
+"""
+import random
+import numpy
+from mu.interface.plotter import (PlotData, parse_value, parse_tuple,
+                                  parse_tuples)
+
+
+def lows(pd, index):
+    """
+    Return the lowest value of each column of the referenced series.
+    """
+    return list(pd.series(index)[:, 0])
+
+
+def highs(pd, index):
+    """
+    Return the highest value of each column of the referenced series.
+    """
+    return list(pd.series(index)[:, 1])
+
+
+def test_parse_value():
+    """
+    Ints and floats are parsed, anything else is None.
+    """
+    assert parse_value(b' 12 ') == 12
+    assert isinstance(parse_value(b'12'), int)
+    assert parse_value(b'-1.5') == -1.5
+    assert parse_value(b'1e3') == 1000.0
+    assert parse_value(b'"a"') is None
+    assert parse_value(b'1.2.3') is None
+    assert parse_value(b'') is None
+
+
+def test_parse_tuple():
+    """
+    The values between the brackets of a tuple are parsed, keeping ints as
+    ints and ignoring values which aren't numbers.
+    """
+    assert parse_tuple(b'1, -2, 3') == (1, -2, 3)
+    assert parse_tuple(b'1, 2.5, 3') == (1, 2.5, 3)
+    assert isinstance(parse_tuple(b'1, 2.5')[0], int)
+    assert parse_tuple(b'1, "a", 2.0') == (1, 2.0)
+    assert parse_tuple(b'1,') == (1, )
+    assert parse_tuple(b'"a", "b"') == ()
+
+
+def test_parse_tuples():
+    """
+    Only lines which are tuples with numbers in them are parsed, giving a
+    tuple for each.
+    """
+    data = (b'>>> (1, 2)\n'
+            b'(1, 2)\n'
+            b'("a", "b")\n'
+            b'(3.5, )\n'
+            b'(4, 5) and more\n'
+            b'()\n'
+            b'(9)')
+    assert parse_tuples(data) == [(1, 2), (3.5, ), (9, )]
+
+
+def legacy_parse_tuples(data):
+    """
+    How tuples were parsed by PlotterPane.process_bytes, a line and a value
+    at a time, to check parse_tuples gives the same results.
+    """
+    result = []
+    for line in data.split(b'\n'):
+        if line.startswith(b'(') and line.endswith(b')'):
+            numeric_values = []
+            for raw in [val.strip() for val in line[1:-1].split(b',')]:
+                try:
+                    numeric_values.append(int(raw))
+                    continue
+                except ValueError:
+                    pass
+                try:
+                    numeric_values.append(float(raw))
+                except ValueError:
+                    continue
+            if numeric_values:
+                result.append(tuple(numeric_values))
+    return result
+
+
+def test_parse_tuples_fuzz():
+    """
+    Lines made up of random pieces of tuples are parsed just as they were a
+    line and a value at a time, with the same types of value.
+    """
+    rng = random.Random(0)
+    pieces = [b'(', b')', b',', b' ', b'-', b'.', b'1', b'23', b'e', b'4',
+              b'"a"', b'nan', b'\r', b'\n', b'(1, 2)\n', b'(3.5, -6)\n']
+    for i in range(500):
+        data = b''.join(rng.choice(pieces)
+                        for j in range(rng.randint(0, 30)))
+        expected = legacy_parse_tuples(data)
+        result = parse_tuples(data)
+        assert repr(result) == repr(expected)
+
+
+def test_PlotData_init():
+    """
+    Ensure the series start filled with zeros, one sample per column.
+    """
+    pd = PlotData(5, 2)
+    assert pd.size == 5
+    assert pd.decimation == 1
+    assert len(pd) == 2
+    assert pd.max_abs == 0
+    assert lows(pd, 0) == highs(pd, 1) == [0] * 5
+
+
+def test_PlotData_append():
+    """
+    Appended values go at the end of each series, pushing out the oldest
+    ones.
+    """
+    pd = PlotData(3, 2)
+    for i in range(1, 5):
+        pd.append((i, -i))
+    assert lows(pd, 0) == highs(pd, 0) == [2, 3, 4]
+    assert lows(pd, 1) == highs(pd, 1) == [-2, -3, -4]
+
+
+def test_PlotData_append_decimated():
+    """
+    When decimating, each column holds the lowest and highest of that many
+    samples, with a partly filled column shown as the newest.
+    """
+    pd = PlotData(3)
+    pd.decimation = 3
+    for value in (5, -1, 2, 7):
+        pd.append((value, ))
+    assert lows(pd, 0) == [0, -1, 7]
+    assert highs(pd, 0) == [0, 5, 7]
+    pd.append((9, ))
+    pd.append((8, ))
+    assert lows(pd, 0) == [0, -1, 7]
+    assert highs(pd, 0) == [0, 5, 9]
+    pd.append((1, ))
+    assert lows(pd, 0) == [-1, 7, 1]
+    assert highs(pd, 0) == [5, 9, 1]
+
+
+def test_PlotData_extend():
+    """
+    Adding rows together fills the columns just as adding them one at a
+    time, however they're split up and whatever the decimation.
+    """
+    rng = numpy.random.RandomState(0)
+    for i in range(200):
+        one = PlotData(7, 2)
+        batched = PlotData(7, 2)
+        for j in range(rng.randint(1, 6)):
+            decimation = rng.randint(1, 5)
+            one.decimation = batched.decimation = decimation
+            rows = rng.randint(-50, 50, (rng.randint(0, 30), 2))
+            for row in rows:
+                one.append(row)
+            batched.extend(rows)
+            assert numpy.array_equal(one.series(0), batched.series(0))
+            assert numpy.array_equal(one.series(1), batched.series(1))
+            assert one.max_abs == batched.max_abs
+
+
+def test_PlotData_max_abs():
+    """
+    The largest absolute value is tracked as values are added, and found
+    again once it drops out of the buffer.
+    """
+    pd = PlotData(3)
+    pd.append((-10, ))
+    assert pd.max_abs == 10
+    pd.append((2, ))
+    pd.append((3, ))
+    assert pd.max_abs == 10
+    pd.append((1, ))  # The -10 drops out.
+    assert pd.max_abs == 3
+    pd.append((0.5, ))  # The 2 drops out.
+    assert pd.max_abs == 3
+
+
+def test_PlotData_max_abs_matches():
+    """
+    However values are added, the tracked largest absolute value is that of
+    the values held.
+    """
+    rng = numpy.random.RandomState(0)
+    pd = PlotData(10, 3)
+    for i in range(500):
+        pd.decimation = rng.randint(1, 4)
+        pd.append(rng.randint(-100, 100, 3) * rng.random_sample())
+        assert pd.max_abs == numpy.abs(pd.values).max()
+
+
+def test_PlotData_resize():
+    """
+    New series are filled with zeros and removed series forgotten, with the
+    largest absolute value updated.
+    """
+    pd = PlotData(3)
+    pd.append((5, ))
+    pd.resize(2)
+    assert len(pd) == 2
+    assert lows(pd, 1) == [0, 0, 0]
+    pd.append((1, 20))
+    assert pd.max_abs == 20
+    pd.resize(1)
+    assert len(pd) == 1
+    assert pd.max_abs == 5
+    pd.resize(0)
+    assert pd.max_abs == 0
+
+
+def test_PlotData_polygon():
+    """
+    The points of a series have x the column from 0 and y the lowest then
+    highest values of the column, oldest first. Each polygon is a separate
+    copy.
+    """
+    pd = PlotData(2)
+    pd.append((1.5, ))
+    first = pd.polygon(0)
+    pd.decimation = 2
+    pd.append((2, ))
+    pd.append((-2, ))
+    second = pd.polygon(0)
+    assert [(p.x(), p.y()) for p in first] == [(0, 0), (0, 0),
+                                               (1, 1.5), (1, 1.5)]
+    assert [(p.x(), p.y()) for p in second] == [(0, 1.5), (0, 1.5),
+                                                (1, -2), (1, 2)]
+    assert [p.y() for p in pd.template] == [0, 0, 0, 0]
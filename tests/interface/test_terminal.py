@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the decoder of MicroPython REPL output.
+"""
+import random
+from mu.interface.terminal import TerminalDecoder, MAX_CSI_LENGTH
+
+
+def test_TerminalDecoder_decode():
+    """
+    Ensure runs of text are grouped into single text operations, backspace
+    and newline are kept, VT100 sequences become cursor movements and other
+    control characters are ignored.
+    """
+    bs = (b'>>> ab\x08\x08xy\r\n'  # text, 2 * \b, text, \r, \n
+          b'\x1b[2D\x1b[A\x1b[3B\x1b[0C'  # <Esc>[2D, <Esc>[A, etc...
+          b'\x1b[K\x1b[0K\x1b[2K'  # <Esc>[K, <Esc>[0K, <Esc>[2K
+          b'\x07\x1b[1;31mz\tc\xc3\xa9')  # bell, colour, text
+    td = TerminalDecoder()
+    assert td.decode(bs) == [
+        ('text', '>>> ab'),
+        ('backspace', None),
+        ('backspace', None),
+        ('text', 'xy'),
+        ('newline', None),
+        ('left', 2),
+        ('up', 1),
+        ('down', 3),
+        ('right', 1),
+        ('erase', None),
+        ('erase', None),
+        ('text', 'z\tc\xe9'),
+    ]
+
+
+def test_TerminalDecoder_decode_joins_text():
+    """
+    Text either side of an ignored control character is a single operation.
+    """
+    td = TerminalDecoder()
+    assert td.decode(b'ab\rcd\x07ef') == [('text', 'abcdef')]
+
+
+def test_TerminalDecoder_decode_escape():
+    """
+    Two character escape sequences are ignored, as is an <Esc> followed by a
+    control character.
+    """
+    td = TerminalDecoder()
+    assert td.decode(b'a\x1bcb\x1b\nc') == [
+        ('text', 'ab'),
+        ('newline', None),
+        ('text', 'c'),
+    ]
+
+
+def test_TerminalDecoder_decode_invalid_csi():
+    """
+    A control sequence interrupted by something other than a parameter or
+    final character is abandoned and the character is decoded as usual.
+    Private (e.g. <Esc>[?25l) and unsupported sequences are ignored.
+    """
+    td = TerminalDecoder()
+    assert td.decode(b'\x1b[1\nA\x1b[?25l\x1b[5H') == [
+        ('newline', None),
+        ('text', 'A'),
+    ]
+
+
+def test_TerminalDecoder_decode_long_csi():
+    """
+    Garbage which looks like an endless control sequence is abandoned.
+    """
+    td = TerminalDecoder()
+    params = b'1' * (MAX_CSI_LENGTH + 1)
+    assert td.decode(b'\x1b[' + params + b'Dxy') == [('text', 'Dxy')]
+
+
+def test_TerminalDecoder_decode_split():
+    """
+    Control sequences and UTF-8 characters split between chunks are carried
+    over to the next chunk.
+    """
+    td = TerminalDecoder()
+    assert td.decode(b'a\x1b') == [('text', 'a')]
+    assert td.decode(b'[1') == []
+    assert td.decode(b'2Db\xe2\x82') == [('left', 12), ('text', 'b')]
+    assert td.decode(b'\xac') == [('text', '€')]
+
+
+def test_TerminalDecoder_decode_invalid_utf8():
+    """
+    Bytes which aren't valid UTF-8 are replaced rather than causing an error.
+    """
+    td = TerminalDecoder()
+    assert td.decode(b'a\xffb') == [('text', 'a�b')]
+
+
+def test_TerminalDecoder_reset():
+    """
+    Resetting forgets partially decoded characters and control sequences.
+    """
+    td = TerminalDecoder()
+    td.decode(b'\x1b[1')
+    td.reset()
+    assert td.decode(b'2D') == [('text', '2D')]
+    td.decode(b'\xe2')
+    td.reset()
+    assert td.decode(b'a') == [('text', 'a')]
+
+
+def test_TerminalDecoder_fuzz():
+    """
+    However the output is split into chunks, the text is decoded the same,
+    and random bytes never cause an error.
+    """
+    rng = random.Random(0)
+    alphabet = (b'abc \t\r\n\x08\x1b[;?0123456789ABCDKm\xc3\xa9\xe2\x82\xac'
+                b'\xff')
+    for i in range(200):
+        data = bytes(rng.choice(alphabet) for j in range(rng.randint(0, 64)))
+        expected = TerminalDecoder().decode(data)
+        td = TerminalDecoder()
+        result = []
+        position = 0
+        while position < len(data):
+            size = rng.randint(1, 8)
+            result.extend(td.decode(data[position:position + size]))
+            position += size
+        # Join up text split between chunks.
+        joined = []
+        for op in result:
+            if joined and op[0] == 'text' and joined[-1][0] == 'text':
+                joined[-1] = ('text', joined[-1][1] + op[1])
+            else:
+                joined.append(op)
+        assert joined == expected
@@ -17,6 +17,7 @@ def test_adafruit_mode():
     view = mock.MagicMock()
     am = AdafruitMode(editor, view)
     assert am.name == 'Adafruit CircuitPython'
+    assert am.short_name == 'adafruit'
     assert am.description is not None
     assert am.icon == 'adafruit'
     assert am.editor == editor
@@ -46,57 +47,33 @@ def test_adafruit_mode_no_charts():
 
 def test_workspace_dir_posix_exists():
     """
-    Simulate being on os.name == 'posix' and a call to "mount" returns a
-    record indicating a connected device.
+    Simulate being on os.name == 'posix' and a CIRCUITPY volume being
+    mounted.
     """
     editor = mock.MagicMock()
     view = mock.MagicMock()
     am = AdafruitMode(editor, view)
-    with open('tests/modes/mount_exists.txt', 'rb') as fixture_file:
-        fixture = fixture_file.read()
-        with mock.patch('os.name', 'posix'):
-            with mock.patch('mu.modes.adafruit.check_output',
-                            return_value=fixture):
-                assert am.workspace_dir() == '/media/ntoll/CIRCUITPY'
-
-
-def test_workspace_dir_posix_no_mount_command():
-    """
-    When the user doesn't have administrative privileges on OSX then the mount
-    command isn't on their path. In which case, check Mu uses the more
-    explicit /sbin/mount instead.
-    """
-    editor = mock.MagicMock()
-    view = mock.MagicMock()
-    am = AdafruitMode(editor, view)
-    with open('tests/modes/mount_exists.txt', 'rb') as fixture_file:
-        fixture = fixture_file.read()
-    mock_check = mock.MagicMock(side_effect=[FileNotFoundError, fixture])
     with mock.patch('os.name', 'posix'), \
-            mock.patch('mu.modes.adafruit.check_output', mock_check):
+            mock.patch('mu.modes.adafruit.MOUNTS.find',
+                       return_value='/media/ntoll/CIRCUITPY') as mock_find:
         assert am.workspace_dir() == '/media/ntoll/CIRCUITPY'
-        assert mock_check.call_count == 2
-        assert mock_check.call_args_list[0][0][0] == 'mount'
-        assert mock_check.call_args_list[1][0][0] == '/sbin/mount'
+    mock_find.assert_called_once_with('CIRCUITPY')
 
 
 def test_workspace_dir_posix_missing():
     """
-    Simulate being on os.name == 'posix' and a call to "mount" returns a
-    no records associated with a micro:bit device.
+    Simulate being on os.name == 'posix' and no CIRCUITPY volume being
+    mounted.
     """
     editor = mock.MagicMock()
     view = mock.MagicMock()
     am = AdafruitMode(editor, view)
-    with open('tests/modes/mount_missing.txt', 'rb') as fixture_file:
-        fixture = fixture_file.read()
-        with mock.patch('os.name', 'posix'):
-            with mock.patch('mu.modes.adafruit.check_output',
-                            return_value=fixture),\
-                    mock.patch('mu.modes.adafruit.'
-                               'MicroPythonMode.workspace_dir') as mpm:
-                mpm.return_value = 'foo'
-                assert am.workspace_dir() == 'foo'
+    with mock.patch('os.name', 'posix'), \
+            mock.patch('mu.modes.adafruit.MOUNTS.find', return_value=None), \
+            mock.patch('mu.modes.adafruit.'
+                       'MicroPythonMode.workspace_dir') as mpm:
+        mpm.return_value = 'foo'
+        assert am.workspace_dir() == 'foo'
 
 
 def test_workspace_dir_nt_exists():
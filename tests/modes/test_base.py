@@ -5,7 +5,8 @@ Tests for the BaseMode class.
 import os
 import mu
 import pytest
-from mu.modes.base import BaseMode, MicroPythonMode
+from mu.logic import PORTS, SerialPort
+from mu.modes.base import BaseMode, MicroPythonMode, compiled_api_path
 from unittest import mock
 
 
@@ -26,6 +27,42 @@ def test_base_mode():
     assert bm.workspace_dir()
     assert bm.api() == NotImplemented
     assert bm.builtins is None
+    assert bm.short_name is None
+
+
+def test_compiled_api_path():
+    """
+    Compiled API files are named after the mode, Mu's version and the
+    language, defaulting to Mu's language.
+    """
+    filename = 'python-{}-es.pap'.format(mu.__version__)
+    with mock.patch('mu.modes.base.path', return_value='foo') as mock_path:
+        assert compiled_api_path('python', 'es') == 'foo'
+    mock_path.assert_called_once_with(filename, 'api/')
+    filename = 'python-{}-{}.pap'.format(mu.__version__, mu.language_code)
+    with mock.patch('mu.modes.base.path', return_value='foo') as mock_path:
+        compiled_api_path('python')
+    mock_path.assert_called_once_with(filename, 'api/')
+
+
+def test_base_mode_api_source():
+    """
+    The mode's compiled API file is used if it exists, otherwise the list of
+    API definitions.
+    """
+    bm = BaseMode(mock.MagicMock(), mock.MagicMock())
+    bm.api = mock.MagicMock(return_value=['foo', ])
+    assert bm.api_source() == ['foo', ]
+    bm.short_name = 'python'
+    with mock.patch('mu.modes.base.compiled_api_path',
+                    return_value='foo.pap'), \
+            mock.patch('os.path.isfile', return_value=True) as mock_isfile:
+        assert bm.api_source() == 'foo.pap'
+    mock_isfile.assert_called_once_with('foo.pap')
+    with mock.patch('mu.modes.base.compiled_api_path',
+                    return_value='foo.pap'), \
+            mock.patch('os.path.isfile', return_value=False):
+        assert bm.api_source() == ['foo', ]
 
 
 def test_base_mode_workspace_dir():
@@ -140,43 +177,84 @@ def test_base_mode_add_plotter():
 
 def test_base_mode_remove_plotter():
     """
-    Ensure the plotter is removed and data is saved as a CSV file in the
-    expected directory.
+    Ensure the plotter is removed and the capture of its data is stopped.
     """
     editor = mock.MagicMock()
     view = mock.MagicMock()
-    view.plotter_pane.raw_data = [1, 2, 3]
     bm = BaseMode(editor, view)
     bm.plotter = mock.MagicMock()
-    mock_mkdir = mock.MagicMock()
-    mock_open = mock.mock_open()
-    mock_csv_writer = mock.MagicMock()
-    mock_csv = mock.MagicMock()
-    mock_csv.writer.return_value = mock_csv_writer
-    with mock.patch('mu.modes.base.os.path.exists', return_value=False), \
-            mock.patch('mu.modes.base.os.makedirs', mock_mkdir), \
-            mock.patch('builtins.open', mock_open), \
-            mock.patch('mu.modes.base.csv', mock_csv):
-        bm.remove_plotter()
+    bm.stop_capture = mock.MagicMock()
+    bm.remove_plotter()
     assert bm.plotter is None
     view.remove_plotter.assert_called_once_with()
+    bm.stop_capture.assert_called_once_with()
+
+
+def test_base_mode_start_capture():
+    """
+    Ensure the data added to the plotter is captured to files in the
+    expected directory.
+    """
+    editor = mock.MagicMock()
+    editor.capture_format = 'csv'
+    view = mock.MagicMock()
+    bm = BaseMode(editor, view)
+    mock_capture = mock.MagicMock()
+    mock_writer = mock.MagicMock(return_value=mock_capture)
+    with mock.patch.dict('mu.modes.base.CAPTURE_WRITERS',
+                         {'csv': mock_writer}):
+        bm.start_capture()
     dd = os.path.join(bm.workspace_dir(), 'data_capture')
-    mock_mkdir.assert_called_once_with(dd)
-    mock_csv_writer.writerows.\
-        assert_called_once_with(view.plotter_pane.raw_data)
+    mock_writer.assert_called_once_with(dd)
+    mock_capture.start.assert_called_once_with()
+    view.plotter_pane.data_added.connect.\
+        assert_called_once_with(mock_capture.write)
+    assert bm.capture == mock_capture
 
 
-def test_base_on_data_flood():
+def test_base_mode_start_capture_binary():
     """
-    Ensure the plotter is removed and a helpful message is displayed to the
-    user.
+    The data is captured in the format set in the editor.
     """
     editor = mock.MagicMock()
+    editor.capture_format = 'binary'
     view = mock.MagicMock()
     bm = BaseMode(editor, view)
-    bm.on_data_flood()
-    view.remove_plotter.assert_called_once_with()
-    assert view.show_message.call_count == 1
+    mock_writer = mock.MagicMock()
+    with mock.patch.dict('mu.modes.base.CAPTURE_WRITERS',
+                         {'binary': mock_writer}):
+        bm.start_capture()
+    assert bm.capture == mock_writer.return_value
+
+
+def test_base_mode_start_capture_stops_old():
+    """
+    Starting a capture finishes any capture already in progress.
+    """
+    editor = mock.MagicMock()
+    view = mock.MagicMock()
+    bm = BaseMode(editor, view)
+    old_capture = mock.MagicMock()
+    bm.capture = old_capture
+    with mock.patch('mu.modes.base.CaptureWriter'):
+        bm.start_capture()
+    old_capture.close.assert_called_once_with()
+    assert bm.capture != old_capture
+
+
+def test_base_mode_stop_capture():
+    """
+    Ensure the capture (if there is one) is closed and forgotten.
+    """
+    editor = mock.MagicMock()
+    view = mock.MagicMock()
+    bm = BaseMode(editor, view)
+    bm.stop_capture()  # Nothing to stop.
+    capture = mock.MagicMock()
+    bm.capture = capture
+    bm.stop_capture()
+    capture.close.assert_called_once_with()
+    assert bm.capture is None
 
 
 def test_base_mode_open_file():
@@ -206,12 +284,28 @@ def test_micropython_mode_find_device():
         mock_port.portName = mock.MagicMock(return_value='COM0')
         mock_os = mock.MagicMock()
         mock_os.name = 'nt'
-        with mock.patch('mu.modes.base.QSerialPortInfo.availablePorts',
+        with mock.patch('mu.logic.QSerialPortInfo.availablePorts',
                         return_value=[mock_port, ]), \
                 mock.patch('mu.modes.base.os', mock_os):
             assert mm.find_device() == 'COM0'
 
 
+def test_micropython_mode_find_device_watched():
+    """
+    While the ports are watched for changes, the device is found from the
+    snapshot of the ports without enumerating them again.
+    """
+    mm = MicroPythonMode(mock.MagicMock(), mock.MagicMock())
+    vid, pid = list(mm.valid_boards)[0]
+    ports = (SerialPort('ttyACM0', 1, 2), SerialPort('ttyACM1', vid, pid))
+    with mock.patch.object(PORTS, 'snapshot', ports), \
+            mock.patch.object(PORTS, 'watched', True), \
+            mock.patch('mu.logic.QSerialPortInfo.availablePorts') as mock_ap, \
+            mock.patch('mu.modes.base.os.name', 'posix'):
+        assert mm.find_device() == '/dev/ttyACM1'
+    assert mock_ap.call_count == 0
+
+
 def test_micropython_mode_find_device_no_ports():
     """
     There are no connected devices so return None.
@@ -219,7 +313,7 @@ def test_micropython_mode_find_device_no_ports():
     editor = mock.MagicMock()
     view = mock.MagicMock()
     mm = MicroPythonMode(editor, view)
-    with mock.patch('mu.modes.base.QSerialPortInfo.availablePorts',
+    with mock.patch('mu.logic.QSerialPortInfo.availablePorts',
                     return_value=[]):
         assert mm.find_device() is None
 
@@ -234,7 +328,7 @@ def test_micropython_mode_find_device_but_no_device():
     mock_port = mock.MagicMock()
     mock_port.productIdentifier = mock.MagicMock(return_value=666)
     mock_port.vendorIdentifier = mock.MagicMock(return_value=999)
-    with mock.patch('mu.modes.base.QSerialPortInfo.availablePorts',
+    with mock.patch('mu.logic.QSerialPortInfo.availablePorts',
                     return_value=[mock_port, ]):
         assert mm.find_device() is None
 
@@ -487,22 +581,9 @@ def test_micropython_mode_add_plotter():
     view.add_micropython_plotter = mock.MagicMock()
     mm = MicroPythonMode(editor, view)
     mm.find_device = mock.MagicMock(return_value='COM0')
+    mm.start_capture = mock.MagicMock()
     with mock.patch('os.name', 'nt'):
         mm.add_plotter()
     assert view.show_message.call_count == 0
     assert view.add_micropython_plotter.call_args[0][0] == 'COM0'
-
-
-def test_micropython_on_data_flood():
-    """
-    Ensure that the REPL is removed before calling the base on_data_flood
-    method.
-    """
-    editor = mock.MagicMock()
-    view = mock.MagicMock()
-    mm = MicroPythonMode(editor, view)
-    mm.remove_repl = mock.MagicMock()
-    with mock.patch('builtins.super') as mock_super:
-        mm.on_data_flood()
-        mm.remove_repl.assert_called_once_with()
-        mock_super().on_data_flood.assert_called_once_with()
+    mm.start_capture.assert_called_once_with()
@@ -15,6 +15,7 @@ def test_debug_mode():
     view = mock.MagicMock()
     dm = DebugMode(editor, view)
     assert dm.name == 'Graphical Debugger'
+    assert dm.short_name == 'debugger'
     assert dm.description is not None
     assert dm.icon == 'python'
     assert dm.runner is None
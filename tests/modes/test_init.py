@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the registry of modes.
+"""
+from mu.modes import MODES, load_mode
+from mu.modes.microbit import MicrobitMode
+
+
+def test_load_mode():
+    """
+    The class of each mode is found by the mode's short name.
+    """
+    assert load_mode('microbit') is MicrobitMode
+    for name in MODES:
+        assert load_mode(name).short_name == name
@@ -51,6 +51,25 @@ def test_DeviceFlasher_run_fail():
     df.on_flash_fail.emit.assert_called_once_with(str(Exception('Boom')))
 
 
+def test_FileManager_init():
+    """
+    The file manager has a session with the micro:bit for its operations.
+    """
+    with mock.patch('mu.modes.microbit.microfs.MicrobitSession') as session:
+        fm = FileManager()
+    assert fm.session == session()
+
+
+def test_FileManager_close():
+    """
+    Closing the file manager ends its session with the micro:bit.
+    """
+    fm = FileManager()
+    fm.session = mock.MagicMock()
+    fm.close()
+    fm.session.close.assert_called_once_with()
+
+
 def test_FileManager_on_start():
     """
     When a thread signals it has started, list the files.
@@ -71,6 +90,7 @@ def test_FileManager_ls():
     mock_ls = mock.MagicMock(return_value=['foo.py', 'bar.py', ])
     with mock.patch('mu.modes.microbit.microfs.ls', mock_ls):
         fm.ls()
+    mock_ls.assert_called_once_with(fm.session)
     fm.on_list_files.emit.assert_called_once_with(('foo.py', 'bar.py'))
 
 
@@ -96,10 +116,29 @@ def test_fileManager_get():
     mock_get = mock.MagicMock()
     with mock.patch('mu.modes.microbit.microfs.get', mock_get):
         fm.get('foo.py', 'bar.py')
-    mock_get.assert_called_once_with('foo.py', 'bar.py')
+    assert mock_get.call_count == 1
+    assert mock_get.call_args[0][:3] == ('foo.py', 'bar.py', fm.session)
     fm.on_get_file.emit.assert_called_once_with('foo.py')
 
 
+def test_FileManager_get_progress():
+    """
+    The on_get_progress signal is emitted with the name of the file as
+    microfs.get reports the bytes received.
+    """
+    fm = FileManager()
+    fm.on_get_progress = mock.MagicMock()
+
+    def mock_get(filename, target, serial, progress):
+        progress(0, 1000)
+        progress(512, 1000)
+
+    with mock.patch('mu.modes.microbit.microfs.get', mock_get):
+        fm.get('foo.py', 'bar.py')
+    assert fm.on_get_progress.emit.call_args_list == [
+        mock.call('foo.py', 0, 1000), mock.call('foo.py', 512, 1000)]
+
+
 def test_FileManager_get_fail():
     """
     The on_get_fail signal is emitted when a problem is encountered.
@@ -112,6 +151,88 @@ def test_FileManager_get_fail():
     fm.on_get_fail.emit.assert_called_once_with('foo.py')
 
 
+def test_FileManager_get_files():
+    """
+    Each of the files is got in turn, then the files on the micro:bit are
+    listed just once.
+    """
+    fm = FileManager()
+    fm.get = mock.MagicMock()
+    fm.ls = mock.MagicMock()
+    fm.get_files([('foo.py', 'local/foo.py'), ('bar.py', 'local/bar.py')])
+    assert fm.get.call_args_list == [mock.call('foo.py', 'local/foo.py'),
+                                     mock.call('bar.py', 'local/bar.py')]
+    fm.ls.assert_called_once_with()
+
+
+def test_FileManager_put_files():
+    """
+    Each of the files is put in turn, in the same session (even if one
+    fails), then the files on the micro:bit are listed just once.
+    """
+    fm = FileManager()
+    fm.on_put_file = mock.MagicMock()
+    fm.on_put_fail = mock.MagicMock()
+    fm.on_list_files = mock.MagicMock()
+    mock_put = mock.MagicMock(side_effect=[True, IOError('boom'), True])
+    mock_ls = mock.MagicMock(return_value=['a.py', 'c.py'])
+    with mock.patch('mu.modes.microbit.microfs.put', mock_put), \
+            mock.patch('mu.modes.microbit.microfs.ls', mock_ls):
+        fm.put_files(['path/a.py', 'path/b.py', 'path/c.py'])
+    assert [c[1]['serial'] for c in mock_put.call_args_list] == \
+        [fm.session] * 3
+    assert fm.on_put_file.emit.call_args_list == [mock.call('a.py'),
+                                                  mock.call('c.py')]
+    fm.on_put_fail.emit.assert_called_once_with('path/b.py')
+    mock_ls.assert_called_once_with(fm.session)
+    fm.on_list_files.emit.assert_called_once_with(('a.py', 'c.py'))
+
+
+def test_FileManager_delete_files():
+    """
+    Each of the files is deleted in turn, then the files on the micro:bit are
+    listed just once.
+    """
+    fm = FileManager()
+    fm.delete = mock.MagicMock()
+    fm.ls = mock.MagicMock()
+    fm.delete_files(['foo.py', 'bar.py'])
+    assert fm.delete.call_args_list == [mock.call('foo.py'),
+                                        mock.call('bar.py')]
+    fm.ls.assert_called_once_with()
+
+
+def test_FileManager_sync():
+    """
+    The files copied and removed are emitted when microfs.sync completes
+    successfully, then the files on the micro:bit are listed.
+    """
+    fm = FileManager()
+    fm.on_sync = mock.MagicMock()
+    fm.ls = mock.MagicMock()
+    mock_sync = mock.MagicMock(return_value=(['a.py'], ['old.py']))
+    with mock.patch('mu.modes.microbit.microfs.sync', mock_sync):
+        fm.sync('home', True)
+    mock_sync.assert_called_once_with('home', fm.session, True)
+    fm.on_sync.emit.assert_called_once_with(['a.py'], ['old.py'])
+    fm.ls.assert_called_once_with()
+
+
+def test_FileManager_sync_fail():
+    """
+    The on_sync_fail signal is emitted when a problem is encountered, and the
+    files on the micro:bit are still listed.
+    """
+    fm = FileManager()
+    fm.on_sync_fail = mock.MagicMock()
+    fm.ls = mock.MagicMock()
+    with mock.patch('mu.modes.microbit.microfs.sync',
+                    side_effect=Exception('boom')):
+        fm.sync('home', False)
+    fm.on_sync_fail.emit.assert_called_once_with('home')
+    fm.ls.assert_called_once_with()
+
+
 def test_FileManager_put():
     """
     The on_put_file signal is emitted with the name of the effected file when
@@ -123,7 +244,7 @@ def test_FileManager_put():
     path = os.path.join('directory', 'foo.py')
     with mock.patch('mu.modes.microbit.microfs.put', mock_put):
         fm.put(path)
-    mock_put.assert_called_once_with(path, target=None)
+    mock_put.assert_called_once_with(path, target=None, serial=fm.session)
     fm.on_put_file.emit.assert_called_once_with('foo.py')
 
 
@@ -149,7 +270,7 @@ def test_FileManager_delete():
     mock_rm = mock.MagicMock()
     with mock.patch('mu.modes.microbit.microfs.rm', mock_rm):
         fm.delete('foo.py')
-    mock_rm.assert_called_once_with('foo.py')
+    mock_rm.assert_called_once_with('foo.py', fm.session)
     fm.on_delete_file.emit.assert_called_once_with('foo.py')
 
 
@@ -173,6 +294,7 @@ def test_microbit_mode():
     view = mock.MagicMock()
     mm = MicrobitMode(editor, view)
     assert mm.name == 'BBC micro:bit'
+    assert mm.short_name == 'microbit'
     assert mm.description is not None
     assert mm.icon == 'microbit'
     assert mm.editor == editor
@@ -228,6 +350,7 @@ def test_flash_with_attached_device_as_windows():
     mock_flasher_class = mock.MagicMock(return_value=mock_flasher)
     with mock.patch('mu.modes.microbit.uflash.find_microbit',
                     return_value='bar'),\
+            mock.patch('mu.modes.microbit.os.name', 'nt'),\
             mock.patch('mu.modes.microbit.os.path.exists', return_value=True),\
             mock.patch('mu.modes.microbit.DeviceFlasher',
                        mock_flasher_class), \
@@ -262,8 +385,9 @@ def test_flash_with_attached_device_as_not_windows():
     mock_timer_class = mock.MagicMock(return_value=mock_timer)
     mock_flasher = mock.MagicMock()
     mock_flasher_class = mock.MagicMock(return_value=mock_flasher)
-    with mock.patch('mu.modes.microbit.uflash.find_microbit',
-                    return_value='bar'),\
+    with mock.patch('mu.modes.microbit.MOUNTS.find',
+                    return_value='bar') as mock_find,\
+            mock.patch('mu.modes.microbit.os.name', 'posix'),\
             mock.patch('mu.modes.microbit.os.path.exists', return_value=True),\
             mock.patch('mu.modes.microbit.DeviceFlasher',
                        mock_flasher_class), \
@@ -282,6 +406,7 @@ def test_flash_with_attached_device_as_not_windows():
         assert editor.show_status_message.call_count == 1
         mm.set_buttons.assert_called_once_with(flash=False)
         mock_flasher_class.assert_called_once_with(['bar', ], b'foo', None)
+        mock_find.assert_called_once_with('MICROBIT')
         assert mock_flasher.finished.connect.call_count == 0
         mock_timer.timeout.connect.assert_called_once_with(mm.flash_finished)
         mock_timer.setSingleShot.assert_called_once_with(True)
@@ -324,7 +449,7 @@ def test_flash_user_specified_device_path():
     """
     mock_flasher = mock.MagicMock()
     mock_flasher_class = mock.MagicMock(return_value=mock_flasher)
-    with mock.patch('mu.contrib.uflash.find_microbit', return_value=None),\
+    with mock.patch('mu.modes.microbit.MOUNTS.find', return_value=None),\
             mock.patch('mu.logic.os.path.exists', return_value=True),\
             mock.patch('mu.modes.microbit.DeviceFlasher',
                        mock_flasher_class), \
@@ -353,7 +478,7 @@ def test_flash_existing_user_specified_device_path():
     """
     mock_flasher = mock.MagicMock()
     mock_flasher_class = mock.MagicMock(return_value=mock_flasher)
-    with mock.patch('mu.contrib.uflash.find_microbit', return_value=None),\
+    with mock.patch('mu.modes.microbit.MOUNTS.find', return_value=None),\
             mock.patch('mu.logic.os.path.exists', return_value=True),\
             mock.patch('mu.modes.microbit.DeviceFlasher',
                        mock_flasher_class), \
@@ -382,7 +507,7 @@ def test_flash_path_specified_does_not_exist():
     """
     with mock.patch('mu.contrib.uflash.hexlify', return_value=''), \
             mock.patch('mu.contrib.uflash.embed_hex', return_value='foo'), \
-            mock.patch('mu.contrib.uflash.find_microbit', return_value=None),\
+            mock.patch('mu.modes.microbit.MOUNTS.find', return_value=None),\
             mock.patch('mu.logic.os.path.exists', return_value=False),\
             mock.patch('mu.logic.os.makedirs', return_value=None), \
             mock.patch('mu.contrib.uflash.save_hex', return_value=None) as s:
@@ -412,7 +537,7 @@ def test_flash_without_device():
     """
     with mock.patch('mu.contrib.uflash.hexlify', return_value=''), \
             mock.patch('mu.contrib.uflash.embed_hex', return_value='foo'), \
-            mock.patch('mu.contrib.uflash.find_microbit', return_value=None), \
+            mock.patch('mu.modes.microbit.MOUNTS.find', return_value=None), \
             mock.patch('mu.contrib.uflash.save_hex', return_value=None) as s:
         view = mock.MagicMock()
         view.get_microbit_path = mock.MagicMock(return_value=None)
@@ -556,10 +681,9 @@ def test_add_fs():
     view = mock.MagicMock()
     editor = mock.MagicMock()
     mm = MicrobitMode(editor, view)
+    mm.find_device = mock.MagicMock(return_value='/dev/ttyACM0')
     with mock.patch('mu.modes.microbit.FileManager') as mock_fm,\
-            mock.patch('mu.modes.microbit.QThread'),\
-            mock.patch('mu.modes.microbit.microfs.find_microbit',
-                       return_value=True):
+            mock.patch('mu.modes.microbit.QThread'):
         mm.add_fs()
         workspace = mm.workspace_dir()
         view.add_filesystem.assert_called_once_with(workspace, mock_fm())
@@ -574,9 +698,9 @@ def test_add_fs_no_device():
     view.show_message = mock.MagicMock()
     editor = mock.MagicMock()
     mm = MicrobitMode(editor, view)
-    with mock.patch('mu.modes.microbit.microfs.find_microbit',
-                    return_value=False):
-        mm.add_fs()
+    mm.find_device = mock.MagicMock(return_value=None)
+    mm.add_fs()
+    mm.find_device.assert_called_once_with(with_logging=False)
     assert view.show_message.call_count == 1
 
 
@@ -601,9 +725,17 @@ def test_remove_fs():
     editor = mock.MagicMock()
     mm = MicrobitMode(editor, view)
     mm.fs = True
+    file_manager = mock.MagicMock()
+    file_manager_thread = mock.MagicMock()
+    mm.file_manager = file_manager
+    mm.file_manager_thread = file_manager_thread
     mm.remove_fs()
     assert view.remove_filesystem.call_count == 1
+    file_manager_thread.quit.assert_called_once_with()
+    file_manager_thread.wait.assert_called_once_with()
+    file_manager.close.assert_called_once_with()
     assert mm.fs is None
+    assert mm.file_manager is None
 
 
 def test_toggle_files_on():
@@ -802,20 +934,6 @@ def test_api():
     assert api == SHARED_APIS + MICROBIT_APIS
 
 
-def test_on_data_flood():
-    """
-    Ensure the "Files" button is re-enabled before calling the base method.
-    """
-    view = mock.MagicMock()
-    editor = mock.MagicMock()
-    mm = MicrobitMode(editor, view)
-    mm.set_buttons = mock.MagicMock()
-    with mock.patch('builtins.super') as mock_super:
-        mm.on_data_flood()
-        mm.set_buttons.assert_called_once_with(files=True)
-        mock_super().on_data_flood.assert_called_once_with()
-
-
 def test_open_hex():
     """
     Tries to open hex files with uFlash.
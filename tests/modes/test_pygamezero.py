@@ -16,6 +16,7 @@ def test_pgzero_mode():
     view = mock.MagicMock()
     pm = PyGameZeroMode(editor, view)
     assert pm.name == 'Pygame Zero'
+    assert pm.short_name == 'pygamezero'
     assert pm.description is not None
     assert pm.icon == 'pygamezero'
     assert pm.is_debugger is False
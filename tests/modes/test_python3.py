@@ -27,7 +27,7 @@ def test_kernel_runner_start_kernel():
     mock_kernel_manager_class = mock.MagicMock()
     mock_kernel_manager_class.return_value = mock_kernel_manager
     with mock.patch('mu.modes.python3.os', mock_os), \
-            mock.patch('mu.modes.python3.QtKernelManager',
+            mock.patch('qtconsole.manager.QtKernelManager',
                        mock_kernel_manager_class), \
             mock.patch('sys.platform', 'darwin'):
         kr.start_kernel()
@@ -73,6 +73,7 @@ def test_python_mode():
     view = mock.MagicMock()
     pm = PythonMode(editor, view)
     assert pm.name == 'Python 3'
+    assert pm.short_name == 'python'
     assert pm.description is not None
     assert pm.icon == 'python'
     assert pm.is_debugger is False
@@ -371,8 +372,10 @@ def test_python_add_plotter():
     view = mock.MagicMock()
     pm = PythonMode(editor, view)
     pm.set_buttons = mock.MagicMock()
+    pm.start_capture = mock.MagicMock()
     pm.add_plotter()
-    view.add_python3_plotter.assert_called_once_with(pm)
+    view.add_python3_plotter.assert_called_once_with()
+    pm.start_capture.assert_called_once_with()
     assert pm.plotter
     pm.set_buttons.assert_called_once_with(debug=False)
     # Check button states are updated depending on other aspects of the mode
@@ -410,34 +413,6 @@ def test_python_remove_plotter():
         mock_super().remove_plotter.assert_called_once_with()
 
 
-def test_python_on_data_flood():
-    """
-    Ensure that Python 3 mode cleans up correctly after a data flood of the
-    plotter is detected: reset the buttons, stop either the REPL or runner and
-    then call the base method.
-    """
-    editor = mock.MagicMock()
-    view = mock.MagicMock()
-    pm = PythonMode(editor, view)
-    pm.set_buttons = mock.MagicMock()
-    pm.run_toggle = mock.MagicMock()
-    pm.remove_repl = mock.MagicMock()
-    pm.runner = True
-    with mock.patch('builtins.super') as mock_super:
-        pm.on_data_flood()
-        pm.set_buttons.assert_called_once_with(run=True, repl=True, debug=True)
-        pm.run_toggle.assert_called_once_with(None)
-        mock_super().on_data_flood.assert_called_once_with()
-    pm.set_buttons.reset_mock()
-    pm.runner = False
-    pm.kernel_runner = True
-    with mock.patch('builtins.super') as mock_super:
-        pm.on_data_flood()
-        pm.set_buttons.assert_called_once_with(run=True, repl=True, debug=True)
-        pm.remove_repl.assert_called_once_with()
-        mock_super().on_data_flood.assert_called_once_with()
-
-
 def test_python_on_kernel_start():
     """
     Ensure the handler for when the kernel has started updates the UI such that
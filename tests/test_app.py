@@ -3,9 +3,12 @@
 Tests for the app script.
 """
 import sys
+import json
 import os.path
 from unittest import mock
-from mu.app import excepthook, run, setup_logging, debug, setup_modes
+from mu.app import (excepthook, run, setup_logging, debug, setup_modes,
+                    ModeRegistry, StartupProfiler, get_profiler,
+                    STARTUP_PROFILE_FILE)
 from mu.logic import LOG_FILE, LOG_DIR, DEBUGGER_PORT, ENCODING
 
 
@@ -30,7 +33,8 @@ def test_setup_modes_with_pgzero():
     """
     If pgzero is installed, allow Pygame Zero mode.
     """
-    with mock.patch('mu.app.pkgutil.iter_modules', return_value=['pgzero', ]):
+    with mock.patch('mu.app.importlib.util.find_spec',
+                    return_value=mock.MagicMock()):
         mock_editor = mock.MagicMock()
         mock_view = mock.MagicMock()
         modes = setup_modes(mock_editor, mock_view)
@@ -42,13 +46,161 @@ def test_setup_modes_without_pgzero():
     If pgzero is NOT installed, do not add Pygame Zero mode to the list of
     available modes.
     """
-    with mock.patch('mu.app.pkgutil.iter_modules', return_value=['foo', ]):
+    with mock.patch('mu.app.importlib.util.find_spec', return_value=None):
         mock_editor = mock.MagicMock()
         mock_view = mock.MagicMock()
         modes = setup_modes(mock_editor, mock_view)
         assert 'pygamezero' not in modes
 
 
+def test_setup_modes_lazy():
+    """
+    The modes are set up without importing or instantiating any of them.
+    """
+    with mock.patch('mu.app.load_mode') as mock_load:
+        modes = setup_modes(mock.MagicMock(), mock.MagicMock())
+    assert isinstance(modes, ModeRegistry)
+    assert list(modes)[:4] == ['python', 'adafruit', 'microbit', 'debugger']
+    assert mock_load.call_count == 0
+
+
+def test_ModeRegistry():
+    """
+    A mode is only loaded and instantiated (once) when it's first looked up.
+    """
+    mock_editor = mock.MagicMock()
+    mock_view = mock.MagicMock()
+    mock_mode_class = mock.MagicMock()
+    modes = ModeRegistry(mock_editor, mock_view, ['python', 'microbit'])
+    with mock.patch('mu.app.load_mode',
+                    return_value=mock_mode_class) as mock_load:
+        assert len(modes) == 2
+        assert list(modes.keys()) == ['python', 'microbit']
+        assert 'python' in modes
+        assert 'pygamezero' not in modes
+        assert mock_load.call_count == 0
+        mode = modes['microbit']
+        assert modes['microbit'] is mode
+        assert modes.get('pygamezero') is None
+    mock_load.assert_called_once_with('microbit')
+    mock_mode_class.assert_called_once_with(mock_editor, mock_view)
+    assert mode == mock_mode_class()
+
+
+def test_ModeRegistry_boards():
+    """
+    The boards of the modes which can find a device are given without
+    instantiating the modes, and each mode's module is only imported once.
+    """
+    mock_mb_class = mock.MagicMock()
+    mock_mb_class.valid_boards = [(0x0D28, 0x0204)]
+    mock_python_class = mock.MagicMock(spec=[])
+    classes = {'python': mock_python_class, 'microbit': mock_mb_class}
+    modes = ModeRegistry(mock.MagicMock(), mock.MagicMock(),
+                         ['python', 'microbit'])
+    with mock.patch('mu.app.load_mode',
+                    side_effect=classes.get) as mock_load:
+        assert modes.boards() == {'microbit': [(0x0D28, 0x0204)]}
+        assert modes.boards() == {'microbit': [(0x0D28, 0x0204)]}
+    assert mock_load.call_count == 2
+    assert mock_mb_class.call_count == 0
+    assert modes.instances == {}
+
+
+def test_get_profiler():
+    """
+    The --profile-startup flag enables the profiler (optionally with the
+    file to which timings are written) and is removed from the arguments.
+    """
+    profiler, args = get_profiler(['foo.py', ])
+    assert profiler.enabled is False
+    assert args == ['foo.py', ]
+    profiler, args = get_profiler(['--profile-startup', 'foo.py'])
+    assert profiler.enabled is True
+    assert profiler.filename == STARTUP_PROFILE_FILE
+    assert args == ['foo.py', ]
+    profiler, args = get_profiler(['--profile-startup=bar.json', ])
+    assert profiler.enabled is True
+    assert profiler.filename == 'bar.json'
+    assert args == []
+
+
+def test_StartupProfiler_disabled():
+    """
+    If disabled, nothing is recorded or written.
+    """
+    profiler = StartupProfiler()
+    profiler.mark('foo')
+    with mock.patch('builtins.open') as mock_open:
+        profiler.finish()
+    assert profiler.phases == []
+    assert mock_open.call_count == 0
+
+
+def test_StartupProfiler_finish(tmpdir):
+    """
+    Each phase takes the time since the previous one and the timings are
+    logged and written as JSON.
+    """
+    filename = str(tmpdir.join('profile.json'))
+    profiler = StartupProfiler(True, filename, started=1.0)
+    with mock.patch('mu.app.time.perf_counter', side_effect=[1.5, 3.0]):
+        profiler.mark('foo')
+        profiler.mark('bar')
+    with mock.patch('mu.app.logging') as mock_log:
+        profiler.finish()
+    assert profiler.phases == [('foo', 0.5), ('bar', 1.5)]
+    mock_log.info.assert_any_call('Startup phase foo: 0.500s')
+    mock_log.info.assert_any_call('Startup took 2.000s')
+    with open(filename) as profile_file:
+        profile = json.load(profile_file)
+    assert profile['total'] == 2.0
+    assert profile['phases'] == [{'name': 'foo', 'duration': 0.5},
+                                 {'name': 'bar', 'duration': 1.5}]
+
+
+def test_StartupProfiler_finish_fails():
+    """
+    If the timings can't be written, the problem is logged.
+    """
+    profiler = StartupProfiler(True, 'foo.json')
+    profiler.mark('foo')
+    with mock.patch('builtins.open', side_effect=OSError('Boom')), \
+            mock.patch('mu.app.logging') as mock_log:
+        profiler.finish()
+    assert mock_log.exception.call_count == 1
+
+
+def test_run_profile_startup():
+    """
+    With --profile-startup the phases of startup are timed and the profile
+    is finished once the event loop is running.
+    """
+    mock_profiler = mock.MagicMock()
+    mock_profiler.enabled = True
+    with mock.patch('mu.app.setup_logging'), \
+            mock.patch('mu.app.QApplication'), \
+            mock.patch('mu.app.QSplashScreen'), \
+            mock.patch('mu.app.Editor') as ed, \
+            mock.patch('mu.app.load_pixmap'), \
+            mock.patch('mu.app.Window'), \
+            mock.patch('mu.app.QTimer') as timer, \
+            mock.patch('mu.app.get_profiler',
+                       return_value=(mock_profiler, ['foo.py'])), \
+            mock.patch('sys.argv', ['mu', '--profile-startup', 'foo.py']), \
+            mock.patch('sys.exit'):
+        run()
+    ed().restore_session.assert_called_once_with(['foo.py'])
+    phases = [c[0][0] for c in mock_profiler.mark.call_args_list]
+    assert phases[0] == 'imports'
+    assert 'restore session' in phases
+    assert mock_profiler.finish.call_count == 0
+    interactive = timer.singleShot.call_args[0][1]
+    interactive()
+    mock_profiler.mark.assert_called_with('event loop')
+    mock_profiler.finish.assert_called_once_with()
+
+
 def test_run():
     """
     Ensure the run function sets things up in the expected way.
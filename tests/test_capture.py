@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the capture of the plotter's data to file.
+"""
+import os
+import csv
+import struct
+import pytest
+from unittest import mock
+from mu.capture import (CaptureWriter, BinaryCaptureWriter, load_capture,
+                        CAPTURE_HEADER)
+
+
+def read_csv(filename):
+    """
+    Return the rows of the referenced CSV file.
+    """
+    with open(filename, newline='') as csvfile:
+        return list(csv.reader(csvfile))
+
+
+def test_CaptureWriter_write(tmpdir):
+    """
+    Rows written are saved as CSV in a file in the directory (which is
+    created), named with a timestamp.
+    """
+    directory = os.path.join(str(tmpdir), 'data_capture')
+    cw = CaptureWriter(directory)
+    cw.start()
+    cw.write([(1, 2.5), (3, 4)])
+    cw.write([(5, 6)])
+    cw.close()
+    assert not cw.is_alive()
+    assert len(cw.filenames) == 1
+    assert os.path.dirname(cw.filenames[0]) == directory
+    assert cw.filenames[0].endswith('.csv')
+    assert read_csv(cw.filenames[0]) == [['1', '2.5'], ['3', '4'],
+                                         ['5', '6']]
+    assert cw.rows == 3
+    assert cw.file is None
+
+
+def test_CaptureWriter_no_data(tmpdir):
+    """
+    If nothing is captured, no file is created.
+    """
+    directory = os.path.join(str(tmpdir), 'data_capture')
+    cw = CaptureWriter(directory)
+    cw.start()
+    cw.write([])
+    cw.close()
+    assert cw.filenames == []
+    assert not os.path.exists(directory)
+
+
+def test_CaptureWriter_flush(tmpdir):
+    """
+    Captured rows are flushed to the file while capturing, so they survive
+    Mu crashing.
+    """
+    cw = CaptureWriter(str(tmpdir), flush_interval=0)
+    cw.start()
+    cw.write([(1, 2)])
+    cw.write([(3, 4)])
+    # Wait for the rows to be written and flushed.
+    for i in range(500):
+        if cw.filenames and read_csv(cw.filenames[0]) == [['1', '2'],
+                                                          ['3', '4']]:
+            break
+        cw.join(0.01)
+    assert read_csv(cw.filenames[0]) == [['1', '2'], ['3', '4']]
+    cw.close()
+
+
+def test_CaptureWriter_roll_size(tmpdir):
+    """
+    Once a file reaches the maximum size, a new one is started (with a
+    different name, even if started within the same second).
+    """
+    cw = CaptureWriter(str(tmpdir), max_size=10)
+    cw.start()
+    cw.write([(1, 2, 3, 4, 5, 6)])
+    cw.write([(7, 8)])
+    cw.write([(9, )])
+    cw.close()
+    assert len(cw.filenames) == 2
+    assert len(set(cw.filenames)) == 2
+    assert read_csv(cw.filenames[0]) == [['1', '2', '3', '4', '5', '6']]
+    assert read_csv(cw.filenames[1]) == [['7', '8'], ['9']]
+
+
+def test_CaptureWriter_roll_age(tmpdir):
+    """
+    Once a file reaches the maximum age, a new one is started.
+    """
+    cw = CaptureWriter(str(tmpdir), max_age=0)
+    cw.start()
+    cw.write([(1, )])
+    cw.write([(2, )])
+    cw.close()
+    assert len(cw.filenames) == 2
+    assert read_csv(cw.filenames[1]) == [['2']]
+
+
+def test_CaptureWriter_error(tmpdir):
+    """
+    If writing fails, the error is logged, the thread finishes and further
+    rows are ignored.
+    """
+    cw = CaptureWriter(str(tmpdir))
+    cw.open_file = mock.MagicMock(side_effect=OSError('Disk full'))
+    with mock.patch('mu.capture.logger') as mock_logger:
+        cw.start()
+        cw.write([(1, )])
+        cw.join()
+    assert mock_logger.error.call_count == 1
+    cw.write([(2, )])
+    assert cw.queue.empty()
+    cw.close()
+
+
+def test_BinaryCaptureWriter_write(tmpdir):
+    """
+    Rows are written with the time they arrived and can be loaded back as
+    arrays of timestamps and values.
+    """
+    cw = BinaryCaptureWriter(str(tmpdir))
+    cw.start()
+    with mock.patch('mu.capture.time.time', return_value=100.5):
+        cw.write([(1, 2.5), (3, 4)])
+    with mock.patch('mu.capture.time.time', return_value=101.5):
+        cw.write([(-5, 6)])
+    cw.close()
+    assert len(cw.filenames) == 1
+    assert cw.filenames[0].endswith('.mucap')
+    timestamps, values = load_capture(cw.filenames[0])
+    assert list(timestamps) == [100.5, 100.5, 101.5]
+    assert values.tolist() == [[1, 2.5], [3, 4], [-5, 6]]
+
+
+def test_BinaryCaptureWriter_roll_columns(tmpdir):
+    """
+    A new file is started when the number of values changes.
+    """
+    cw = BinaryCaptureWriter(str(tmpdir))
+    cw.start()
+    cw.write([(1, 2)])
+    cw.write([(3, 4)])
+    cw.write([(5, )])
+    cw.close()
+    assert len(cw.filenames) == 2
+    assert load_capture(cw.filenames[0])[1].tolist() == [[1, 2], [3, 4]]
+    assert load_capture(cw.filenames[1])[1].tolist() == [[5]]
+
+
+def test_load_capture_partial_row(tmpdir):
+    """
+    A partly written last row (e.g. if Mu crashed) is ignored, as is a file
+    with no complete rows.
+    """
+    filename = os.path.join(str(tmpdir), 'capture.mucap')
+    header = CAPTURE_HEADER.pack(b'MUCAP', 1, 1)
+    with open(filename, 'wb') as f:
+        f.write(header + struct.pack('<3d', 1, 2, 3))
+    timestamps, values = load_capture(filename)
+    assert list(timestamps) == [1]
+    assert values.tolist() == [[2]]
+    with open(filename, 'wb') as f:
+        f.write(header + b'\x00')
+    timestamps, values = load_capture(filename)
+    assert len(timestamps) == 0
+    assert values.shape == (0, 1)
+
+
+def test_load_capture_not_capture(tmpdir):
+    """
+    Files which aren't binary captures (or are of another version of the
+    format) cause a ValueError.
+    """
+    filename = os.path.join(str(tmpdir), 'capture.mucap')
+    for data in (b'', b'1,2\n3,4\n' * 4,
+                 CAPTURE_HEADER.pack(b'MUCAP', 2, 1)):
+        with open(filename, 'wb') as f:
+            f.write(data)
+        with pytest.raises(ValueError):
+            load_capture(filename)
@@ -12,13 +12,17 @@ import re
 import shutil
 import subprocess
 import tempfile
+import threading
+import time
 from unittest import mock
 import uuid
 
 import pytest
+import serial
 import mu.logic
+import mu.app
 from PyQt5.QtWidgets import QMessageBox
-from PyQt5.QtCore import pyqtSignal, QObject
+from PyQt5.QtCore import pyqtSignal, QObject, QCoreApplication
 
 from mu import __version__
 
@@ -173,7 +177,7 @@ def mocked_editor(mode="python", text=None, path=None, newline=None):
     mock_mode = mock.MagicMock()
     mock_mode.save_timeout = 5
     mock_mode.workspace_dir.return_value = '/fake/path'
-    mock_mode.api.return_value = ["API Specification"]
+    mock_mode.api_source.return_value = ["API Specification"]
     ed.modes = {
         mode: mock_mode,
     }
@@ -507,6 +511,58 @@ def test_check_pycodestyle():
     assert result[6][0]['code'] == 'E303'
 
 
+def test_check_pycodestyle_in_memory():
+    """
+    The code is checked without writing temporary files or hijacking stdout,
+    and problems on the same line are ordered by column.
+    """
+    code = "x=1; y = 2\r\nz = 3   \n"
+    with mock.patch('tempfile.mkstemp') as mock_mkstemp, \
+            mock.patch('sys.stdout') as mock_stdout:
+        result = mu.logic.check_pycodestyle(code)
+    assert mock_mkstemp.call_count == 0
+    assert mock_stdout.write.call_count == 0
+    assert [m['code'] for m in result[0]] == ['E225', 'E702']
+    assert [m['column'] for m in result[0]] == [1, 3]
+    assert result[0][0]['message'] == 'Missing whitespace around operator'
+    assert 1 not in result
+
+
+def test_check_pycodestyle_threads():
+    """
+    Checking code from several threads at once gives the same results as
+    checking it from one.
+    """
+    code = "import foo\n\n\n\n\n\ndef bar():\n    pass\n"
+    expected = mu.logic.check_pycodestyle(code)
+    results = []
+
+    def worker():
+        for i in range(10):
+            results.append(mu.logic.check_pycodestyle(code))
+
+    threads = [threading.Thread(target=worker) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(results) == 40
+    assert all(r == expected for r in results)
+
+
+def test_MuStyleReport_error():
+    """
+    Reported problems are recorded unless they are to be ignored.
+    """
+    style = mu.logic.StyleGuide(parse_argv=False, config_file=False)
+    style.options.ignore = ('W291', )
+    report = mu.logic.MuStyleReport(style.options)
+    report.init_file('stdin', [], None, None)
+    assert report.error(3, 4, 'E225 missing whitespace', None) == 'E225'
+    assert report.error(5, 0, 'W291 trailing whitespace', None) is None
+    assert report.log == [(2, 4, 'E225', 'missing whitespace')]
+
+
 def test_MuFlakeCodeReporter_init():
     """
     Check state is set up as expected.
@@ -572,6 +628,1053 @@ def test_MuFlakeCodeReporter_flake_un_matched():
     assert r.log[0]['message'] == 'something went wrong'
 
 
+def test_CodeChecker_request():
+    """
+    Each request for a tab is numbered and handed on to be checked.
+    """
+    checker = mu.logic.CodeChecker()
+    checker.run_check = mock.MagicMock()
+    checker._requested = mock.MagicMock()
+    assert checker.request(1, 'foo.py', 'code') == 1
+    assert checker.request(1, 'foo.py', 'code', ['foo', ]) == 2
+    assert checker.request(2, 'bar.py', 'code') == 1
+    checker._requested.emit.assert_has_calls([
+        mock.call(1, 1, 'foo.py', 'code', None, False),
+        mock.call(1, 2, 'foo.py', 'code', ['foo', ], False),
+        mock.call(2, 1, 'bar.py', 'code', None, False),
+    ])
+    assert checker.is_current(1, 2)
+    assert not checker.is_current(1, 1)
+    assert not checker.is_current(3, 1)
+
+
+def test_CodeChecker_run_check():
+    """
+    A current request is checked and the results emitted.
+    """
+    checker = mu.logic.CodeChecker()
+    checker.on_checked = mock.MagicMock()
+    flake = {1: [{'line_no': 1, 'message': 'flake'}]}
+    pep8 = {2: [{'line_no': 2, 'message': 'pep8'}]}
+    with mock.patch('mu.logic.check_flake', return_value=flake) as mock_cf, \
+            mock.patch('mu.logic.check_pycodestyle',
+                       return_value=pep8) as mock_cp:
+        checker.request(1, 'foo.py', 'code', ['foo', ])
+    mock_cf.assert_called_once_with('foo.py', 'code', ['foo', ])
+    mock_cp.assert_called_once_with('code')
+    checker.on_checked.emit.assert_called_once_with(1, 1, flake, pep8)
+
+
+def test_CodeChecker_run_check_stale():
+    """
+    A request superseded by a newer one before it is run is skipped.
+    """
+    checker = mu.logic.CodeChecker()
+    checker.on_checked = mock.MagicMock()
+    checker.latest[1] = 2
+    with mock.patch('mu.logic.check_flake') as mock_cf:
+        checker.run_check(1, 1, 'foo.py', 'code', None, False)
+    assert mock_cf.call_count == 0
+    assert checker.on_checked.emit.call_count == 0
+
+
+def test_CodeChecker_run_check_superseded():
+    """
+    Results from a request superseded while it was being checked are not
+    emitted.
+    """
+    checker = mu.logic.CodeChecker()
+    checker.on_checked = mock.MagicMock()
+    checker.latest[1] = 1
+
+    def supersede(code):
+        checker.latest[1] = 2
+        return {}
+
+    with mock.patch('mu.logic.check_flake', return_value={}), \
+            mock.patch('mu.logic.check_pycodestyle', side_effect=supersede):
+        checker.run_check(1, 1, 'foo.py', 'code', None, False)
+    assert checker.on_checked.emit.call_count == 0
+
+
+def test_CodeChecker_run_check_cached():
+    """
+    Code that has already been checked isn't checked again.
+    """
+    cache = mu.logic.CheckCache()
+    flake = {1: [{'line_no': 1, 'message': 'flake'}]}
+    pep8 = {}
+    cache.put(cache.key('code', ['foo', ]), flake, pep8)
+    checker = mu.logic.CodeChecker(cache)
+    checker.on_checked = mock.MagicMock()
+    with mock.patch('mu.logic.check_flake') as mock_cf, \
+            mock.patch('mu.logic.check_pycodestyle') as mock_cp:
+        checker.request(1, 'foo.py', 'code', ['foo', ])
+    assert mock_cf.call_count == 0
+    assert mock_cp.call_count == 0
+    checker.on_checked.emit.assert_called_once_with(1, 1, flake, pep8)
+    assert cache.owners == {1: cache.key('code', ['foo', ])}
+
+
+def test_CodeChecker_run_check_caches_results():
+    """
+    The results of checking code are remembered by the cache.
+    """
+    cache = mu.logic.CheckCache()
+    checker = mu.logic.CodeChecker(cache)
+    flake = {1: [{'line_no': 1, 'message': 'flake'}]}
+    with mock.patch('mu.logic.check_flake', return_value=flake), \
+            mock.patch('mu.logic.check_pycodestyle', return_value={}):
+        checker.request(1, 'foo.py', 'code')
+    assert cache.get(cache.key('code')) == (flake, {})
+
+
+def fake_flake(filename, code, builtins=None):
+    """
+    Stands in for check_flake by reporting each line containing "oops" so
+    line numbers can be checked.
+    """
+    feedback = {}
+    for line_no, line in enumerate(code.split('\n')):
+        if 'oops' in line:
+            feedback[line_no] = [{'line_no': line_no, 'column': 0,
+                                  'message': 'oops on line {}'.format(
+                                      line_no + 1)}]
+    return feedback
+
+
+def checked(code):
+    """
+    Return the outline and feedback from a full check of the code, as kept
+    by the CodeChecker for scoped checks.
+    """
+    return (mu.logic.outline_code(code), fake_flake('foo.py', code, ['foo']),
+            mu.logic.check_pycodestyle(code))
+
+
+def check_scoped(old_code, new_code):
+    """
+    Check new_code as a change to old_code and return the results or None if
+    a full check is needed.
+    """
+    previous = checked(old_code)
+    outline = mu.logic.outline_code(new_code)
+    with mock.patch('mu.logic.check_flake', side_effect=fake_flake) as flake:
+        results = mu.logic.check_changes('foo.py', outline, ['foo'],
+                                         previous)
+    return results, flake
+
+
+SCOPED_CODE = """\"\"\"A module.\"\"\"
+import os
+
+
+@decorator
+def one():
+    return os.getcwd()
+
+
+def two():
+    x = 1
+    return x
+
+
+class Three:
+    value = 3
+
+    def get(self):
+        return self.value
+"""
+
+
+def test_outline_code():
+    """
+    The code is split into blocks starting with each top-level statement (or
+    its decorators) and what each block binds and uses is recorded.
+    """
+    code = 'import os  # A comment\nx = 1; y = os\n\n' + \
+        '@dec(x)\ndef f(a=y):\n    import sys\n    global z\n'
+    outline = mu.logic.outline_code(code)
+    assert outline['lines'] == code.splitlines(True)
+    blocks = outline['blocks']
+    assert [(b['start'], b['end']) for b in blocks] == [(0, 1), (1, 3),
+                                                        (3, 7)]
+    assert blocks[1]['text'] == 'x = 1; y = os\n\n'
+    assert blocks[0]['binds'] == ['os', ]
+    assert blocks[0]['imports'] == ['os', ]
+    assert blocks[1]['binds'] == ['x', 'y']
+    assert len(blocks[1]['nodes']) == 2
+    assert not blocks[1]['definition']
+    assert blocks[2]['binds'] == ['f', 'z']
+    assert blocks[2]['imports'] == []
+    assert blocks[2]['definition']
+    usage = mu.logic._block_usage(blocks[2])
+    assert usage == ({'dec', 'x', 'y'}, {'a', 'sys'}, {'dec', 'x', 'y'})
+    assert mu.logic._block_usage(blocks[2]) is usage
+
+
+def test_outline_code_class():
+    """
+    The names used while a class is defined include those in its body but not
+    those in the bodies of its methods. Global statements in its methods are
+    found.
+    """
+    code = 'class A(B, metaclass=C):\n    d = e\n\n' + \
+        '    def f(self, g=h):\n        global j\n        return i\n'
+    block = mu.logic.outline_code(code)['blocks'][0]
+    assert block['binds'] == ['A', 'j']
+    loads, local, defining = mu.logic._block_usage(block)
+    assert defining == {'B', 'C', 'e', 'h'}
+    assert loads == {'B', 'C', 'e', 'h', 'i'}
+    assert local == {'d', 'f', 'g', 'self'}
+
+
+def test_outline_code_module_names():
+    """
+    All the ways a module-level name can be bound are found.
+    """
+    code = 'import a.b\nfrom c import d as e\nfor f in g:\n    pass\n' + \
+        'try:\n    import h\nexcept E as i:\n    def j():\n' + \
+        '        pass\n'
+    outline = mu.logic.outline_code(code)
+    names = [name for block in outline['blocks'] for name in block['binds']]
+    assert names == ['a', 'e', 'f', 'h', 'i', 'j']
+    imports = [name for block in outline['blocks']
+               for name in block['imports']]
+    assert imports == ['a', 'e', 'h']
+
+
+def test_outline_code_empty():
+    """
+    Code without statements is a single block.
+    """
+    outline = mu.logic.outline_code('# Nothing here\n\n')
+    assert len(outline['blocks']) == 1
+    assert outline['blocks'][0]['start'] == 0
+    assert outline['blocks'][0]['end'] == 2
+    assert not outline['blocks'][0]['definition']
+
+
+def test_outline_code_unparsable():
+    """
+    Code with syntax errors can't be outlined.
+    """
+    assert mu.logic.outline_code('def foo(:\n') is None
+    assert mu.logic.outline_code('x = 1\0\n') is None
+
+
+def test_outline_code_star_import():
+    """
+    The names from a star import are only known for the microbit module.
+    """
+    assert mu.logic.outline_code('from os import *\n') is None
+    outline = mu.logic.outline_code('from microbit import *\n')
+    assert 'display' in outline['blocks'][0]['binds']
+
+
+def test_check_changes_unchanged():
+    """
+    If nothing has changed the previous feedback is returned.
+    """
+    previous = checked(SCOPED_CODE)
+    outline = mu.logic.outline_code(SCOPED_CODE)
+    results = mu.logic.check_changes('foo.py', outline, None, previous)
+    assert results == (previous[1], previous[2])
+
+
+def test_check_changes_in_function():
+    """
+    A change to a function only checks that function, with the module-level
+    names treated as builtins, and the feedback for the blocks after the
+    changes is moved.
+    """
+    old_code = SCOPED_CODE.replace('    return self.value',
+                                   '    return oops  ')
+    new_code = old_code.replace('    x = 1\n', '    x=oops\n    y = 2\n')
+    results, flake = check_scoped(old_code, new_code)
+    assert results == (fake_flake('foo.py', new_code, ['foo']),
+                       mu.logic.check_pycodestyle(new_code))
+    assert flake.call_count == 1
+    region = flake.call_args[0][1]
+    assert region == '\n' * 9 + 'def two():\n    x=oops\n    y = 2\n' + \
+        '    return x\n\n\n'
+    builtins = flake.call_args[0][2]
+    assert builtins == ['foo', 'Three', 'one', 'os', 'two']
+    # The moved feedback refers to the new line number.
+    assert results[0][19][0]['message'] == 'oops on line 20'
+
+
+def test_check_changes_moved_reference():
+    """
+    References in the feedback for the blocks before the changes to lines
+    after them are moved, so the results are the same as a full check.
+    """
+    old_code = ('def q():\n    import os\n\n\ndef r():\n    pass\n\n\n'
+                'def s():\n    pass\n\n\nimport os\n')
+    new_code = old_code.replace('    pass\n\n\nimport',
+                                '    pass\n    pass\n\n\nimport')
+    previous = (mu.logic.outline_code(old_code),
+                mu.logic.check_flake('foo.py', old_code),
+                mu.logic.check_pycodestyle(old_code))
+    outline = mu.logic.outline_code(new_code)
+    flake, pep8 = mu.logic.check_changes('foo.py', outline, None, previous)
+    assert flake == mu.logic.check_flake('foo.py', new_code)
+    assert pep8 == mu.logic.check_pycodestyle(new_code)
+    messages = [m['message'] for ms in flake.values() for m in ms]
+    assert "redefinition of unused 'os' from line 14" in messages
+
+
+def test_check_changes_style_context():
+    """
+    Style checks of the changes take account of the blocks around them and
+    the block after them is rechecked.
+    """
+    new_code = SCOPED_CODE.replace('    return x\n', '    return x\n\n\n')
+    results, flake = check_scoped(SCOPED_CODE, new_code)
+    assert results[1] == mu.logic.check_pycodestyle(new_code)
+    assert results[1][16][0]['code'] == 'E303'
+    new_code = SCOPED_CODE.replace('    x = 1\n', '\n\n    x = 1\n')
+    results, flake = check_scoped(SCOPED_CODE, new_code)
+    assert results[1] == mu.logic.check_pycodestyle(new_code)
+    assert results[1][12][0]['code'] == 'E303'
+
+
+def test_check_changes_end_of_file():
+    """
+    Changes at the end of the file are checked in the context of the block
+    before them.
+    """
+    new_code = SCOPED_CODE.replace('return self.value', 'return  self.value')
+    results, flake = check_scoped(SCOPED_CODE, new_code)
+    assert results[1] == mu.logic.check_pycodestyle(new_code)
+    assert results[1][18][0]['code'] == 'E271'
+    results, flake = check_scoped(new_code, SCOPED_CODE)
+    assert results[1] == {}
+
+
+def test_check_changes_module_level():
+    """
+    Changes to module-level statements need a full check.
+    """
+    new_code = SCOPED_CODE.replace('import os', 'import os  ')
+    assert check_scoped(SCOPED_CODE, new_code)[0] is None
+    new_code = SCOPED_CODE + 'x = 1\n'
+    assert check_scoped(SCOPED_CODE, new_code)[0] is None
+
+
+def test_check_changes_names():
+    """
+    Changes to the names bound at module level need a full check.
+    """
+    new_code = SCOPED_CODE.replace('def two', 'def deux')
+    assert check_scoped(SCOPED_CODE, new_code)[0] is None
+    new_code = SCOPED_CODE.replace('    x = 1', '    global x\n    x = 1')
+    assert check_scoped(SCOPED_CODE, new_code)[0] is None
+
+
+def test_check_changes_redefinition():
+    """
+    Changes to a def or class that's defined more than once need a full
+    check.
+    """
+    code = SCOPED_CODE + '\n\ndef two():\n    pass\n'
+    new_code = code.replace('    x = 1', '    x = 2')
+    assert check_scoped(code, new_code)[0] is None
+
+
+def test_check_changes_uses():
+    """
+    Changes to the use of imports (which might become unused) need a full
+    check.
+    """
+    new_code = SCOPED_CODE.replace('return os.getcwd()', 'return 1')
+    assert check_scoped(SCOPED_CODE, new_code)[0] is None
+
+
+def test_check_changes_shadowed_import():
+    """
+    Changes to a function that binds the same name as an import need a full
+    check.
+    """
+    new_code = SCOPED_CODE.replace('    return os.getcwd()',
+                                   '    import os\n    return os.getcwd()')
+    assert check_scoped(SCOPED_CODE, new_code)[0] is None
+
+
+def test_check_changes_forward_reference():
+    """
+    Changes to a def or class that uses a name defined later while it's being
+    defined need a full check.
+    """
+    new_code = SCOPED_CODE.replace('    x = 1', '    x = one')
+    assert check_scoped(SCOPED_CODE, new_code)[0] is not None
+    new_code = SCOPED_CODE.replace('def two():', 'def two(x=Three):')
+    assert check_scoped(SCOPED_CODE, new_code)[0] is None
+
+
+def test_check_changes_all_new():
+    """
+    If every block has changed, a full check is needed.
+    """
+    assert check_scoped('def a():\n    pass\n', '')[0] is None
+
+
+def test_CodeChecker_run_check_scoped():
+    """
+    A scoped request checks the changes since the last check of the tab.
+    """
+    checker = mu.logic.CodeChecker()
+    checker.on_checked = mock.MagicMock()
+    with mock.patch('mu.logic.check_flake', return_value={}), \
+            mock.patch('mu.logic.check_pycodestyle', return_value={}):
+        checker.request(1, 'foo.py', 'x = 1\n', ['foo', ], scoped=True)
+    outline = checker.previous[1][1][0]
+    assert checker.previous[1] == (['foo', ], (outline, {}, {}))
+    results = ({1: []}, {})
+    with mock.patch('mu.logic.check_changes',
+                    return_value=results) as mock_cc:
+        checker.request(1, 'foo.py', 'x = 2\n', ['foo', ], scoped=True)
+    mock_cc.assert_called_once_with('foo.py', mock.ANY, ['foo', ],
+                                    (outline, {}, {}))
+    checker.on_checked.emit.assert_called_with(1, 2, {1: []}, {})
+
+
+def test_CodeChecker_run_check_scoped_full():
+    """
+    A scoped request is checked in full if the checker has nothing to compare
+    with, the builtins have changed or the changes can't be checked alone.
+    """
+    checker = mu.logic.CodeChecker()
+    checker.on_checked = mock.MagicMock()
+    with mock.patch('mu.logic.check_changes', return_value=None) as mock_cc, \
+            mock.patch('mu.logic.check_flake', return_value={}) as mock_cf, \
+            mock.patch('mu.logic.check_pycodestyle', return_value={}):
+        checker.request(1, 'foo.py', 'x = 1\n', scoped=True)
+        assert mock_cc.call_count == 0
+        checker.request(1, 'foo.py', 'x = 2\n', ['foo', ], scoped=True)
+        assert mock_cc.call_count == 0
+        checker.request(1, 'foo.py', 'x = 3\n', ['foo', ], scoped=True)
+        assert mock_cc.call_count == 1
+    assert mock_cf.call_count == 3
+
+
+def test_CodeChecker_run_check_unparsable():
+    """
+    Code that can't be outlined isn't remembered for scoped checks.
+    """
+    checker = mu.logic.CodeChecker()
+    checker.on_checked = mock.MagicMock()
+    checker.previous[1] = (None, 'old')
+    with mock.patch('mu.logic.check_flake', return_value={}), \
+            mock.patch('mu.logic.check_pycodestyle', return_value={}):
+        checker.request(1, 'foo.py', 'def (:\n', scoped=True)
+    assert checker.previous == {}
+
+
+def test_CodeChecker_previous_bounded():
+    """
+    Only the most recent checks are remembered.
+    """
+    checker = mu.logic.CodeChecker()
+    checker.on_checked = mock.MagicMock()
+    with mock.patch('mu.logic.CHECK_CACHE_SIZE', 2), \
+            mock.patch('mu.logic.check_flake', return_value={}), \
+            mock.patch('mu.logic.check_pycodestyle', return_value={}):
+        for tab_id in range(3):
+            checker.request(tab_id, 'foo.py', 'x = 1\n')
+    assert list(checker.previous) == [1, 2]
+
+
+def test_CodeChecker_release():
+    """
+    Everything about a released tab is forgotten, including the pinning of
+    its latest results in the cache.
+    """
+    cache = mu.logic.CheckCache()
+    checker = mu.logic.CodeChecker(cache)
+    checker.on_checked = mock.MagicMock()
+    with mock.patch('mu.logic.check_flake', return_value={}), \
+            mock.patch('mu.logic.check_pycodestyle', return_value={}):
+        checker.request(1, 'foo.py', 'x = 1\n')
+    assert 1 in cache.owners
+    checker.release(1)
+    assert 1 not in checker.latest
+    assert 1 not in checker.previous
+    assert cache.owners == {}
+
+
+def test_CodeChecker_run_check_released():
+    """
+    A tab released while its code is being checked isn't pinned again in the
+    cache once the check finishes.
+    """
+    cache = mu.logic.CheckCache()
+    checker = mu.logic.CodeChecker(cache)
+    checker.on_checked = mock.MagicMock()
+    checker.latest[1] = 1
+
+    def release(code):
+        checker.release(1)
+        return {}
+
+    with mock.patch('mu.logic.check_flake', return_value={}), \
+            mock.patch('mu.logic.check_pycodestyle', side_effect=release):
+        checker.run_check(1, 1, 'foo.py', 'code', None, False)
+    assert cache.owners == {}
+    assert cache.get(cache.key('code')) == ({}, {})
+    assert checker.on_checked.emit.call_count == 0
+
+
+def test_CheckCache_key():
+    """
+    The key changes with the code, builtins and ignored rules, but not with
+    the order of the builtins.
+    """
+    key = mu.logic.CheckCache.key
+    assert key('code') == key('code', [])
+    assert key('code') != key('code ')
+    assert key('code', ['a', 'b']) == key('code', ['b', 'a'])
+    assert key('code', ['a', ]) != key('code')
+    assert key('code', ignore=('E123', )) != key('code')
+    english = key('code')
+    with mock.patch('mu.logic.language_code', 'zh'):
+        assert key('code') != english
+
+
+def test_CheckCache_get_put():
+    """
+    Results are remembered and unknown keys return None.
+    """
+    cache = mu.logic.CheckCache()
+    assert cache.get('foo') is None
+    cache.put('foo', {1: []}, {2: []}, owner=1)
+    assert cache.get('foo') == ({1: []}, {2: []})
+    assert cache.owners == {1: 'foo'}
+
+
+def test_CheckCache_evict_least_recently_used():
+    """
+    When full, the least recently used results are evicted.
+    """
+    cache = mu.logic.CheckCache(size=2)
+    cache.put('a', {}, {})
+    cache.put('b', {}, {})
+    cache.get('a')
+    cache.put('c', {}, {})
+    assert list(cache.entries) == ['a', 'c']
+
+
+def test_CheckCache_evict_keeps_tab_results():
+    """
+    The latest results for each tab are never evicted.
+    """
+    cache = mu.logic.CheckCache(size=2)
+    cache.put('a', {}, {}, owner=1)
+    cache.put('b', {}, {}, owner=2)
+    cache.put('c', {}, {}, owner=3)
+    assert list(cache.entries) == ['a', 'b', 'c']
+    cache.put('d', {}, {}, owner=3)
+    assert list(cache.entries) == ['a', 'b', 'd']
+
+
+def test_CheckCache_release():
+    """
+    Once released, an owner's latest results can be evicted.
+    """
+    cache = mu.logic.CheckCache(size=1)
+    cache.put('a', {}, {}, owner=1)
+    cache.put('b', {}, {}, owner=2)
+    assert list(cache.entries) == ['a', 'b']
+    cache.release(1)
+    assert cache.owners == {2: 'b'}
+    assert list(cache.entries) == ['b']
+    cache.release(3)
+    assert list(cache.entries) == ['b']
+
+
+def test_CheckCache_save_load():
+    """
+    Results saved to the cache's file can be loaded by another cache.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'check_cache.json')
+        cache = mu.logic.CheckCache(path=path)
+        flake = {3: [{'line_no': 3, 'column': 0, 'message': 'flake'}]}
+        pep8 = {4: [{'line_no': 4, 'column': 1, 'message': 'pep8',
+                     'code': 'E225'}]}
+        cache.put('a', flake, pep8)
+        cache.put('b', {}, {})
+        cache.save()
+        restored = mu.logic.CheckCache(path=path)
+        restored.put('c', {}, {})
+        restored.load()
+    assert list(restored.entries) == ['a', 'b', 'c']
+    assert restored.get('a') == (flake, pep8)
+
+
+def test_CheckCache_no_path():
+    """
+    Without a path, loading and saving do nothing.
+    """
+    cache = mu.logic.CheckCache()
+    cache.put('a', {}, {})
+    with mock.patch('builtins.open') as mock_open:
+        cache.save()
+        cache.load()
+    assert mock_open.call_count == 0
+    assert list(cache.entries) == ['a']
+
+
+def test_CheckCache_load_missing():
+    """
+    A missing cache file is ignored.
+    """
+    cache = mu.logic.CheckCache(path='/does/not/exist.json')
+    cache.load()
+    assert cache.entries == {}
+
+
+def test_CheckCache_load_corrupt():
+    """
+    A corrupt cache file is logged and ignored.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'check_cache.json')
+        with open(path, 'w') as f:
+            f.write('{"not": "a list of entries"')
+        cache = mu.logic.CheckCache(path=path)
+        with mock.patch('mu.logic.logger.error') as mock_error:
+            cache.load()
+    assert cache.entries == {}
+    assert mock_error.call_count == 1
+
+
+def test_CheckCache_save_fails():
+    """
+    Failure to save the cache file is logged.
+    """
+    cache = mu.logic.CheckCache(path='/does/not/exist/check_cache.json')
+    with mock.patch('mu.logic.logger.error') as mock_error:
+        cache.save()
+    assert mock_error.call_count == 1
+
+
+def test_open_uevent_socket():
+    """
+    A netlink socket bound to the kernel's hotplug events is returned.
+    """
+    mock_sock = mock.MagicMock()
+    with mock.patch('mu.logic.socket.socket',
+                    return_value=mock_sock) as mock_socket, \
+            mock.patch('mu.logic.socket.AF_NETLINK', 16, create=True):
+        assert mu.logic.open_uevent_socket() == mock_sock
+    mock_socket.assert_called_once_with(16, mu.logic.socket.SOCK_DGRAM,
+                                        mu.logic.NETLINK_KOBJECT_UEVENT)
+    mock_sock.bind.assert_called_once_with((0, 1))
+
+
+def test_open_uevent_socket_unavailable():
+    """
+    If netlink isn't available (e.g. not on Linux), None is returned.
+    """
+    with mock.patch('mu.logic.socket.socket', side_effect=OSError('Boom')):
+        assert mu.logic.open_uevent_socket() is None
+    mock_sock = mock.MagicMock()
+    mock_sock.bind.side_effect = OSError('Boom')
+    with mock.patch('mu.logic.socket.socket', return_value=mock_sock), \
+            mock.patch('mu.logic.socket.AF_NETLINK', 16, create=True):
+        assert mu.logic.open_uevent_socket() is None
+    mock_sock.close.assert_called_once_with()
+
+
+def test_is_serial_uevent():
+    """
+    Only serial (tty) devices being added or removed are of interest.
+    """
+    add = (b'add@/devices/usb1/1-1/tty/ttyACM0\0ACTION=add\0'
+           b'DEVPATH=/devices/usb1/1-1/tty/ttyACM0\0SUBSYSTEM=tty\0'
+           b'DEVNAME=ttyACM0\0')
+    assert mu.logic.is_serial_uevent(add)
+    assert mu.logic.is_serial_uevent(add.replace(b'=add', b'=remove'))
+    assert not mu.logic.is_serial_uevent(add.replace(b'=add', b'=change'))
+    assert not mu.logic.is_serial_uevent(add.replace(b'=tty', b'=block'))
+
+
+def test_PortScanner_scan():
+    """
+    The name, VID and PID of each available port are returned and kept as
+    the latest snapshot.
+    """
+    mock_port = mock.MagicMock()
+    mock_port.portName.return_value = 'ttyACM0'
+    mock_port.vendorIdentifier.return_value = 0x0D28
+    mock_port.productIdentifier.return_value = 0x0204
+    ps = mu.logic.PortScanner()
+    with mock.patch('mu.logic.QSerialPortInfo.availablePorts',
+                    return_value=[mock_port, ]):
+        assert ps.scan() == (('ttyACM0', 0x0D28, 0x0204), )
+    assert ps.snapshot[0].name == 'ttyACM0'
+    assert ps.snapshot[0].vid == 0x0D28
+    assert ps.snapshot[0].pid == 0x0204
+
+
+def test_PortScanner_ports():
+    """
+    The snapshot is only used while the ports are watched for changes.
+    """
+    ps = mu.logic.PortScanner()
+    ps.scan = mock.MagicMock(return_value=('foo', ))
+    assert ps.ports() == ('foo', )
+    ps.snapshot = ('bar', )
+    assert ps.ports() == ('foo', )
+    ps.watched = True
+    assert ps.ports() == ('bar', )
+    assert ps.scan.call_count == 2
+    ps.snapshot = None
+    assert ps.ports() == ('foo', )
+
+
+def test_PortScanner_find_devices():
+    """
+    Each name is mapped to the first port with one of its boards attached.
+    """
+    ps = mu.logic.PortScanner()
+    port = mu.logic.SerialPort
+    ps.ports = mock.MagicMock(return_value=(
+        port('ttyS0', 0, 0),
+        port('ttyACM0', 0x0D28, 0x0204),
+        port('ttyACM1', 0x239A, 0x8019),
+        port('ttyACM2', 0x0D28, 0x0204),
+    ))
+    boards = {
+        'microbit': [(0x0D28, 0x0204), ],
+        'adafruit': [(0x239A, 0x8015), (0x239A, 0x8019)],
+        'both': [(0x239A, 0x8019), (0x0D28, 0x0204)],
+        'none': [(1, 2), ],
+    }
+    assert ps.find_devices(boards) == {
+        'microbit': port('ttyACM0', 0x0D28, 0x0204),
+        'adafruit': port('ttyACM1', 0x239A, 0x8019),
+        'both': port('ttyACM0', 0x0D28, 0x0204),
+    }
+    ports = (port('ttyACM3', 1, 2), )
+    assert ps.find_devices(boards, ports) == {'none': ports[0]}
+    assert ps.ports.call_count == 1
+
+
+MOUNTINFO = (b'23 28 0:22 / /proc rw,relatime - proc proc rw\n'
+             b'45 28 8:17 / /media/ntoll/CIRCUITPY rw,nosuid - vfat '
+             b'/dev/sdb1 rw\n'
+             b'46 28 8:33 / /media/ntoll/MY\\040STICK rw,nosuid - vfat '
+             b'/dev/sdc1 rw\n')
+
+
+def test_MountTable_read_mountinfo(tmpdir):
+    """
+    Labels are mapped to (unescaped) mount points and the mount table is only
+    read again once it has changed.
+    """
+    mountinfo = tmpdir.join('mountinfo')
+    mountinfo.write_binary(MOUNTINFO)
+    mt = mu.logic.MountTable(mountinfo=str(mountinfo))
+    volumes = mt.read_mountinfo()
+    assert volumes == {
+        'proc': '/proc',
+        'CIRCUITPY': '/media/ntoll/CIRCUITPY',
+        'MY STICK': '/media/ntoll/MY STICK',
+    }
+    mountinfo.write_binary(MOUNTINFO + b'47 28 8:49 / /media/MICROBIT rw\n')
+    mt.poller = mock.MagicMock()
+    mt.poller.poll.return_value = []
+    assert mt.read_mountinfo() is volumes
+    mt.poller.poll.assert_called_once_with(0)
+    mt.poller.poll.return_value = [(3, 10)]
+    assert mt.read_mountinfo()['MICROBIT'] == '/media/MICROBIT'
+    mt.file.close()
+
+
+def test_MountTable_read_mount_command():
+    """
+    Labels are mapped to mount points from the output of the mount command,
+    which is looked for in /sbin if it isn't on the path (e.g. on macOS
+    without administrative privileges).
+    """
+    with open('tests/modes/mount_exists.txt', 'rb') as fixture_file:
+        fixture = fixture_file.read()
+    mt = mu.logic.MountTable()
+    mock_check = mock.MagicMock(side_effect=[FileNotFoundError, fixture])
+    with mock.patch('mu.logic.check_output', mock_check):
+        volumes = mt.read_mount_command()
+    assert volumes['CIRCUITPY'] == '/media/ntoll/CIRCUITPY'
+    assert mock_check.call_args_list[0][0][0] == 'mount'
+    assert mock_check.call_args_list[1][0][0] == '/sbin/mount'
+    with open('tests/modes/mount_missing.txt', 'rb') as fixture_file:
+        fixture = fixture_file.read()
+    with mock.patch('mu.logic.check_output', return_value=fixture):
+        assert 'CIRCUITPY' not in mt.read_mount_command()
+    with mock.patch('mu.logic.check_output', side_effect=FileNotFoundError):
+        assert mt.read_mount_command() == {}
+
+
+def test_MountTable_find_linux():
+    """
+    On Linux, the volumes are found in the mount table.
+    """
+    mt = mu.logic.MountTable()
+    mt.read_mountinfo = mock.MagicMock(return_value={'CIRCUITPY': 'foo'})
+    with mock.patch('mu.logic.os.path.isfile', return_value=True):
+        assert mt.find('CIRCUITPY') == 'foo'
+        assert mt.find('MICROBIT') is None
+
+
+def test_MountTable_find_volumes_dir(tmpdir):
+    """
+    On macOS, the volumes are found in the volumes directory.
+    """
+    tmpdir.mkdir('MICROBIT')
+    mt = mu.logic.MountTable(mountinfo=str(tmpdir.join('missing')),
+                             volumes_dir=str(tmpdir))
+    assert mt.find('MICROBIT') == str(tmpdir.join('MICROBIT'))
+    assert mt.find('CIRCUITPY') is None
+
+
+def test_MountTable_find_mount_command(tmpdir):
+    """
+    Otherwise, the mount command is run.
+    """
+    missing = str(tmpdir.join('missing'))
+    mt = mu.logic.MountTable(mountinfo=missing, volumes_dir=missing)
+    mt.read_mount_command = mock.MagicMock(return_value={'MICROBIT': 'foo'})
+    assert mt.find('MICROBIT') == 'foo'
+
+
+def test_DeviceWatcher_check():
+    """
+    on_changed is only emitted when the available ports change.
+    """
+    mock_scanner = mock.MagicMock()
+    mock_scanner.scan.side_effect = [(), (), (('ttyACM0', 1, 2), )]
+    dw = mu.logic.DeviceWatcher(scanner=mock_scanner)
+    dw.on_changed = mock.MagicMock()
+    dw.check()
+    dw.check()
+    assert dw.on_changed.emit.call_count == 1
+    dw.check()
+    assert dw.on_changed.emit.call_count == 2
+    assert dw.ports == {('ttyACM0', 1, 2)}
+
+
+def test_DeviceWatcher_wait_for_event():
+    """
+    All waiting notifications are read and True returned if any of them are
+    about a serial device.
+    """
+    dw = mu.logic.DeviceWatcher(interval=3)
+    mock_sock = mock.MagicMock()
+    mock_sock.recv.side_effect = [b'ACTION=add\0SUBSYSTEM=tty',
+                                  b'ACTION=add\0SUBSYSTEM=usb']
+    with mock.patch('mu.logic.select.select',
+                    side_effect=[([mock_sock], [], []),
+                                 ([mock_sock], [], []),
+                                 ([], [], [])]) as mock_select:
+        assert dw.wait_for_event(mock_sock) is True
+    assert mock_select.call_args_list[0][0][3] == 3
+    assert mock_select.call_args_list[1][0][3] == 0
+    # Timing out, other events or errors aren't a serial hotplug event.
+    with mock.patch('mu.logic.select.select', return_value=([], [], [])):
+        assert dw.wait_for_event(mock_sock) is False
+    mock_sock.recv.side_effect = OSError('Boom')
+    with mock.patch('mu.logic.select.select',
+                    return_value=([mock_sock], [], [])):
+        assert dw.wait_for_event(mock_sock) is False
+
+
+def test_DeviceWatcher_run_hotplug():
+    """
+    With hotplug events, the ports are checked at the start and after each
+    serial hotplug event until stopped.
+    """
+    dw = mu.logic.DeviceWatcher()
+    dw.check = mock.MagicMock()
+    mock_sock = mock.MagicMock()
+
+    def event(sock):
+        if dw.wait_for_event.call_count == 3:
+            dw.stopping.set()
+        return dw.wait_for_event.call_count == 1
+
+    dw.wait_for_event = mock.MagicMock(side_effect=event)
+    dw.scanner = mu.logic.PortScanner()
+    with mock.patch('mu.logic.open_uevent_socket', return_value=mock_sock):
+        dw.run()
+        assert dw.scanner.watched is False
+    assert dw.check.call_count == 2
+    mock_sock.close.assert_called_once_with()
+
+
+def test_DeviceWatcher_run_polling():
+    """
+    Without hotplug events the ports are polled every interval until
+    stopped.
+    """
+    dw = mu.logic.DeviceWatcher(interval=2)
+    dw.check = mock.MagicMock()
+    dw.stopping = mock.MagicMock()
+    dw.stopping.is_set.side_effect = [False, False, True]
+    dw.stopping.wait.side_effect = [False, True]
+    with mock.patch('mu.logic.open_uevent_socket', return_value=None):
+        dw.run()
+    dw.stopping.wait.assert_called_with(2)
+    assert dw.check.call_count == 2
+
+
+def test_DeviceWatcher_stop():
+    """
+    Stopping the watcher (in a thread) waits for it to finish.
+    """
+    dw = mu.logic.DeviceWatcher(interval=0.01)
+    dw.check = mock.MagicMock()
+    with mock.patch('mu.logic.open_uevent_socket', return_value=None):
+        dw.start()
+        dw.stop()
+    assert dw.isFinished()
+    assert dw.check.call_count >= 1
+
+
+def test_SerialLink_init():
+    """
+    The port is opened at the expected speed, with a timeout so the reader
+    can check if it's been stopped.
+    """
+    with mock.patch('mu.logic.serial.Serial') as mock_serial:
+        link = mu.logic.SerialLink('/dev/ttyACM0')
+    mock_serial.assert_called_once_with('/dev/ttyACM0',
+                                        mu.logic.SERIAL_BAUDRATE,
+                                        timeout=mu.logic.SERIAL_READ_TIMEOUT,
+                                        write_timeout=(
+                                            mu.logic.SERIAL_WRITE_TIMEOUT))
+    assert link.serial == mock_serial.return_value
+    assert link.max_queued == mu.logic.SERIAL_QUEUE_SIZE
+    assert link.timer.interval() == mu.logic.SERIAL_DELIVERY_INTERVAL
+    assert (link.received, link.queued, link.dropped) == (0, 0, 0)
+
+
+def test_SerialLink_init_fails():
+    """
+    If the port can't be opened an IOError is raised.
+    """
+    with mock.patch('mu.logic.serial.Serial',
+                    side_effect=serial.SerialException('boom')):
+        with pytest.raises(IOError) as ex:
+            mu.logic.SerialLink('/dev/ttyACM0')
+    assert '/dev/ttyACM0' in str(ex.value)
+
+
+def test_SerialLink_enqueue_deliver():
+    """
+    Bytes read are queued and delivered as a single chunk. If the queue is
+    full, the oldest bytes are dropped (and counted).
+    """
+    with mock.patch('mu.logic.serial.Serial'):
+        link = mu.logic.SerialLink('/dev/ttyACM0', max_queued=8)
+    link.data_received = mock.MagicMock()
+    link.deliver()
+    assert link.data_received.emit.call_count == 0
+    link.enqueue(b'hello')
+    link.enqueue(b'world')
+    assert link.received == 10
+    assert link.queued == 8
+    assert link.dropped == 2
+    link.deliver()
+    link.data_received.emit.assert_called_once_with(b'lloworld')
+    assert link.queued == 0
+
+
+def test_SerialLink_write():
+    """
+    Writing sends the bytes to the device.
+    """
+    with mock.patch('mu.logic.serial.Serial'):
+        link = mu.logic.SerialLink('/dev/ttyACM0')
+    link.write(b'\x03')
+    link.serial.write.assert_called_once_with(b'\x03')
+
+
+def test_SerialLink_write_device_gone():
+    """
+    If the device has gone away (or writing times out) the error is logged
+    and the link closed, rather than the error reaching the UI. Further
+    writes are ignored.
+    """
+    with mock.patch('mu.logic.serial.Serial'):
+        link = mu.logic.SerialLink('/dev/ttyACM0')
+    link.serial.write.side_effect = serial.SerialTimeoutException('stalled')
+    with mock.patch('mu.logic.logger.error') as mock_error:
+        link.write(b'a')
+        link.write(b'b')
+    assert mock_error.call_count == 1
+    assert link.serial.write.call_count == 1
+    assert link.stopping.is_set()
+    link.serial.close.assert_called_once_with()
+
+
+def test_SerialLink_read_and_close():
+    """
+    Once started, what's written by the device is read in the background and
+    delivered by the timer. Closing stops the reader and closes the port.
+    """
+    loop = serial.serial_for_url('loop://', timeout=0.01)
+    with mock.patch('mu.logic.serial.Serial', return_value=loop):
+        link = mu.logic.SerialLink('loop://', interval=1)
+    received = []
+    link.data_received.connect(received.append)
+    link.start()
+    loop.write(b'hello')
+    deadline = time.time() + 5
+    while not received and time.time() < deadline:
+        QCoreApplication.processEvents()
+        time.sleep(0.01)
+    link.close()
+    assert received == [b'hello']
+    assert link.isFinished()
+    assert not link.timer.isActive()
+    assert not loop.is_open
+
+
+def test_SerialLink_run_device_gone():
+    """
+    If the device goes away the reader logs the error and stops.
+    """
+    with mock.patch('mu.logic.serial.Serial'):
+        link = mu.logic.SerialLink('/dev/ttyACM0')
+    link.serial.in_waiting = 3
+    link.serial.read.side_effect = [b'', b'abc',
+                                    serial.SerialException('gone')]
+    with mock.patch('mu.logic.logger.error') as mock_error:
+        link.run()
+    assert mock_error.call_count == 1
+    link.serial.read.assert_called_with(3)
+    assert link.queue == b'abc'
+
+
+def test_SerialLink_run_closed():
+    """
+    Errors caused by the port being closed once stopped aren't logged.
+    """
+    with mock.patch('mu.logic.serial.Serial'):
+        link = mu.logic.SerialLink('/dev/ttyACM0')
+
+    def closed(size):
+        link.stopping.set()
+        raise OSError('closed')
+
+    link.serial.in_waiting = 0
+    link.serial.read.side_effect = closed
+    with mock.patch('mu.logic.logger.error') as mock_error:
+        link.run()
+    assert mock_error.call_count == 0
+
+
 def test_REPL_posix():
     """
     The port is set correctly in a posix environment.
@@ -635,6 +1738,7 @@ def test_editor_setup():
         assert mkd.call_args_list[0][0][0] == 'foo'
         assert mock_shutil.call_count == 3
     assert e.modes == mock_modes
+    view.set_code_checker.assert_called_once_with(e.checker)
 
 
 def test_editor_restore_session_existing_runtime():
@@ -644,11 +1748,13 @@ def test_editor_restore_session_existing_runtime():
     mode, theme = "python", "night"
     file_contents = ["", ""]
     ed = mocked_editor(mode)
+    ed.check_cache = mock.MagicMock()
     with mock.patch('os.path.isfile', return_value=True):
         with generate_session(theme, mode, file_contents,
                               microbit_runtime='/foo'):
             ed.restore_session()
 
+    ed.check_cache.load.assert_called_once_with()
     assert ed.theme == theme
     assert ed._view.add_tab.call_count == len(file_contents)
     ed._view.set_theme.assert_called_once_with(theme)
@@ -715,6 +1821,49 @@ def test_editor_restore_session_invalid_mode():
     ed.select_mode.assert_called_once_with(None)
 
 
+def test_editor_restore_session_scrollback():
+    """
+    The scrollback of the output panes (and whether trimmed output is logged
+    in the workspace) is restored and applied to the view.
+    """
+    ed = mocked_editor()
+    with generate_session(scrollback=100, scrollback_log=True), \
+            mock.patch('mu.modes.base.get_default_workspace',
+                       return_value='/fake/workspace'):
+        ed.restore_session()
+    assert ed.scrollback == 100
+    assert ed.scrollback_log is True
+    log_file = os.path.join('/fake/workspace', 'logs', mu.logic.SCROLLBACK_LOG)
+    ed._view.set_scrollback.assert_called_once_with(100, log_file)
+
+
+def test_editor_restore_session_default_scrollback():
+    """
+    Without a setting, the default scrollback is used and trimmed output is
+    discarded.
+    """
+    ed = mocked_editor()
+    with generate_session(mode='python'):
+        ed.restore_session()
+    ed._view.set_scrollback.assert_called_once_with(
+        mu.logic.SCROLLBACK_LINES, None)
+
+
+def test_editor_restore_session_capture_format():
+    """
+    The format the plotter's data is captured in is restored, ignoring
+    formats which aren't supported.
+    """
+    ed = mocked_editor()
+    with generate_session(capture_format='binary'):
+        ed.restore_session()
+    assert ed.capture_format == 'binary'
+    ed = mocked_editor()
+    with generate_session(capture_format='excel'):
+        ed.restore_session()
+    assert ed.capture_format == 'csv'
+
+
 def test_editor_restore_session_no_session_file():
     """
     If there's no prior session file (such as upon first start) then simply
@@ -727,7 +1876,7 @@ def test_editor_restore_session_no_session_file():
     ed.select_mode = mock.MagicMock()
     mock_mode = mock.MagicMock()
     api = ['API specification', ]
-    mock_mode.api.return_value = api
+    mock_mode.api_source.return_value = api
     mock_mode.workspace_dir.return_value = '/fake/path'
     mock_mode.save_timeout = 5
     ed.modes = {
@@ -754,7 +1903,7 @@ def test_editor_restore_session_invalid_file():
     ed._view.add_tab = mock.MagicMock()
     mock_mode = mock.MagicMock()
     api = ['API specification', ]
-    mock_mode.api.return_value = api
+    mock_mode.api_source.return_value = api
     mock_mode.workspace_dir.return_value = '/fake/path'
     mock_mode.save_timeout = 5
     ed.modes = {
@@ -882,7 +2031,7 @@ def test_new():
     view.add_tab = mock.MagicMock()
     mock_mode = mock.MagicMock()
     api = ['API specification', ]
-    mock_mode.api.return_value = api
+    mock_mode.api_source.return_value = api
     ed = mu.logic.Editor(view)
     ed.modes = {
         'python': mock_mode,
@@ -924,7 +2073,7 @@ def test_load_python_file():
     ed._view.add_tab.assert_called_once_with(
         filepath,
         text,
-        ed.modes[ed.mode].api(),
+        ed.modes[ed.mode].api_source(),
         newline)
 
 
@@ -946,7 +2095,7 @@ def test_load_python_file_case_insensitive_file_type():
     ed._view.add_tab.assert_called_once_with(
         filepath.upper(),
         text,
-        ed.modes[ed.mode].api(),
+        ed.modes[ed.mode].api_source(),
         newline)
 
 
@@ -1021,7 +2170,7 @@ def test_load_other_file():
     mock_py = mock.MagicMock()
     mock_py.open_file.return_value = None
     mock_mb = mock.MagicMock()
-    mock_mb.api.return_value = api
+    mock_mb.api_source.return_value = api
     mock_mb.workspace_dir.return_value = '/fake/path'
     mock_mb.open_file.return_value = file_content
     mock_mb.file_extensions = ['hex']
@@ -1055,10 +2204,10 @@ def test_load_other_file_change_mode():
     file_content = 'PYTHON CODE'
     mock_py = mock.MagicMock()
     mock_py.open_file.return_value = None
-    mock_py.api.return_value = api
+    mock_py.api_source.return_value = api
     mock_py.workspace_dir.return_value = '/fake/path'
     mock_mb = mock.MagicMock()
-    mock_mb.api.return_value = api
+    mock_mb.api_source.return_value = api
     mock_mb.workspace_dir.return_value = '/fake/path'
     mock_mb.open_file.return_value = file_content
     mock_mb.file_extensions = ['hex']
@@ -1150,7 +2299,7 @@ def test_load_stores_newline():
         editor.load()
 
     assert editor._view.add_tab.called_with(
-        filepath, text, editor.modes[editor.mode].api(), "\r\n")
+        filepath, text, editor.modes[editor.mode].api_source(), "\r\n")
 
 
 def test_save_restores_newline():
@@ -1362,7 +2511,8 @@ def test_zoom_out():
 
 def test_check_code_on():
     """
-    Checking code correctly results in something the UI layer can parse.
+    Checking code clears existing annotations and asks the code checker to
+    check the code in the current tab.
     """
     view = mock.MagicMock()
     tab = mock.MagicMock()
@@ -1370,45 +2520,37 @@ def test_check_code_on():
     tab.path = 'foo.py'
     tab.text.return_value = 'import this\n'
     view.current_tab = tab
-    flake = {2: {'line_no': 2, 'message': 'a message', }, }
-    pep8 = {2: [{'line_no': 2, 'message': 'another message', }],
-            3: [{'line_no': 3, 'message': 'yet another message', }]}
     mock_mode = mock.MagicMock()
-    mock_mode.builtins = None
-    with mock.patch('mu.logic.check_flake', return_value=flake), \
-            mock.patch('mu.logic.check_pycodestyle', return_value=pep8):
-        ed = mu.logic.Editor(view)
-        ed.modes = {'python': mock_mode, }
-        ed.check_code()
-        assert tab.has_annotations is True
-        view.reset_annotations.assert_called_once_with()
-        view.annotate_code.assert_has_calls([mock.call(flake, 'error'),
-                                             mock.call(pep8, 'style')],
-                                            any_order=True)
+    mock_mode.builtins = ['foo', ]
+    ed = mu.logic.Editor(view)
+    ed.checker = mock.MagicMock()
+    ed.modes = {'python': mock_mode, }
+    ed.check_code()
+    assert tab.has_annotations is True
+    view.reset_annotations.assert_called_once_with()
+    ed.checker.request.assert_called_once_with(id(tab), 'foo.py',
+                                               'import this\n', ['foo', ],
+                                               False)
 
 
-def test_check_code_no_problems():
+def test_check_code_untitled():
     """
-    If no problems are found in the code, ensure a status message is shown to
-    the user to confirm the fact. See #337
+    Code in a tab without a path is checked as "untitled".
     """
     view = mock.MagicMock()
     tab = mock.MagicMock()
     tab.has_annotations = False
-    tab.path = 'foo.py'
+    tab.path = None
     tab.text.return_value = 'import this\n'
     view.current_tab = tab
-    flake = {}
-    pep8 = {}
     mock_mode = mock.MagicMock()
     mock_mode.builtins = None
-    with mock.patch('mu.logic.check_flake', return_value=flake), \
-            mock.patch('mu.logic.check_pycodestyle', return_value=pep8):
-        ed = mu.logic.Editor(view)
-        ed.show_status_message = mock.MagicMock()
-        ed.modes = {'python': mock_mode, }
-        ed.check_code()
-        assert ed.show_status_message.call_count == 1
+    ed = mu.logic.Editor(view)
+    ed.checker = mock.MagicMock()
+    ed.modes = {'python': mock_mode, }
+    ed.check_code()
+    ed.checker.request.assert_called_once_with(id(tab), 'untitled',
+                                               'import this\n', None, False)
 
 
 def test_check_code_off():
@@ -1420,9 +2562,11 @@ def test_check_code_off():
     tab.has_annotations = True
     view.current_tab = tab
     ed = mu.logic.Editor(view)
+    ed.checker = mock.MagicMock()
     ed.check_code()
     assert tab.has_annotations is False
     view.reset_annotations.assert_called_once_with()
+    assert ed.checker.request.call_count == 0
 
 
 def test_check_code_no_tab():
@@ -1432,8 +2576,137 @@ def test_check_code_no_tab():
     view = mock.MagicMock()
     view.current_tab = None
     ed = mu.logic.Editor(view)
+    ed.checker = mock.MagicMock()
     ed.check_code()
-    assert view.annotate_code.call_count == 0
+    assert view.reset_annotations.call_count == 0
+    assert ed.checker.request.call_count == 0
+
+
+def test_on_code_changed_with_annotations():
+    """
+    When the code in a tab with annotations changes, the changes are
+    re-checked.
+    """
+    view = mock.MagicMock()
+    ed = mu.logic.Editor(view)
+    ed.request_check = mock.MagicMock()
+    on_code_changed = view.code_changed.connect.call_args[0][0]
+    tab = mock.MagicMock()
+    tab.has_annotations = True
+    on_code_changed(tab)
+    ed.request_check.assert_called_once_with(tab, scoped=True)
+
+
+def test_on_code_changed_without_annotations():
+    """
+    When the code in a tab without annotations changes, nothing is checked.
+    """
+    view = mock.MagicMock()
+    ed = mu.logic.Editor(view)
+    ed.request_check = mock.MagicMock()
+    on_code_changed = view.code_changed.connect.call_args[0][0]
+    tab = mock.MagicMock()
+    tab.has_annotations = False
+    on_code_changed(tab)
+    assert ed.request_check.call_count == 0
+
+
+def test_on_tab_closed():
+    """
+    Closing a tab unpins the cached results of checking its code.
+    """
+    view = mock.MagicMock()
+    ed = mu.logic.Editor(view)
+    ed.checker = mu.logic.CodeChecker(mu.logic.CheckCache())
+    ed.checker.on_checked = mock.MagicMock()
+    tab = mock.MagicMock()
+    with mock.patch('mu.logic.check_flake', return_value={}), \
+            mock.patch('mu.logic.check_pycodestyle', return_value={}):
+        ed.checker.request(id(tab), 'foo.py', 'x = 1\n')
+    assert id(tab) in ed.checker.cache.owners
+    on_tab_closed = view.tab_closed.connect.call_args[0][0]
+    on_tab_closed(tab)
+    assert ed.checker.cache.owners == {}
+
+
+def test_on_code_checked():
+    """
+    Results from the code checker are displayed in the referenced tab.
+    """
+    view = mock.MagicMock()
+    tab = mock.MagicMock()
+    tab.has_annotations = True
+    view.widgets = [mock.MagicMock(), tab]
+    flake = {2: {'line_no': 2, 'message': 'a message', }, }
+    pep8 = {2: [{'line_no': 2, 'message': 'another message', }],
+            3: [{'line_no': 3, 'message': 'yet another message', }]}
+    ed = mu.logic.Editor(view)
+    ed.checker.latest[id(tab)] = 1
+    ed.on_code_checked(id(tab), 1, flake, pep8)
+    tab.update_check_annotations.assert_called_once_with({'error': flake,
+                                                          'style': pep8})
+    assert tab.has_annotations is True
+
+
+def test_on_code_checked_no_problems():
+    """
+    If no problems are found in the code, ensure a status message is shown to
+    the user to confirm the fact. See #337
+    """
+    view = mock.MagicMock()
+    tab = mock.MagicMock()
+    tab.has_annotations = True
+    view.widgets = [tab, ]
+    ed = mu.logic.Editor(view)
+    ed.show_status_message = mock.MagicMock()
+    ed.checker.latest[id(tab)] = 1
+    ed.on_code_checked(id(tab), 1, {}, {})
+    tab.update_check_annotations.assert_called_once_with({'error': {},
+                                                          'style': {}})
+    assert tab.has_annotations is False
+    assert ed.show_status_message.call_count == 1
+
+
+def test_on_code_checked_stale():
+    """
+    Results from a request superseded by a newer one are ignored.
+    """
+    view = mock.MagicMock()
+    tab = mock.MagicMock()
+    tab.has_annotations = True
+    view.widgets = [tab, ]
+    ed = mu.logic.Editor(view)
+    ed.checker.latest[id(tab)] = 2
+    ed.on_code_checked(id(tab), 1, {1: []}, {})
+    assert tab.update_check_annotations.call_count == 0
+
+
+def test_on_code_checked_tab_closed():
+    """
+    Results for a tab that has since been closed are ignored.
+    """
+    view = mock.MagicMock()
+    tab = mock.MagicMock()
+    view.widgets = []
+    ed = mu.logic.Editor(view)
+    ed.checker.latest[id(tab)] = 1
+    ed.on_code_checked(id(tab), 1, {1: []}, {})
+    assert tab.update_check_annotations.call_count == 0
+
+
+def test_on_code_checked_annotations_off():
+    """
+    Results for a tab whose annotations have been toggled off while the check
+    was running are ignored.
+    """
+    view = mock.MagicMock()
+    tab = mock.MagicMock()
+    tab.has_annotations = False
+    view.widgets = [tab, ]
+    ed = mu.logic.Editor(view)
+    ed.checker.latest[id(tab)] = 1
+    ed.on_code_checked(id(tab), 1, {1: []}, {})
+    assert tab.update_check_annotations.call_count == 0
 
 
 def test_show_help():
@@ -1521,6 +2794,7 @@ def test_quit_modified_ok():
     view.modified = True
     view.show_confirmation = mock.MagicMock(return_value=True)
     ed = mu.logic.Editor(view)
+    ed.check_cache = mock.MagicMock()
     mock_mode = mock.MagicMock()
     mock_mode.workspace_dir.return_value = 'foo/bar'
     mock_mode.get_hex_path.return_value = 'foo/bar'
@@ -1542,6 +2816,8 @@ def test_quit_modified_ok():
             mock.patch('builtins.open', mock_open):
         ed.quit(mock_event)
     mock_debug_mode.stop.assert_called_once_with()
+    view.stop_code_checker.assert_called_once_with()
+    view.stop_usb_checker.assert_called_once_with()
     assert view.show_confirmation.call_count == 1
     assert mock_event.ignore.call_count == 0
     assert mock_open.call_count == 1
@@ -1560,6 +2836,7 @@ def test_quit_save_tabs_with_paths():
     w1.path = 'foo.py'
     view.widgets = [w1, ]
     ed = mu.logic.Editor(view)
+    ed.check_cache = mock.MagicMock()
     mock_mode = mock.MagicMock()
     mock_mode.workspace_dir.return_value = 'foo/bar'
     mock_mode.get_hex_path.return_value = 'foo/bar'
@@ -1580,10 +2857,32 @@ def test_quit_save_tabs_with_paths():
     assert mock_event.ignore.call_count == 0
     assert mock_open.call_count == 1
     assert mock_open.return_value.write.call_count > 0
+    mock_mode.stop_capture.assert_called_once_with()
     recovered = ''.join([i[0][0] for i
                         in mock_open.return_value.write.call_args_list])
     session = json.loads(recovered)
     assert os.path.abspath('foo.py') in session['paths']
+    assert session['scrollback'] == mu.logic.SCROLLBACK_LINES
+    assert session['scrollback_log'] is False
+    assert session['capture_format'] == 'csv'
+
+
+def test_quit_save_check_cache():
+    """
+    When quitting, ensure the results of checking code are saved.
+    """
+    view = mock.MagicMock()
+    view.modified = False
+    view.widgets = []
+    ed = mu.logic.Editor(view)
+    ed.check_cache = mock.MagicMock()
+    ed.modes = {
+        'python': mock.MagicMock(),
+    }
+    with mock.patch('sys.exit', return_value=None), \
+            mock.patch('builtins.open', mock.MagicMock()):
+        ed.quit()
+    ed.check_cache.save.assert_called_once_with()
 
 
 def test_quit_save_theme():
@@ -1597,6 +2896,7 @@ def test_quit_save_theme():
     w1.path = 'foo.py'
     view.widgets = [w1, ]
     ed = mu.logic.Editor(view)
+    ed.check_cache = mock.MagicMock()
     ed.theme = 'night'
     mock_mode = mock.MagicMock()
     mock_mode.workspace_dir.return_value = 'foo/bar'
@@ -1636,6 +2936,7 @@ def test_quit_save_envars():
     w1.path = 'foo.py'
     view.widgets = [w1, ]
     ed = mu.logic.Editor(view)
+    ed.check_cache = mock.MagicMock()
     ed.theme = 'night'
     mock_mode = mock.MagicMock()
     mock_mode.workspace_dir.return_value = 'foo/bar'
@@ -1809,11 +3110,15 @@ def test_change_mode():
             'shortcut': 'Ctrl+X',
         },
     ]
+    old_mode = mock.MagicMock()
     ed.modes = {
         'python': mode,
+        'microbit': old_mode,
     }
+    ed.mode = 'microbit'
     ed.change_mode('python')
     assert ed.mode == 'python'
+    old_mode.stop_capture.assert_called_once_with()
     view.remove_repl.assert_called_once_with()
     view.remove_filesystem.assert_called_once_with()
     view.remove_plotter.assert_called_once_with()
@@ -1893,6 +3198,15 @@ def test_autosave():
     mock_tab.setModified.assert_called_once_with(False)
 
 
+def mode_registry(modes):
+    """
+    Return a registry of the referenced modes, as if they'd been loaded.
+    """
+    registry = mu.app.ModeRegistry(None, None, modes)
+    registry.instances.update(modes)
+    return registry
+
+
 def test_check_usb():
     """
     Ensure the check_usb callback actually checks for connected USB devices.
@@ -1903,16 +3217,47 @@ def test_check_usb():
     ed.change_mode = mock.MagicMock()
     mode_mb = mock.MagicMock()
     mode_mb.name = 'BBC micro:bit'
-    mode_mb.find_device.return_value = '/dev/ttyUSB0'
-    ed.modes = {
+    mode_mb.valid_boards = [(0x0D28, 0x0204), ]
+    mode_mb.port_path.return_value = '/dev/ttyUSB0'
+    ed.modes = mode_registry({
         'microbit': mode_mb,
-    }
+    })
     ed.show_status_message = mock.MagicMock()
-    ed.check_usb()
+    ports = [mu.logic.SerialPort('ttyUSB0', 0x0D28, 0x0204), ]
+    with mock.patch.object(mu.logic.PORTS, 'ports', return_value=ports):
+        ed.check_usb()
     expected = 'Detected new BBC micro:bit device.'
     ed.show_status_message.assert_called_with(expected)
     assert view.show_confirmation.called
     ed.change_mode.assert_called_once_with('microbit')
+    mode_mb.port_path.assert_called_once_with('ttyUSB0')
+
+
+def test_check_usb_modes_not_loaded():
+    """
+    Modes are asked which boards they look for through their classes, so
+    only a mode with an attached device is loaded.
+    """
+    view = mock.MagicMock()
+    view.show_confirmation = mock.MagicMock(return_value=QMessageBox.Cancel)
+    ed = mu.logic.Editor(view)
+    ed.show_status_message = mock.MagicMock()
+    classes = {}
+    for name, board in (('microbit', (0x0D28, 0x0204)),
+                        ('circuitplayground', (0x239A, 0x8019))):
+        classes[name] = mock.MagicMock()
+        classes[name].valid_boards = [board]
+    classes['python'] = mock.MagicMock(spec=[])  # Can't find a device.
+    ed.modes = mu.app.ModeRegistry(None, None, ['python', 'microbit',
+                                                'circuitplayground'])
+    ports = [mu.logic.SerialPort('ttyUSB0', 0x0D28, 0x0204), ]
+    with mock.patch('mu.app.load_mode', side_effect=classes.get), \
+            mock.patch.object(mu.logic.PORTS, 'ports', return_value=ports):
+        ed.check_usb()
+    classes['microbit'].assert_called_once_with(None, None)
+    assert classes['circuitplayground'].call_count == 0
+    assert classes['python'].call_count == 0
+    assert list(ed.modes.instances) == ['microbit']
 
 
 def test_check_usb_change_mode_cancel():
@@ -1925,12 +3270,15 @@ def test_check_usb_change_mode_cancel():
     ed.change_mode = mock.MagicMock()
     mode_cp = mock.MagicMock()
     mode_cp.name = 'CircuitPlayground'
-    mode_cp.find_device.return_value = '/dev/ttyUSB1'
-    ed.modes = {
+    mode_cp.valid_boards = [(0x239A, 0x8019), ]
+    mode_cp.port_path.return_value = '/dev/ttyUSB1'
+    ed.modes = mode_registry({
         'circuitplayground': mode_cp,
-    }
+    })
     ed.show_status_message = mock.MagicMock()
-    ed.check_usb()
+    ports = [mu.logic.SerialPort('ttyUSB1', 0x239A, 0x8019), ]
+    with mock.patch.object(mu.logic.PORTS, 'ports', return_value=ports):
+        ed.check_usb()
     expected = 'Detected new CircuitPlayground device.'
     ed.show_status_message.assert_called_with(expected)
     assert view.show_confirmation.called
@@ -1947,16 +3295,19 @@ def test_check_usb_already_in_mode():
     ed.change_mode = mock.MagicMock()
     mode_mb = mock.MagicMock()
     mode_mb.name = 'BBC micro:bit'
-    mode_mb.find_device.return_value = '/dev/ttyUSB0'
+    mode_mb.valid_boards = [(0x0D28, 0x0204), ]
+    mode_mb.port_path.return_value = '/dev/ttyUSB0'
     mode_cp = mock.MagicMock()
-    mode_cp.find_device.return_value = None
-    ed.modes = {
+    mode_cp.valid_boards = [(0x239A, 0x8019), ]
+    ed.modes = mode_registry({
         'microbit': mode_mb,
         'circuitplayground': mode_cp
-    }
+    })
     ed.mode = 'microbit'
     ed.show_status_message = mock.MagicMock()
-    ed.check_usb()
+    ports = [mu.logic.SerialPort('ttyUSB0', 0x0D28, 0x0204), ]
+    with mock.patch.object(mu.logic.PORTS, 'ports', return_value=ports):
+        ed.check_usb()
     view.show_confirmation.assert_not_called()
     ed.change_mode.assert_not_called()
 
@@ -1971,16 +3322,23 @@ def test_check_usb_multiple_devices():
     ed.change_mode = mock.MagicMock()
     mode_mb = mock.MagicMock()
     mode_mb.name = 'BBC micro:bit'
-    mode_mb.find_device.return_value = '/dev/ttyUSB0'
+    mode_mb.valid_boards = [(0x0D28, 0x0204), ]
+    mode_mb.port_path.return_value = '/dev/ttyUSB0'
     mode_cp = mock.MagicMock()
     mode_cp.name = 'CircuitPlayground'
-    mode_cp.find_device.return_value = '/dev/ttyUSB1'
-    ed.modes = {
+    mode_cp.valid_boards = [(0x239A, 0x8019), ]
+    mode_cp.port_path.return_value = '/dev/ttyUSB1'
+    ed.modes = mode_registry({
         'microbit': mode_mb,
         'circuitplayground': mode_cp
-    }
+    })
     ed.show_status_message = mock.MagicMock()
-    ed.check_usb()
+    ports = [
+        mu.logic.SerialPort('ttyUSB0', 0x0D28, 0x0204),
+        mu.logic.SerialPort('ttyUSB1', 0x239A, 0x8019),
+    ]
+    with mock.patch.object(mu.logic.PORTS, 'ports', return_value=ports):
+        ed.check_usb()
     expected_mb = mock.call('Detected new BBC micro:bit device.')
     expected_cp = mock.call('Detected new CircuitPlayground device.')
     ed.show_status_message.assert_has_calls((expected_mb, expected_cp),
@@ -1996,7 +3354,7 @@ def test_check_usb_remove_disconnected_devices():
     """
     view = mock.MagicMock()
     ed = mu.logic.Editor(view)
-    ed.modes = {}
+    ed.modes = mode_registry({})
     ed.show_status_message = mock.MagicMock()
     ed.connected_devices = {('microbit', '/dev/ttyACM1')}
     ed.check_usb()
@@ -2397,6 +3755,8 @@ def test_handle_open_file():
     """
     class Dummy(QObject):
         open_file = pyqtSignal(str)
+        code_changed = pyqtSignal(object)
+        tab_closed = pyqtSignal(object)
     view = Dummy()
     edit = mu.logic.Editor(view)
     m = mock.MagicMock()
@@ -2,13 +2,31 @@
 """
 Takes a JSON representation of an API and emits elements to be inserted into a
 Python list such that they conform to Scintilla's API description DSL.
+
+    python utils/mkapi.py api.json
+
+Alternatively, compiles the API definitions used by each of Mu's modes into
+files QScintilla can load without translating or preparing the definitions
+again every time Mu starts. A file is created for each mode and language (by
+default English and every language for which Mu has a translation) in
+mu/resources/api:
+
+    python utils/mkapi.py --compile [LANGUAGE ...]
 """
+import os
 import sys
 import json
+import gettext
+import importlib
 
 
-if __name__ == '__main__':
-    f = sys.argv[1]
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def emit(f):
+    """
+    Print the API described in the referenced JSON file as Python list items.
+    """
     with open(f) as api_file:
         api = json.load(api_file)
     # Sort the JSON objects so diffing code is easier to do.
@@ -21,3 +39,65 @@ if __name__ == '__main__':
         description = i['description'].replace('\u2013', '--')
         content = repr('{}({}) \n{}'.format(name, args, description))
         print('    _({}),'.format(content))
+
+
+def load_apis(language):
+    """
+    (Re)import the API definitions so they're translated into the referenced
+    language and return the mu.modes.api package.
+    """
+    localedir = os.path.join(ROOT, 'mu', 'locale')
+    gettext.translation('mu', localedir=localedir, languages=[language],
+                        fallback=True).install()
+    import mu.modes.api
+    for name in ('adafruit', 'microbit', 'python3', 'pi', 'shared',
+                 'pygamezero'):
+        importlib.reload(importlib.import_module('mu.modes.api.' + name))
+    return importlib.reload(mu.modes.api)
+
+
+def compile_apis(languages=None):
+    """
+    Compile the API definitions of each mode into a prepared API file for
+    each of the referenced languages.
+    """
+    sys.path.insert(0, ROOT)
+    from PyQt5.QtCore import QEventLoop
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.Qsci import QsciAPIs
+    app = QApplication(sys.argv)  # Needed by the lexer.
+    from mu.interface.editor import PythonLexer
+    from mu.modes import MODES, load_mode
+    from mu.modes.base import compiled_api_path
+    if not languages:
+        languages = ['en', ] + sorted(
+            {name[:2] for name in os.listdir(os.path.join(ROOT, 'mu',
+                                                          'locale'))})
+    modes = [load_mode(name)(None, None) for name in MODES]
+    for language in languages:
+        load_apis(language)
+        for mode in modes:
+            definitions = mode.api()
+            if not definitions:
+                continue
+            lexer = PythonLexer()
+            api = QsciAPIs(lexer)
+            for entry in definitions:
+                api.add(entry)
+            loop = QEventLoop(app)
+            api.apiPreparationFinished.connect(loop.quit)
+            api.prepare()
+            loop.exec_()
+            filename = compiled_api_path(mode.short_name, language)
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            if not api.savePrepared(filename):
+                sys.exit('Could not save {}'.format(filename))
+            print('Compiled {} ({} definitions)'.format(filename,
+                                                        len(definitions)))
+
+
+if __name__ == '__main__':
+    if sys.argv[1] == '--compile':
+        compile_apis(sys.argv[2:])
+    else:
+        emit(sys.argv[1])
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Measures how quickly the output of a MicroPython REPL is decoded.
+
+    python utils/repl_benchmark.py [KILOBYTES]
+
+Decodes KILOBYTES (default 1024) of typical REPL output (text with UTF-8
+characters and VT100 cursor movements), split into chunks of the sizes read
+from the serial port, and prints the throughput for each chunk size.
+"""
+import os
+import sys
+import timeit
+
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from mu.interface.terminal import TerminalDecoder  # noqa: E402
+
+
+#: Something like what a device printing in a loop outputs.
+SAMPLE = ('>>> for i in range(10):\r\n...     print(i, "°C")\r\n'
+          '\x1b[K...     \x08\x08\x08\x08\x1b[4D\r\n'
+          '0 °C\r\n1 °C\r\n').encode('utf-8')
+CHUNK_SIZES = (1, 64, 4096)
+
+
+def benchmark(kilobytes=1024):
+    """
+    Print how many megabytes per second are decoded for each chunk size.
+    """
+    data = SAMPLE * (kilobytes * 1024 // len(SAMPLE))
+    for size in CHUNK_SIZES:
+        chunks = [data[i:i + size] for i in range(0, len(data), size)]
+
+        def decode():
+            decoder = TerminalDecoder()
+            for chunk in chunks:
+                decoder.decode(chunk)
+
+        duration = min(timeit.repeat(decode, number=1, repeat=3))
+        print('{:>5} byte chunks: {:.2f}MB/s'.format(
+            size, len(data) / duration / 1024 / 1024))
+
+
+if __name__ == '__main__':
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1024)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Measures how long Mu takes to start (until its window is interactive) and
+keeps a history of the results so regressions can be spotted.
+
+    python utils/startup_benchmark.py [RUNS]
+
+Mu is run headless (with Qt's offscreen platform) with --profile-startup in a
+temporary home directory. The first (cold) start is with a fresh home and
+workspace, the remaining RUNS (default 5) warm starts reuse them. The result
+is appended to .benchmarks/startup.jsonl and compared with the fastest warm
+start recorded so far: if it is more than 20% slower the script exits with a
+non-zero status.
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+import statistics
+import subprocess
+
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+HISTORY_FILE = os.path.join(ROOT, '.benchmarks', 'startup.jsonl')
+TOLERANCE = 1.2  # How much slower than the best warm start is a regression.
+TIMEOUT = 60  # Seconds to wait for Mu to start.
+
+
+def start_mu(home):
+    """
+    Start Mu with the referenced home directory and return its startup
+    profile once the window is interactive.
+    """
+    profile = os.path.join(home, 'startup_profile.json')
+    if os.path.exists(profile):
+        os.remove(profile)
+    env = dict(os.environ)
+    env.update({
+        'HOME': home,
+        'XDG_DATA_HOME': os.path.join(home, 'data'),
+        'XDG_CACHE_HOME': os.path.join(home, 'cache'),
+        'XDG_CONFIG_HOME': os.path.join(home, 'config'),
+        'QT_QPA_PLATFORM': 'offscreen',
+    })
+    # Mu asks for a mode the first time it's run, so start in Python 3 mode.
+    data_dir = os.path.join(home, 'data', 'mu')
+    os.makedirs(data_dir, exist_ok=True)
+    session = os.path.join(data_dir, 'session.json')
+    if not os.path.exists(session):
+        with open(session, 'w') as session_file:
+            json.dump({'mode': 'python'}, session_file)
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, 'run.py'),
+                                '--profile-startup=' + profile],
+                               cwd=home, env=env, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.time() + TIMEOUT
+        while time.time() < deadline and process.poll() is None:
+            if os.path.exists(profile):
+                time.sleep(0.1)  # Let Mu finish writing it.
+                with open(profile) as profile_file:
+                    return json.load(profile_file)
+            time.sleep(0.05)
+    finally:
+        process.terminate()
+        process.wait()
+    sys.exit('Mu did not start (see the log in {}).'.format(home))
+
+
+def load_history():
+    """
+    Return the previously recorded results.
+    """
+    if not os.path.exists(HISTORY_FILE):
+        return []
+    with open(HISTORY_FILE) as history_file:
+        return [json.loads(line) for line in history_file if line.strip()]
+
+
+def benchmark(runs=5):
+    """
+    Measure cold and warm start times and record them in the history file.
+    Return True if there's no regression.
+    """
+    with tempfile.TemporaryDirectory() as home:
+        cold = start_mu(home)
+        warm = [start_mu(home) for i in range(runs)]
+    phases = {}
+    for profile in warm:
+        for phase in profile['phases']:
+            phases.setdefault(phase['name'], []).append(phase['duration'])
+    try:
+        commit = subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+            universal_newlines=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    result = {
+        'time': time.time(),
+        'commit': commit,
+        'version': cold['version'],
+        'cold': cold['total'],
+        'warm': statistics.median(p['total'] for p in warm),
+        'phases': {name: statistics.median(durations)
+                   for name, durations in phases.items()},
+    }
+    print('Cold start: {:.3f}s'.format(result['cold']))
+    print('Warm start: {:.3f}s (median of {})'.format(result['warm'], runs))
+    for phase in warm[0]['phases']:
+        name = phase['name']
+        print('    {:<16} {:.3f}s'.format(name, result['phases'][name]))
+    history = load_history()
+    os.makedirs(os.path.dirname(HISTORY_FILE), exist_ok=True)
+    with open(HISTORY_FILE, 'a') as history_file:
+        history_file.write(json.dumps(result) + '\n')
+    if history:
+        best = min(h['warm'] for h in history)
+        print('Best warm start so far: {:.3f}s'.format(best))
+        if result['warm'] > best * TOLERANCE:
+            print('Startup is more than {:.0%} slower than the best so '
+                  'far.'.format(TOLERANCE - 1))
+            return False
+    return True
+
+
+if __name__ == '__main__':
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    sys.exit(0 if benchmark(runs) else 1)